@@ -27,10 +27,10 @@
 from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication
 from qgis.PyQt.QtGui import QIcon
 from qgis.gui import QgsFileWidget
-from qgis.PyQt.QtWidgets import QHeaderView , QAction, QFileDialog, QMessageBox, QColorDialog, QTableWidgetItem, QDialogButtonBox
+from qgis.PyQt.QtWidgets import QHeaderView , QAction, QFileDialog, QMessageBox, QColorDialog, QTableWidgetItem
 from qgis.PyQt import QtWidgets
 from qgis.core import (QgsProject, Qgis, QgsWkbTypes, QgsMapLayerType, QgsMapLayerProxyModel, QgsPointXY, QgsGeometry, 
-    QgsVectorLayer, QgsRasterLayer, QgsCoordinateReferenceSystem, QgsVectorFileWriter, QgsProcessingFeatureSourceDefinition
+    QgsVectorLayer, QgsRasterLayer, QgsCoordinateReferenceSystem, QgsVectorFileWriter, QgsProcessingFeatureSourceDefinition, QgsApplication
  )
 from PyQt5.QtCore import Qt, QEvent
 from PyQt5.QtGui import QColor
@@ -45,7 +45,8 @@ from datetime import datetime
 import pandas as pd
 
 # Importing core project functionality
-from .backend.CityRasterProcessor import CityRasterProcessor
+from .backend.CityRasterTask import CityRunQueue
+from .backend.BGAProvider import BGAProvider
 
 # Initialize Qt resources from file resources.py
 from .resources import *
@@ -90,6 +91,8 @@ class BGA:
         self.selected_raster_layers = {}      # names along with raster paths
         self.vector_path = ''       # Get selected vector path
         self.colors = []
+        self.run_queue = CityRunQueue(progress_callback=self.update_progress)  # Cities processed in the background
+        self.provider = None        # Processing provider, registered in initGui
 		
         # initialize locale
         locale = QSettings().value('locale/userLocale')[0:2]
@@ -699,8 +702,9 @@ class BGA:
     '''
     Validates user inputs including centroid location, year and color data, and output directory. 
     If all validations pass and the centroid lies within the AOI (if provided), 
-    it collects parameters, initializes the processing class CityRasterProcessor, 
-    updates the progress bar, and displays a success message.
+    it collects parameters and queues a CityRasterProcessor run. Statistics run as a background
+    QgsTask; the progress bar shows the mean progress of the running cities and a message is shown
+    when each city finishes.
     '''
     def clickOk(self):
         # Check the entries of Frame input data before clicking ok
@@ -749,19 +753,26 @@ class BGA:
                                     self.dlg.progressBar.setValue(0)
                                     self.dlg.progressBar.setValue(1)
                                     
-                                    # Disable the OK button to prevent re-submission
-                                    ok_button = self.dlg.buttonBox.button(QDialogButtonBox.Ok)
-                                    ok_button.setEnabled(False)
-                                    
-                                    # Call processing class with or without centroid point as argument
-                                    CityRasterProcessor(output_path, self.dlg, self.iface, region, sorted_paths, self.vector_path, years, no_of_sectors, self.colors, centroid_point)
-                                    
-                                    # Show success message on QGIS message bar
-                                    self.iface.messageBar().pushMessage("Success", "Output Folder saved at " + output_path , level=Qgis.Success)
-                                    self.dlg.progressBar.setValue(100)                                  
+                                    # Queue the run; further cities can be submitted while it is processing.
+                                    self.run_queue.submit(
+                                        output_path=output_path, dlg=self.dlg, iface=self.iface, city=region,
+                                        raster_paths=sorted_paths, aoi_path=self.vector_path, labels=years,
+                                        no_of_sectors=no_of_sectors, colors=list(self.colors),
+                                        centroid_point=centroid_point
+                                    )
+                                    if self.run_queue.pending:
+                                        self.iface.messageBar().pushMessage("BGA", f"{region} queued", level=Qgis.Info)
                             
                     
     
+    '''
+    Shows the mean progress of the running cities on the dialog's progress bar.
+    '''
+    def update_progress(self, progress):
+        if self.dlg is not None:
+            self.dlg.progressBar.setValue(int(progress))
+
+
     '''
     Loads raster layer names into the first column of the table widget.
     '''
@@ -823,8 +834,16 @@ class BGA:
         return super().eventFilter(obj, event)
 
 
+    def initProcessing(self):
+        """Registers the BGA algorithms in the Processing toolbox."""
+        self.provider = BGAProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+
+
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
+        self.initProcessing()
+
         icon_path =  os.path.join(os.path.dirname(__file__), 'icon.png')
         self.add_action(
             icon_path,
@@ -896,7 +915,10 @@ class BGA:
                 self.tr(u'&BGA'),
                 action)
             self.iface.removeToolBarIcon(action)
-            
+
+        if self.provider:
+            QgsApplication.processingRegistry().removeProvider(self.provider)
+            self.provider = None
             
         if self.dlg:
             self.dlg.deleteLater()
@@ -0,0 +1,97 @@
+import math
+import numpy as np
+
+
+# Compass directions counter-clockwise from east, one per sector of a 16-sector ring
+DIRECTIONS = [
+    "E", "ENE", "NE", "NNE", "N", "NNW", "NW", "WNW",
+    "W", "WSW", "SW", "SSW", "S", "SSE", "SE", "ESE"
+]
+
+
+def sector_names(no_of_sectors):
+    """
+    :param no_of_sectors: Number of directional sectors (4, 8 or 16)
+    :return: Direction name of each sector, in sector id order
+    """
+    if no_of_sectors not in (4, 8, 16):
+        raise ValueError("Number of sectors must be 4, 8 or 16")
+    return DIRECTIONS[::16 // no_of_sectors]
+
+
+class AnalyticSectorBinner:
+    """
+    Assigns raster pixels to directional sectors without any wedge geometry.
+
+    For every pixel centre, the bearing and distance from the centroid are computed with
+    vectorized atan2/hypot and the pixel is binned straight into its sector. The sectors
+    reproduce the wedges of DirectionalRingGenerator: sector i spans the angles
+    [i * width - offset, (i + 1) * width - offset) counter-clockwise from east, and only pixels
+    inside the ring polygon (a regular polygon with a vertex on every sector boundary) are kept.
+
+    :param center_x: X coordinate of the centroid (raster CRS)
+    :param center_y: Y coordinate of the centroid (raster CRS)
+    :param no_of_sectors: Number of directional sectors (e.g., 4, 8, 16)
+    :param radius: Radius of the ring polygon (distance from centroid to its vertices)
+    :param geotransform: GDAL geotransform of the raster grid (north-up)
+    :param offset: Angular offset in degrees (half a sector for statistics, 0 for the view)
+    """
+    def __init__(self, center_x, center_y, no_of_sectors, radius, geotransform, offset=0.0):
+        if geotransform[2] != 0 or geotransform[4] != 0:
+            raise ValueError("Rotated raster grids are not supported.")
+
+        self.center_x = center_x
+        self.center_y = center_y
+        self.no_of_sectors = no_of_sectors
+        self.radius = radius
+        self.geotransform = geotransform
+        self.offset = offset
+        self.sector_width = 360 / no_of_sectors
+
+        # Distance from the centroid to each polygon edge, measured along the sector bisector
+        self.apothem = radius * math.cos(math.radians(self.sector_width / 2))
+
+    def bounds(self):
+        """
+        Map-unit bounds of the circle circumscribing the ring polygon.
+
+        :return: Tuple (xmin, ymin, xmax, ymax)
+        """
+        return (self.center_x - self.radius, self.center_y - self.radius,
+                self.center_x + self.radius, self.center_y + self.radius)
+
+    def labels(self, xoff, yoff, xsize, ysize):
+        """
+        Computes the sector id of every pixel in a raster block.
+
+        :param xoff: Column offset of the block
+        :param yoff: Row offset of the block
+        :param xsize: Block width in pixels
+        :param ysize: Block height in pixels
+        :return: 2D int32 array of shape (ysize, xsize); sector ids start at 1, 0 is outside the ring
+        """
+        origin_x, pixel_width, _, origin_y, _, pixel_height = self.geotransform
+
+        # Pixel centre coordinates, relative to the centroid
+        dx = origin_x + (np.arange(xoff, xoff + xsize) + 0.5) * pixel_width - self.center_x
+        dy = origin_y + (np.arange(yoff, yoff + ysize) + 0.5) * pixel_height - self.center_y
+        dx, dy = np.meshgrid(dx, dy)
+
+        bearing = np.arctan2(dy, dx)
+        distance = np.hypot(dx, dy)
+
+        index = np.floor(np.mod(np.degrees(bearing) + self.offset, 360) / self.sector_width).astype(np.int32)
+        index %= self.no_of_sectors  # Guards against rounding exactly onto 360°
+
+        # Keep pixels inside the ring polygon: projection on the sector bisector within the apothem
+        bisector = np.radians((index + 0.5) * self.sector_width - self.offset)
+        inside = distance * np.cos(bearing - bisector) <= self.apothem
+
+        return np.where(inside, index + 1, 0).astype(np.int32)
+
+    def block_labels(self, block):
+        """
+        :param block: RasterBlock
+        :return: Sector ids of the block (see labels)
+        """
+        return self.labels(*block.window)
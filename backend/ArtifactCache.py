@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+
+class ArtifactCache:
+    """
+    Content-addressed store of the files produced by the pipeline stages (images, charts,
+    tables, layout exports).
+
+    A stage describes everything its output depends on (input hashes, years, colors, sector
+    count, centroid, render settings...) as a JSON-serializable dictionary; its SHA-1 is the
+    fingerprint of the artifact. When an entry with the same fingerprint exists its files are
+    copied to the output folder instead of running the stage again. Files are stored under
+    their role in the entry, not their output name, so e.g. a year image rendered for one city
+    name is reused after the city is renamed.
+
+    Entries are written to a temporary folder and renamed into place, so a half-written entry
+    is never read. The total size is capped like the RasterCache: restoring an entry marks it as
+    recently used and storing one evicts the least recently used entries beyond max_bytes.
+
+    :param cache_path: Folder holding the entries (e.g. 'bga_artifacts' in the base output folder)
+    :param max_bytes: Size cap of the cache in bytes
+    """
+    VERSION = 2  # Bump when a stage's output changes for the same inputs
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, cache_path, max_bytes=2 * 1024 ** 3):
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def fingerprint(cls, stage, params):
+        """
+        :param stage: Stage name
+        :param params: JSON-serializable dictionary of everything the stage output depends on
+        :return: Hex digest
+        """
+        text = json.dumps({'stage': stage, 'version': cls.VERSION, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def entry_path(self, fingerprint):
+        return os.path.join(self.cache_path, fingerprint[:2], fingerprint)
+
+    def restore(self, fingerprint, targets):
+        """
+        Copies the files of a cached entry to their output paths.
+
+        :param fingerprint: Artifact fingerprint
+        :param targets: Dictionary {role: output path}
+        :return: True when every file was restored, False on a cache miss
+        """
+        entry = self.entry_path(fingerprint)
+        try:
+            with open(os.path.join(entry, self.MANIFEST)) as f:
+                roles = json.load(f)['files']
+        except (OSError, ValueError, KeyError):
+            return False
+        if set(roles) != set(targets):
+            return False
+
+        try:
+            for role, target in targets.items():
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(os.path.join(entry, roles[role]), target)
+        except OSError as e:
+            print(f"[WARNING] Unable to restore cached artifact {fingerprint}: {e}")
+            return False
+
+        try:
+            os.utime(os.path.join(entry, self.MANIFEST))  # Marks the entry as recently used
+        except OSError:
+            pass
+        return True
+
+    def store(self, fingerprint, sources):
+        """
+        Adds the files produced by a stage to the cache. Missing files are not cached.
+
+        :param fingerprint: Artifact fingerprint
+        :param sources: Dictionary {role: path of the produced file}
+        :return: True when the entry was stored (or already present)
+        """
+        entry = self.entry_path(fingerprint)
+        if os.path.exists(entry):
+            return True
+        if not all(os.path.isfile(path) for path in sources.values()):
+            return False
+
+        tmp_entry = f'{entry}.{uuid.uuid4().hex}.tmp'
+        try:
+            os.makedirs(tmp_entry)
+            roles = {}
+            for i, (role, path) in enumerate(sorted(sources.items())):
+                roles[role] = f'{i}{os.path.splitext(path)[1]}'
+                shutil.copyfile(path, os.path.join(tmp_entry, roles[role]))
+            with open(os.path.join(tmp_entry, self.MANIFEST), 'w') as f:
+                json.dump({'files': roles}, f)
+            os.replace(tmp_entry, entry)
+        except OSError as e:
+            # Another run may have stored the same entry meanwhile
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            if not os.path.exists(entry):
+                print(f"[WARNING] Unable to cache artifact {fingerprint}: {e}")
+                return False
+        self.evict(keep=entry)
+        return True
+
+    def evict(self, keep=None):
+        """
+        Deletes least recently used entries until the cache fits in max_bytes.
+
+        :param keep: Entry folder that must not be evicted (e.g. the entry just stored)
+        """
+        entries = []
+        for prefix in os.listdir(self.cache_path):
+            prefix_path = os.path.join(self.cache_path, prefix)
+            if not os.path.isdir(prefix_path):
+                continue
+            for name in os.listdir(prefix_path):
+                entry = os.path.join(prefix_path, name)
+                if name.endswith('.tmp'):
+                    continue
+                try:
+                    used = os.stat(os.path.join(entry, self.MANIFEST)).st_mtime
+                    size = sum(os.path.getsize(os.path.join(entry, file)) for file in os.listdir(entry))
+                except OSError:
+                    continue  # Entry removed meanwhile
+                entries.append((used, size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            if not os.path.exists(entry):
+                total -= size
+
+    def purge(self):
+        """
+        Deletes every entry of the cache.
+        """
+        shutil.rmtree(self.cache_path, ignore_errors=True)
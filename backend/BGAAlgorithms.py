@@ -0,0 +1,399 @@
+import os
+
+from qgis.core import (
+    QgsFeature, QgsFeatureSink, QgsField, QgsFields, QgsProcessing, QgsProcessingAlgorithm,
+    QgsProcessingException, QgsProcessingParameterEnum, QgsProcessingParameterFeatureSink,
+    QgsProcessingParameterField, QgsProcessingParameterFolderDestination, QgsProcessingParameterMultipleLayers,
+    QgsProcessingParameterPoint, QgsProcessingParameterString, QgsProcessingParameterVectorLayer,
+    QgsWkbTypes, QgsCoordinateReferenceSystem
+)
+from qgis.PyQt.QtCore import QVariant, QCoreApplication
+
+from .PipelineFeedback import PipelineFeedback, PipelineCanceled
+from .ZonalStatisticsProcessor import ZonalStatisticsProcessor
+from .DirectionalRingGenerator import DirectionalRingGenerator
+from .GrowthCore import pixels_to_km2, sector_sums
+from .RasterGrid import RasterGrid
+from .MultiZoneStatisticsProcessor import MultiZoneStatisticsProcessor
+
+SECTOR_COUNTS = ['4', '8', '16']
+
+
+class ProcessingFeedbackAdapter(PipelineFeedback):
+    """
+    Forwards the pipeline progress to a QgsProcessingFeedback and reads its cancellation flag.
+
+    :param feedback: QgsProcessingFeedback of the running algorithm
+    """
+    def __init__(self, feedback):
+        super().__init__()
+        self.feedback = feedback
+
+    def report(self, progress):
+        self.feedback.setProgress(progress)
+
+    def is_canceled(self):
+        return self.canceled or self.feedback.isCanceled()
+
+
+class BGAAlgorithm(QgsProcessingAlgorithm):
+    """
+    Shared parameters and helpers of the BGA algorithms.
+    """
+    RASTERS = 'RASTERS'
+    YEARS = 'YEARS'
+    AOI = 'AOI'
+    SECTORS = 'SECTORS'
+    CENTROID = 'CENTROID'
+    OUTPUT = 'OUTPUT'
+
+    def tr(self, string):
+        return QCoreApplication.translate('BGA', string)
+
+    def createInstance(self):
+        return type(self)()
+
+    def group(self):
+        return self.tr('BuiltUp Growth Analysis')
+
+    def groupId(self):
+        return 'bga'
+
+    def add_raster_parameters(self):
+        self.addParameter(QgsProcessingParameterMultipleLayers(
+            self.RASTERS, self.tr('Built-up rasters (one per year)'), QgsProcessing.TypeRaster))
+        self.addParameter(QgsProcessingParameterString(
+            self.YEARS, self.tr('Years, comma separated in the raster order'), optional=True))
+
+    def add_aoi_parameter(self):
+        self.addParameter(QgsProcessingParameterVectorLayer(
+            self.AOI, self.tr('Area of interest'), [QgsProcessing.TypeVectorPolygon]))
+
+    def add_ring_parameters(self):
+        self.addParameter(QgsProcessingParameterEnum(
+            self.SECTORS, self.tr('Number of sectors'), options=SECTOR_COUNTS, defaultValue=1))
+        self.addParameter(QgsProcessingParameterPoint(
+            self.CENTROID, self.tr('Centroid (default: AOI centroid)'), optional=True))
+
+    def rasters_and_years(self, parameters, context):
+        """
+        :return: Tuple (raster paths, years), sorted by year
+        """
+        layers = self.parameterAsLayerList(parameters, self.RASTERS, context)
+        paths = [layer.source() for layer in layers]
+        if not paths:
+            raise QgsProcessingException(self.tr('At least one raster is required.'))
+
+        text = self.parameterAsString(parameters, self.YEARS, context).strip()
+        if text:
+            try:
+                years = [int(v) for v in text.split(',')]
+            except ValueError:
+                raise QgsProcessingException(self.tr('Years must be integers separated by commas.'))
+            if len(years) != len(paths):
+                raise QgsProcessingException(self.tr('One year per raster is required.'))
+        else:
+            years = list(range(1, len(paths) + 1))
+
+        order = sorted(range(len(years)), key=lambda i: years[i])
+        return [paths[i] for i in order], [years[i] for i in order]
+
+    def aoi_path(self, parameters, context, feedback):
+        """
+        :return: Path of the AOI readable by OGR (memory layers are written to a temporary file)
+        """
+        return self.parameterAsCompatibleSourceLayerPath(parameters, self.AOI, context, ['shp', 'gpkg'], 'gpkg', feedback)
+
+    def ring_generator(self, parameters, context, view=False):
+        """
+        :return: DirectionalRingGenerator of the AOI parameter, independent of the project layers
+        """
+        aoi_layer = self.parameterAsVectorLayer(parameters, self.AOI, context)
+        no_of_sectors = int(SECTOR_COUNTS[self.parameterAsEnum(parameters, self.SECTORS, context)])
+        centroid = None
+        if parameters.get(self.CENTROID):
+            centroid = self.parameterAsPoint(parameters, self.CENTROID, context, aoi_layer.crs())
+        return DirectionalRingGenerator(None, '', no_of_sectors, centroid, view, vector_layer=aoi_layer)
+
+    @staticmethod
+    def table_fields(columns):
+        fields = QgsFields()
+        for name, kind in columns:
+            fields.append(QgsField(name, kind))
+        return fields
+
+    @staticmethod
+    def pipeline_feedback(feedback, stage=None):
+        """
+        :param stage: Optional stage name spanning the whole progress range, for processors that
+                      report with set_fraction outside of a StageScheduler
+        :return: ProcessingFeedbackAdapter of the algorithm feedback
+        """
+        adapter = ProcessingFeedbackAdapter(feedback)
+        if stage:
+            adapter.set_stage(stage, 0, 100)
+        return adapter
+
+    def run_pipeline(self, feedback, function):
+        """
+        Runs function and turns a pipeline cancellation into an empty result.
+        """
+        try:
+            return function()
+        except PipelineCanceled:
+            feedback.reportError(self.tr('Canceled.'))
+            return None
+
+
+class AoiBuiltupTotalsAlgorithm(BGAAlgorithm):
+    """
+    Built-up pixel count and area of every year inside the AOI (numpy engine).
+    """
+    def name(self):
+        return 'aoibuiltuptotals'
+
+    def displayName(self):
+        return self.tr('AOI built-up totals')
+
+    def shortHelpString(self):
+        return self.tr('Counts the built-up pixels of each year raster inside the AOI in one blocked pass '
+                       'and returns a table of pixels and km² per year.')
+
+    def initAlgorithm(self, config=None):
+        self.add_raster_parameters()
+        self.add_aoi_parameter()
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT, self.tr('AOI built-up totals'), QgsProcessing.TypeVector))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        paths, years = self.rasters_and_years(parameters, context)
+        aoi_path = self.aoi_path(parameters, context, feedback)
+
+        processor = self.run_pipeline(feedback, lambda: ZonalStatisticsProcessor(
+            paths, aoi_path, years, engine='numpy', feedback=self.pipeline_feedback(feedback, 'aoi_statistics')))
+        if processor is None:
+            return {}
+
+        fields = self.table_fields([('year', QVariant.Int), ('pixels', QVariant.LongLong), ('area_km2', QVariant.Double)])
+        sink, dest_id = self.parameterAsSink(parameters, self.OUTPUT, context, fields, QgsWkbTypes.NoGeometry,
+                                             QgsCoordinateReferenceSystem())
+        for year in years:
+            feature = QgsFeature(fields)
+            total = processor.year_totals[year]
+            feature.setAttributes([year, total, pixels_to_km2(total)])
+            sink.addFeature(feature, QgsFeatureSink.FastInsert)
+        return {self.OUTPUT: dest_id}
+
+
+class DirectionalRingAlgorithm(BGAAlgorithm):
+    """
+    Directional ring wedges ('MultiRings') around the AOI as a polygon layer.
+    """
+    VIEW = 'VIEW'
+
+    def name(self):
+        return 'directionalring'
+
+    def displayName(self):
+        return self.tr('Directional ring')
+
+    def shortHelpString(self):
+        return self.tr('Builds the ring of directional sectors used for the sector statistics, centered on '
+                       'the AOI centroid (or the given point) and enclosing the AOI extent.')
+
+    def initAlgorithm(self, config=None):
+        self.add_aoi_parameter()
+        self.add_ring_parameters()
+        self.addParameter(QgsProcessingParameterEnum(
+            self.VIEW, self.tr('Orientation'), options=[self.tr('Statistics (sectors centered on directions)'),
+                                                        self.tr('View (sectors starting at east)')], defaultValue=0))
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT, self.tr('Directional ring'), QgsProcessing.TypeVectorPolygon))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        view = self.parameterAsEnum(parameters, self.VIEW, context) == 1
+        generator = self.ring_generator(parameters, context, view)
+
+        fields = self.table_fields([('Direction', QVariant.String)])
+        sink, dest_id = self.parameterAsSink(parameters, self.OUTPUT, context, fields, QgsWkbTypes.Polygon,
+                                             generator.vector_layer.crs())
+        segments = generator.build_segments()
+        for i, (direction, geometry) in enumerate(segments):
+            if feedback.isCanceled():
+                break
+            feature = QgsFeature(fields)
+            feature.setGeometry(geometry)
+            feature.setAttributes([direction])
+            sink.addFeature(feature, QgsFeatureSink.FastInsert)
+            feedback.setProgress(100 * (i + 1) / len(segments))
+        return {self.OUTPUT: dest_id}
+
+
+class SectorStatisticsAlgorithm(BGAAlgorithm):
+    """
+    Built-up pixels and area per directional sector and year, without any project layer.
+    """
+    MODE = 'MODE'
+    MODES = ['analytic', 'labels']
+
+    def name(self):
+        return 'sectorstatistics'
+
+    def displayName(self):
+        return self.tr('Sector statistics')
+
+    def shortHelpString(self):
+        return self.tr("Sums the built-up pixels of each year within each directional sector. 'analytic' bins "
+                       "pixels by bearing and distance to the centroid; 'labels' burns the ring wedges.")
+
+    def initAlgorithm(self, config=None):
+        self.add_raster_parameters()
+        self.add_aoi_parameter()
+        self.add_ring_parameters()
+        self.addParameter(QgsProcessingParameterEnum(
+            self.MODE, self.tr('Sector mode'), options=self.MODES, defaultValue=0))
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT, self.tr('Sector statistics'), QgsProcessing.TypeVector))
+
+    def sector_labeller(self, generator, grid, mode):
+        """
+        :return: Tuple (pixel window, labeller, sector names)
+        """
+        ring = generator.ring()
+        labeller = ring.binner(grid.geotransform) if mode == 'analytic' else ring.labeller(grid)
+        return grid.window_for_bounds(*labeller.bounds()), labeller, list(ring.names)
+
+    def processAlgorithm(self, parameters, context, feedback):
+        paths, years = self.rasters_and_years(parameters, context)
+        mode = self.MODES[self.parameterAsEnum(parameters, self.MODE, context)]
+        generator = self.ring_generator(parameters, context)
+
+        grid = RasterGrid(paths[0])
+        window, labeller, names = self.sector_labeller(generator, grid, mode)
+        bins = len(names) + 1
+
+        sums = self.run_pipeline(feedback, lambda: sector_sums(
+            paths, window, labeller, bins, feedback=self.pipeline_feedback(feedback, 'sector_statistics')))
+        if sums is None:
+            return {}
+
+        fields = self.table_fields([('year', QVariant.Int), ('sector', QVariant.String),
+                                    ('pixels', QVariant.Double), ('area_km2', QVariant.Double)])
+        sink, dest_id = self.parameterAsSink(parameters, self.OUTPUT, context, fields, QgsWkbTypes.NoGeometry,
+                                             QgsCoordinateReferenceSystem())
+        for y, year in enumerate(years):
+            for k, name in enumerate(names):
+                feature = QgsFeature(fields)
+                feature.setAttributes([year, name, float(sums[y][k + 1]), pixels_to_km2(float(sums[y][k + 1]))])
+                sink.addFeature(feature, QgsFeatureSink.FastInsert)
+        return {self.OUTPUT: dest_id}
+
+
+class MultiZoneStatisticsAlgorithm(BGAAlgorithm):
+    """
+    Totals and sector statistics of every zone of a polygon layer, reading the rasters once.
+    """
+    ZONES = 'ZONES'
+    ID_FIELD = 'ID_FIELD'
+
+    def name(self):
+        return 'multizonestatistics'
+
+    def displayName(self):
+        return self.tr('Multi-zone statistics')
+
+    def shortHelpString(self):
+        return self.tr('Built-up pixels, area and growth per zone, year and sector for many AOIs (e.g. wards) '
+                       'sharing one raster stack. The rasters are read once whatever the number of zones. '
+                       'Sectors are centered on each zone centroid and only count pixels inside the zone.')
+
+    def initAlgorithm(self, config=None):
+        self.add_raster_parameters()
+        self.addParameter(QgsProcessingParameterVectorLayer(
+            self.ZONES, self.tr('Zones'), [QgsProcessing.TypeVectorPolygon]))
+        self.addParameter(QgsProcessingParameterField(
+            self.ID_FIELD, self.tr('Zone name field'), parentLayerParameterName=self.ZONES, optional=True))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.SECTORS, self.tr('Number of sectors'), options=SECTOR_COUNTS, defaultValue=1))
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT, self.tr('Zone statistics'), QgsProcessing.TypeVector))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        paths, years = self.rasters_and_years(parameters, context)
+        zones_path = self.parameterAsCompatibleSourceLayerPath(parameters, self.ZONES, context, ['shp', 'gpkg'], 'gpkg', feedback)
+        id_field = self.parameterAsString(parameters, self.ID_FIELD, context) or None
+        no_of_sectors = int(SECTOR_COUNTS[self.parameterAsEnum(parameters, self.SECTORS, context)])
+
+        processor = MultiZoneStatisticsProcessor(paths, zones_path, years, no_of_sectors, id_field,
+                                                 feedback=self.pipeline_feedback(feedback, 'zone_statistics'))
+        if self.run_pipeline(feedback, processor.process) is None:
+            return {}
+
+        fields = self.table_fields([('zone', QVariant.String), ('year', QVariant.Int), ('sector', QVariant.String),
+                                    ('pixels', QVariant.Double), ('area_km2', QVariant.Double), ('growth_pct', QVariant.Double)])
+        sink, dest_id = self.parameterAsSink(parameters, self.OUTPUT, context, fields, QgsWkbTypes.NoGeometry,
+                                             QgsCoordinateReferenceSystem())
+        for zone_id, year, sector, pixels, area, growth in processor.rows():
+            feature = QgsFeature(fields)
+            feature.setAttributes([str(zone_id), year, sector, pixels, area, None if growth != growth else growth])
+            sink.addFeature(feature, QgsFeatureSink.FastInsert)
+        return {self.OUTPUT: dest_id}
+
+
+class CityReportAlgorithm(BGAAlgorithm):
+    """
+    Runs the whole BGA pipeline for one city and exports the report folder (images, charts,
+    tables and layout). It loads layers into the project, so it runs on the main thread.
+    """
+    CITY = 'CITY'
+    OUTPUT_FOLDER = 'OUTPUT_FOLDER'
+
+    def name(self):
+        return 'cityreport'
+
+    def displayName(self):
+        return self.tr('Export city report')
+
+    def shortHelpString(self):
+        return self.tr('Runs the complete analysis of one city (year images, AOI and sector statistics, '
+                       'transition tables, charts and layout) into <output folder>/<city>.')
+
+    def flags(self):
+        return super().flags() | QgsProcessingAlgorithm.FlagNoThreading
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterString(self.CITY, self.tr('City name')))
+        self.add_raster_parameters()
+        self.add_aoi_parameter()
+        self.add_ring_parameters()
+        self.addParameter(QgsProcessingParameterFolderDestination(self.OUTPUT_FOLDER, self.tr('Output folder')))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        # Imported here: the processor pulls in the whole plugin pipeline
+        from .CityRasterProcessor import CityRasterProcessor
+        from .BatchRunner import DEFAULT_COLORS
+
+        city = self.parameterAsString(parameters, self.CITY, context).strip()
+        if not city:
+            raise QgsProcessingException(self.tr('A city name is required.'))
+        paths, years = self.rasters_and_years(parameters, context)
+        aoi_path = self.aoi_path(parameters, context, feedback)
+        output_path = self.parameterAsString(parameters, self.OUTPUT_FOLDER, context)
+        os.makedirs(output_path, exist_ok=True)
+
+        generator = self.ring_generator(parameters, context)
+        centroid = generator.centroid_point  # None unless a point was given
+        colors = [','.join(str(c) for c in DEFAULT_COLORS[i % len(DEFAULT_COLORS)]) for i in range(len(years))][::-1]
+
+        processor = CityRasterProcessor(
+            output_path, None, None, city, paths, aoi_path, years, generator.no_of_segments, colors, centroid,
+            engine='numpy', feedback=self.pipeline_feedback(feedback), auto_run=False
+        )
+        try:
+            self.run_pipeline(feedback, processor.run_all)
+        finally:
+            processor.release_layers()
+        feedback.pushInfo(self.tr('Run report: ') + processor.run_report.summary())
+        if processor.output_path != processor.final_output_path:
+            return {}  # Canceled: the staging folder was not committed
+        return {self.OUTPUT_FOLDER: processor.output_path}
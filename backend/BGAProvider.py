@@ -0,0 +1,26 @@
+from qgis.core import QgsProcessingProvider
+
+from .BGAAlgorithms import (
+    AoiBuiltupTotalsAlgorithm, SectorStatisticsAlgorithm, DirectionalRingAlgorithm, MultiZoneStatisticsAlgorithm,
+    CityReportAlgorithm
+)
+
+
+class BGAProvider(QgsProcessingProvider):
+    """
+    Processing provider exposing the BGA stages as algorithms, so they can be used from the
+    Processing toolbox, the graphical modeler, qgis_process and Python scripts.
+    """
+    def loadAlgorithms(self):
+        for algorithm in (AoiBuiltupTotalsAlgorithm(), SectorStatisticsAlgorithm(),
+                          DirectionalRingAlgorithm(), MultiZoneStatisticsAlgorithm(), CityReportAlgorithm()):
+            self.addAlgorithm(algorithm)
+
+    def id(self):
+        return 'bga'
+
+    def name(self):
+        return 'BuiltUp Growth Analysis'
+
+    def longName(self):
+        return self.name()
@@ -1,9 +1,10 @@
 import matplotlib.pyplot as plt
 import os
-from qgis.core import QgsProject
+
+from .GrowthCore import pixels_to_km2
 
 class BarGraph:
-    def __init__(self, years, city, no_of_raster_layers, output_path):
+    def __init__(self, years, city, no_of_raster_layers, output_path, totals=None, aoi_layer=None):
         """
         Initializes the BarGraph class with labels, city name, number of raster layers, and output path.
 
@@ -11,11 +12,32 @@ class BarGraph:
         :param city: Name of the city being analyzed
         :param no_of_raster_layers: Number of raster layers (years) to process
         :param output_path: Directory where the output chart image will be saved
+        :param totals: Optional dict of built-up pixel counts keyed by year (e.g. from the numpy
+                       zonal engine). When omitted, the counts are read from the AOI layer attributes.
+        :param aoi_layer: AOI layer of the run (RunContext.aoi_layer) holding the counts as attributes;
+                          required when totals is omitted
         """
         self.labels = years
         self.no_of_raster_layers = no_of_raster_layers
         self.output_path = output_path
-        self.file_name = 'AOI'
+        self.aoi_layer = aoi_layer
+        self.totals = totals
+
+    def get_pixel_counts(self):
+        """
+        Retrieves the built-up pixel count of each raster layer.
+
+        :return: List of pixel counts, one per raster layer
+        """
+        if self.totals is not None:
+            return [self.totals[year] for year in self.labels[:self.no_of_raster_layers]]
+
+        if self.aoi_layer is None:
+            raise ValueError("Either the totals or the AOI layer of the run are required.")
+        # Extract attribute values from the first feature
+        values = self.aoi_layer.getFeature(0).attributes()
+        # Consider only the number of raster layers specified
+        return values[:self.no_of_raster_layers]
 
     def get_values(self):
         """
@@ -23,14 +45,9 @@ class BarGraph:
 
         :return: List of area values in square kilometers for each raster layer
         """
-        # Get AOI layer from project
-        layer = QgsProject.instance().mapLayersByName(self.file_name)[0]
-        # Extract attribute values from the first feature
-        values = layer.getFeature(0).attributes()
-        # Consider only the number of raster layers specified
-        values = values[:self.no_of_raster_layers]
+        values = self.get_pixel_counts()
         # Convert pixel count to square kilometers (assuming each pixel = 30x30 = 900 sq.m)
-        values = [((v * 900) / 1000000) for v in values]
+        values = [pixels_to_km2(v) for v in values]
         return values
 
     def plot_chart(self):
@@ -39,11 +56,9 @@ class BarGraph:
 
         :return: None. Saves the bar chart as an image file named 'barGraph.png' in the specified output directory.
         """
-        # Get AOI layer and values similar to get_values
-        layer = QgsProject.instance().mapLayersByName(self.file_name)[0]
-        values = layer.getFeature(0).attributes()
-        values = values[:self.no_of_raster_layers]
-        values = [((v * 900) / 1000000) for v in values]  # Get Area (pixel size: 30 x 30)
+        # Get values similar to get_values
+        values = self.get_pixel_counts()
+        values = [pixels_to_km2(v) for v in values]  # Get Area (pixel size: 30 x 30)
 
         # Create a figure and axis for the plot
         fig, ax = plt.subplots(figsize=(6, 6))
@@ -0,0 +1,335 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from .PipelineFeedback import PipelineFeedback
+
+# Same defaults as the dialog, assigned to the years in ascending order
+DEFAULT_COLORS = [
+    (0, 0, 255, 255),      # Blue
+    (255, 170, 0, 255),    # Mustard
+    (0, 255, 0, 255),      # Green
+    (255, 0, 0, 255),      # Red
+    (255, 165, 0, 255),    # Orange
+    (255, 255, 0, 255),    # Yellow
+    (255, 0, 255, 255),    # Magenta
+    (128, 0, 128, 255),    # Purple
+    (0, 128, 128, 255),    # Teal
+    (128, 128, 0, 255)     # Olive
+]
+
+SECTOR_COUNTS = (4, 8, 16)
+
+_qgis_app = None  # Standalone QgsApplication of this process, see start_qgis
+
+
+def start_qgis():
+    """
+    Starts a headless QgsApplication with the Processing framework, once per process.
+    Does nothing inside a running QGIS. QGIS_PREFIX_PATH and the QGIS python paths (including
+    python/plugins for 'processing') must be set in the environment.
+    """
+    global _qgis_app
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+
+    from qgis.core import QgsApplication
+    if QgsApplication.instance() is None:
+        QgsApplication.setPrefixPath(os.environ.get('QGIS_PREFIX_PATH', '/usr'), True)
+        _qgis_app = QgsApplication([], False)
+        _qgis_app.initQgis()
+
+    from processing.core.Processing import Processing
+    from qgis.analysis import QgsNativeAlgorithms
+    Processing.initialize()
+    if QgsApplication.processingRegistry().providerById('native') is None:
+        QgsApplication.processingRegistry().addProvider(QgsNativeAlgorithms())
+
+
+class ConsoleFeedback(PipelineFeedback):
+    """
+    Prints the stage changes of a city run.
+
+    :param city: City name used as message prefix
+    """
+    def __init__(self, city):
+        super().__init__()
+        self.city = city
+
+    def set_stage(self, name, start, end):
+        super().set_stage(name, start, end)
+        print(f"[INFO] {self.city}: {name}")
+
+
+def split_list(value):
+    """
+    :param value: List, or string with ';' separated items
+    :return: List of stripped strings
+    """
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value]
+    return [v.strip() for v in str(value or '').split(';') if v.strip()]
+
+
+def parse_job(entry, base_dir):
+    """
+    Validates one manifest entry.
+
+    :param entry: Dictionary with city, aoi_path, raster_paths, years, sectors and optional
+                  centroid ('lon,lat') and colors ('r,g,b,a' per year)
+    :param base_dir: Folder relative paths are resolved against (the manifest folder)
+    :return: Job dictionary with raster paths and colors sorted by year
+    """
+    def resolve(path):
+        return path if os.path.isabs(path) else os.path.normpath(os.path.join(base_dir, path))
+
+    city = str(entry.get('city') or '').strip()
+    if not city:
+        raise ValueError("Missing city name")
+
+    raster_paths = [resolve(p) for p in split_list(entry.get('raster_paths'))]
+    years = [int(y) for y in split_list(entry.get('years'))]
+    if not raster_paths or len(raster_paths) != len(years):
+        raise ValueError(f"{city}: raster_paths and years must have the same, non-zero length")
+
+    no_of_sectors = int(entry.get('sectors') or 8)
+    if no_of_sectors not in SECTOR_COUNTS:
+        raise ValueError(f"{city}: sectors must be one of {SECTOR_COUNTS}")
+
+    colors = split_list(entry.get('colors'))
+    if colors and len(colors) != len(years):
+        raise ValueError(f"{city}: one color per year is expected")
+
+    centroid = entry.get('centroid')
+    if isinstance(centroid, str):
+        centroid = [float(v) for v in centroid.split(',')] if centroid.strip() else None
+    if centroid is not None and len(centroid) != 2:
+        raise ValueError(f"{city}: centroid must be 'lon,lat'")
+
+    order = sorted(range(len(years)), key=lambda i: years[i])
+    if colors:
+        colors = [colors[i] for i in order]
+    else:
+        colors = [','.join(str(c) for c in DEFAULT_COLORS[i % len(DEFAULT_COLORS)]) for i in range(len(years))]
+    return {
+        'city': city,
+        'aoi_path': resolve(str(entry.get('aoi_path') or '').strip()),
+        'raster_paths': [raster_paths[i] for i in order],
+        'years': [years[i] for i in order],
+        'sectors': no_of_sectors,
+        'centroid': centroid,
+        # The processor expects the colors in descending year order, like the dialog
+        'colors': colors[::-1],
+    }
+
+
+def read_manifest(manifest_path):
+    """
+    Reads a CSV manifest (one city per row, lists separated by ';') or a JSON manifest (a list of
+    objects, or {"cities": [...]}).
+
+    :return: List of job dictionaries
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    if manifest_path.lower().endswith('.json'):
+        with open(manifest_path) as f:
+            entries = json.load(f)
+        if isinstance(entries, dict):
+            entries = entries.get('cities', [])
+    else:
+        with open(manifest_path, newline='') as f:
+            entries = list(csv.DictReader(f))
+
+    jobs = [parse_job(entry, base_dir) for entry in entries]
+    cities = [job['city'] for job in jobs]
+    duplicates = sorted({city for city in cities if cities.count(city) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate cities in manifest: {', '.join(duplicates)}")
+    return jobs
+
+
+def run_city(job, output_path, engine='numpy'):
+    """
+    Runs the whole pipeline for one city in the current process and never raises, so that one
+    failing city does not stop the batch.
+
+    :return: Result dictionary (city, status, seconds, output, error)
+    """
+    started = time.time()
+    processor = None
+    try:
+        start_qgis()
+        # Imported after the QgsApplication exists (they need the QGIS and Processing modules)
+        from qgis.core import QgsPointXY
+        from .CityRasterProcessor import CityRasterProcessor
+
+        centroid = QgsPointXY(*job['centroid']) if job['centroid'] else None
+        processor = CityRasterProcessor(
+            output_path, None, None, job['city'], job['raster_paths'], job['aoi_path'], job['years'],
+            job['sectors'], job['colors'], centroid, engine=engine,
+            feedback=ConsoleFeedback(job['city']), auto_run=False
+        )
+        processor.run_all()
+        result = {'status': 'done', 'output': processor.output_path, 'error': ''}
+    except Exception as e:
+        traceback.print_exc()
+        report_path = processor.report_path if processor is not None else None
+        result = {'status': 'failed', 'output': report_path or '', 'error': f"{type(e).__name__}: {e}"}
+    finally:
+        if processor is not None:
+            try:
+                processor.release_layers()
+            except Exception:
+                pass
+
+    result.update({'city': job['city'], 'seconds': round(time.time() - started, 1)})
+    return result
+
+
+class BatchRunner:
+    """
+    Headless batch processing of many cities from a manifest, without the dialog or iface.
+
+    Cities run in a pool of worker processes, each with its own standalone QgsApplication and
+    project, so layer names never clash. A failing city is recorded and the batch continues.
+    Progress is kept in 'batch_state.json' in the output folder: a new run skips the cities
+    already done with the same inputs (resume), unless force is set. A summary table is printed
+    and written to 'batch_summary.csv' at the end.
+
+    :param manifest_path: CSV or JSON manifest (see read_manifest)
+    :param output_path: Base output folder
+    :param workers: Number of worker processes; 1 runs the cities in this process
+    :param engine: Statistics engine passed to CityRasterProcessor
+    :param force: Re-runs cities already done
+    """
+    STATE_FILE = 'batch_state.json'
+    SUMMARY_FILE = 'batch_summary.csv'
+
+    def __init__(self, manifest_path, output_path, workers=1, engine='numpy', force=False):
+        self.jobs = read_manifest(manifest_path)
+        self.output_path = output_path
+        self.workers = max(1, workers or 1)
+        self.engine = engine
+        self.force = force
+        self.state_path = os.path.join(output_path, self.STATE_FILE)
+        os.makedirs(output_path, exist_ok=True)
+        self.state = self.load_state()
+
+    def load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"[WARNING] Ignoring unreadable batch state: {self.state_path}")
+            return {}
+
+    def save_state(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def job_key(job):
+        return json.dumps(job, sort_keys=True)
+
+    def pending_jobs(self):
+        """
+        :return: Jobs to run: all with force, otherwise those not done with the same inputs
+        """
+        if self.force:
+            return list(self.jobs)
+        return [
+            job for job in self.jobs
+            if not (self.state.get(job['city'], {}).get('status') == 'done'
+                    and self.state[job['city']].get('job') == self.job_key(job))
+        ]
+
+    def record(self, job, result):
+        result['job'] = self.job_key(job)
+        self.state[job['city']] = result
+        self.save_state()
+        print(f"[INFO] {job['city']}: {result['status']} in {result['seconds']} s {result['error']}")
+
+    def run(self):
+        """
+        Runs the pending cities and writes the summary.
+
+        :return: List of result dictionaries, in manifest order
+        """
+        jobs = self.pending_jobs()
+        print(f"[INFO] {len(jobs)} of {len(self.jobs)} cities to run with {self.workers} worker(s)")
+
+        if self.workers == 1 or len(jobs) <= 1:
+            for job in jobs:
+                self.record(job, run_city(job, self.output_path, self.engine))
+        else:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)), mp_context=context,
+                                     initializer=start_qgis) as executor:
+                futures = [(job, executor.submit(run_city, job, self.output_path, self.engine)) for job in jobs]
+                for job, future in futures:
+                    try:
+                        result = future.result()
+                    except Exception as e:  # Worker process crash
+                        result = {'city': job['city'], 'status': 'failed', 'seconds': 0, 'output': '',
+                                  'error': f"{type(e).__name__}: {e}"}
+                    self.record(job, result)
+
+        results = [self.state.get(job['city'], {'city': job['city'], 'status': 'not run', 'seconds': 0,
+                                                'output': '', 'error': ''}) for job in self.jobs]
+        self.write_summary(results)
+        return results
+
+    def write_summary(self, results):
+        """
+        Prints a summary table and writes it to 'batch_summary.csv'.
+        """
+        columns = ('city', 'status', 'seconds', 'output', 'error')
+        with open(os.path.join(self.output_path, self.SUMMARY_FILE), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for result in results:
+                writer.writerow([result.get(column, '') for column in columns])
+
+        widths = [max(len(column), *(len(str(r.get(column, ''))) for r in results)) if results else len(column)
+                  for column in columns[:3]]
+        print(' | '.join(column.ljust(width) for column, width in zip(columns[:3], widths)) + ' | error')
+        for result in results:
+            print(' | '.join(str(result.get(column, '')).ljust(width) for column, width in zip(columns[:3], widths))
+                  + ' | ' + str(result.get('error', '')))
+
+        failed = sum(1 for result in results if result.get('status') != 'done')
+        print(f"[INFO] {len(results) - failed} cities done, {failed} failed or not run")
+
+
+def main(argv=None):
+    """
+    Command line entry point, e.g. with the plugins folder on PYTHONPATH:
+
+        python -m BGA.backend.BatchRunner cities.csv /data/output --workers 4
+
+    :return: Exit code, 1 when a city failed
+    """
+    parser = argparse.ArgumentParser(description="Headless BuiltUp Growth Analysis for many cities.")
+    parser.add_argument('manifest', help="CSV or JSON manifest: city, aoi_path, raster_paths, years, sectors, centroid, colors")
+    parser.add_argument('output', help="Base output folder")
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes")
+    parser.add_argument('--engine', choices=('numpy', 'qgis'), default='numpy', help="Statistics engine")
+    parser.add_argument('--force', action='store_true', help="Re-run cities already done")
+    args = parser.parse_args(argv)
+
+    results = BatchRunner(args.manifest, args.output, args.workers, args.engine, args.force).run()
+    return 0 if all(result.get('status') == 'done' for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+import json
+import os
+import numpy as np
+
+
+class BitPackedStack:
+    """
+    Compact multi-year built-up stack: the yearly 0/1 values of a pixel are packed into the bits
+    of a single unsigned integer (bit i = year i, years in ascending order). The smallest of
+    uint8/uint16/uint32/uint64 holding all years is used, so N byte-sized year arrays shrink to
+    one array of 1, 2, 4 or 8 bytes per pixel.
+
+    Per-year counts, year-to-year gains and losses and the first built year are all derived from
+    the packed array with bitwise operations.
+
+    :param packed: 2D packed array of shape (rows, cols) covering window
+    :param years: List of years, one per bit
+    :param window: Pixel window (xoff, yoff, xsize, ysize) of the packed array on the raster grid
+    :param fingerprint: Optional description of the inputs, used to validate a cached stack
+    """
+    DTYPES = ((8, np.uint8), (16, np.uint16), (32, np.uint32), (64, np.uint64))
+
+    def __init__(self, packed, years, window, fingerprint=None):
+        self.packed = packed
+        self.years = list(years)
+        self.window = tuple(int(v) for v in window)
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def dtype_for(cls, no_of_years):
+        """
+        :param no_of_years: Number of years to pack
+        :return: Smallest unsigned numpy dtype with one bit per year
+        """
+        for bits, dtype in cls.DTYPES:
+            if no_of_years <= bits:
+                return dtype
+        raise ValueError(f"Cannot pack more than 64 years into one pixel ({no_of_years} given).")
+
+    @staticmethod
+    def make_fingerprint(raster_paths, years, window):
+        """
+        Describes the inputs of a stack: raster paths with their size and modification time,
+        the years and the window. A cached stack is reused only when this matches exactly.
+        """
+        sources = []
+        for path in raster_paths:
+            stat = os.stat(path)
+            sources.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+        return json.dumps({
+            'sources': sources,
+            'years': [str(y) for y in years],
+            'window': [int(v) for v in window] if window else None
+        }, sort_keys=True)
+
+    @classmethod
+    def pack(cls, built):
+        """
+        Packs the yearly built-up masks of a block into one integer per pixel.
+
+        :param built: 3D boolean array of shape (years, rows, cols), years ascending
+        :return: 2D array of the smallest dtype holding all years (see dtype_for)
+        """
+        dtype = cls.dtype_for(len(built))
+        bits = np.zeros(built.shape[1:], dtype=dtype)
+        for k in range(len(built)):
+            bits |= built[k].astype(dtype) << dtype(k)
+        return bits
+
+    @classmethod
+    def build(cls, raster_paths, years, window=None, cache=None, feedback=None):
+        """
+        Packs the rasters block by block. A pixel is built-up for a year when its value is
+        non-zero and not nodata.
+
+        :param raster_paths: List of binary raster paths, ordered like years (ascending)
+        :param years: List of years
+        :param window: Optional pixel window (xoff, yoff, xsize, ysize)
+        :param cache: Optional RasterCache serving the decoded pixels
+        :param feedback: Optional PipelineFeedback for progress and cancellation between blocks
+        :return: BitPackedStack
+        """
+        from .BlockRasterReader import BlockRasterReader  # GDAL is only needed to read the rasters
+
+        dtype = cls.dtype_for(len(raster_paths))
+        reader = BlockRasterReader(raster_paths, window, cache=cache)
+        xoff, yoff, xsize, ysize = reader.window
+        packed = np.zeros((ysize, xsize), dtype=dtype)
+
+        for i, block in enumerate(reader):
+            if feedback is not None:
+                feedback.check()
+                feedback.set_fraction(i / len(reader))
+                feedback.count_block(block)
+            built = (block.data != 0) & block.valid()
+            row, col = block.yoff - yoff, block.xoff - xoff
+            packed[row:row + block.ysize, col:col + block.xsize] = cls.pack(built)
+
+        return cls(packed, years, reader.window, cls.make_fingerprint(raster_paths, years, window))
+
+    @classmethod
+    def load_or_build(cls, cache_path, raster_paths, years, window=None, cache=None, feedback=None):
+        """
+        Loads the stack cached at cache_path when it was built from the same inputs,
+        otherwise builds it and refreshes the cache.
+
+        :param cache_path: Path of the .npz cache file
+        :return: BitPackedStack
+        """
+        fingerprint = cls.make_fingerprint(raster_paths, years, window)
+        if os.path.exists(cache_path):
+            try:
+                cached = cls.load(cache_path)
+                if cached.fingerprint == fingerprint:
+                    print(f"[INFO] Reusing built-up stack: {cache_path}")
+                    return cached
+            except (OSError, ValueError, KeyError):
+                print(f"[WARNING] Ignoring unreadable built-up stack cache: {cache_path}")
+
+        stack = cls.build(raster_paths, years, window, cache, feedback)
+        stack.save(cache_path)
+        return stack
+
+    def save(self, path):
+        """
+        Saves the stack as an uncompressed .npz file.
+        """
+        np.savez(path, packed=self.packed, years=np.array([str(y) for y in self.years]),
+                 window=np.array(self.window), fingerprint=np.array(self.fingerprint or ''))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a stack saved with save().
+        """
+        with np.load(path) as data:
+            years = [int(y) if y.isdigit() else y for y in data['years'].tolist()]
+            return cls(data['packed'], years, data['window'].tolist(), str(data['fingerprint']) or None)
+
+    def year_bits(self, index):
+        """
+        :param index: Position of the year in self.years
+        :return: 2D boolean array, True where the pixel is built-up that year
+        """
+        return (self.packed >> self.packed.dtype.type(index)) & 1 == 1
+
+    def counts(self, mask=None):
+        """
+        Built-up pixel count per year.
+
+        :param mask: Optional boolean array (same shape as packed) restricting the count, e.g. the AOI
+        :return: Dictionary of pixel counts keyed by year
+        """
+        packed = self.packed if mask is None else self.packed[mask]
+        return {
+            year: int(np.count_nonzero((packed >> packed.dtype.type(i)) & 1))
+            for i, year in enumerate(self.years)
+        }
+
+    def gains(self, index):
+        """
+        :param index: Position of the earlier year of the pair (index, index + 1)
+        :return: 2D boolean array of pixels not built in years[index] but built in years[index + 1]
+        """
+        return self.year_bits(index + 1) & ~self.year_bits(index)
+
+    def losses(self, index):
+        """
+        :param index: Position of the earlier year of the pair (index, index + 1)
+        :return: 2D boolean array of pixels built in years[index] but not in years[index + 1]
+        """
+        return self.year_bits(index) & ~self.year_bits(index + 1)
+
+    def stable(self, index):
+        """
+        :param index: Position of the earlier year of the pair (index, index + 1)
+        :return: 2D boolean array of pixels built in both years[index] and years[index + 1]
+        """
+        return self.year_bits(index) & self.year_bits(index + 1)
+
+    def first_built_index(self):
+        """
+        Position of the first year each pixel is built-up, from the lowest set bit.
+
+        :return: 2D int16 array, -1 for pixels never built-up
+        """
+        packed = self.packed
+        lowest = packed & (~packed + packed.dtype.type(1))  # Isolates the lowest set bit
+        index = np.full(packed.shape, -1, dtype=np.int16)
+        built = lowest != 0
+        index[built] = np.log2(lowest[built]).astype(np.int16)  # Exact for powers of two
+        return index
+
+    def first_built_year(self, never=0):
+        """
+        Year in which each pixel first became built-up.
+
+        :param never: Value used for pixels that are never built-up
+        :return: 2D int32 array of years
+        """
+        index = self.first_built_index()
+        lookup = np.array([int(y) for y in self.years] + [never], dtype=np.int32)
+        return lookup[index]  # Index -1 picks the trailing 'never' value
@@ -0,0 +1,150 @@
+from osgeo import gdal
+import numpy as np
+
+
+class RasterBlock:
+    """
+    One aligned block of every year raster.
+
+    :param xoff: Column offset of the block in the raster grid
+    :param yoff: Row offset of the block in the raster grid
+    :param data: 3D array of shape (years, ysize, xsize)
+    :param nodata: List of nodata values (or None) per year
+    """
+    def __init__(self, xoff, yoff, data, nodata):
+        self.xoff = xoff
+        self.yoff = yoff
+        self.data = data
+        self.nodata = nodata
+        self.ysize, self.xsize = data.shape[1:]
+
+    @property
+    def window(self):
+        """
+        :return: Tuple (xoff, yoff, xsize, ysize) of the block
+        """
+        return self.xoff, self.yoff, self.xsize, self.ysize
+
+    def valid(self):
+        """
+        :return: 3D boolean array, False where a year holds its nodata value
+        """
+        valid = np.ones(self.data.shape, dtype=bool)
+        for i, value in enumerate(self.nodata):
+            if value is not None:
+                valid[i] = self.data[i] != value
+        return valid
+
+
+class BlockRasterReader:
+    """
+    Streams aligned blocks of several rasters (one per year) with bounded memory.
+
+    Blocks follow the native tile/strip layout of the first raster so every compressed block is
+    decoded once. Thin strips are grouped until a block holds about max_pixels cells per raster.
+    Peak memory is therefore (number of rasters x max_pixels x item size), whatever the raster size.
+
+    :param raster_paths: List of raster file paths sharing the same grid
+    :param window: Optional (xoff, yoff, xsize, ysize) pixel window to restrict reading to
+    :param max_pixels: Upper bound on the number of cells of a block, per raster
+    :param cache: Optional RasterCache; blocks are then sliced from its memory-mapped windows
+                  instead of being decoded from the raster files
+    """
+    def __init__(self, raster_paths, window=None, max_pixels=4 * 1024 * 1024, cache=None):
+        self.raster_paths = raster_paths
+        self.datasets = [gdal.Open(path, gdal.GA_ReadOnly) for path in raster_paths]
+        for path, dataset in zip(raster_paths, self.datasets):
+            if dataset is None:
+                raise IOError(f"Unable to open raster: {path}")
+
+        self.bands = [dataset.GetRasterBand(1) for dataset in self.datasets]
+        self.nodata = [band.GetNoDataValue() for band in self.bands]
+        self.width = self.datasets[0].RasterXSize
+        self.height = self.datasets[0].RasterYSize
+
+        for path, dataset in zip(raster_paths, self.datasets):
+            if (dataset.RasterXSize, dataset.RasterYSize) != (self.width, self.height):
+                raise ValueError(f"Raster grid does not match the first raster: {path}")
+
+        self.window = self.clip_window(window or (0, 0, self.width, self.height))
+        self.max_pixels = max_pixels
+
+        # Memory-mapped (array, array window) per raster, when a cache is used
+        self.cached = None
+        if cache is not None and self.window[2] and self.window[3]:
+            self.cached = []
+            for i, path in enumerate(raster_paths):
+                array, array_window, nodata = cache.load(path, self.window)
+                self.cached.append((array, array_window))
+                self.nodata[i] = nodata
+
+    def clip_window(self, window):
+        """
+        Clips a pixel window to the raster bounds.
+
+        :param window: Tuple (xoff, yoff, xsize, ysize)
+        :return: Clipped tuple (xoff, yoff, xsize, ysize), possibly empty
+        """
+        xoff, yoff, xsize, ysize = window
+        x0 = min(max(int(xoff), 0), self.width)
+        y0 = min(max(int(yoff), 0), self.height)
+        x1 = min(max(int(xoff + xsize), 0), self.width)
+        y1 = min(max(int(yoff + ysize), 0), self.height)
+        return x0, y0, x1 - x0, y1 - y0
+
+    def read(self, x, y, cols, rows):
+        """
+        Reads one window of every raster, from the cache memory maps when available.
+
+        :return: 3D array of shape (rasters, rows, cols)
+        """
+        if self.cached is None:
+            return np.stack([band.ReadAsArray(x, y, cols, rows) for band in self.bands])
+
+        return np.stack([
+            array[y - array_window[1]:y - array_window[1] + rows, x - array_window[0]:x - array_window[0] + cols]
+            for array, array_window in self.cached
+        ])
+
+    def block_layout(self):
+        """
+        Block width and height used to walk the window: the native block size, with
+        strips (or tiles) stacked vertically while they stay under max_pixels.
+
+        :return: Tuple (block_width, block_height)
+        """
+        native_width, native_height = self.bands[0].GetBlockSize()
+        block_width = min(max(1, native_width), max(1, self.window[2]))
+        stacked = max(1, self.max_pixels // (block_width * max(1, native_height)))
+        return block_width, max(1, native_height) * stacked
+
+    def __len__(self):
+        xoff, yoff, xsize, ysize = self.window
+        if xsize == 0 or ysize == 0:
+            return 0
+        block_width, block_height = self.block_layout()
+        cols = (xoff + xsize - 1) // block_width - xoff // block_width + 1
+        rows = (yoff + ysize - 1) // block_height - yoff // block_height + 1
+        return cols * rows
+
+    def __iter__(self):
+        """
+        Yields RasterBlock objects covering the window in row-major order. Block edges snap
+        to the native block grid of the raster, so no compressed block is decoded twice.
+        """
+        xoff, yoff, xsize, ysize = self.window
+        if xsize == 0 or ysize == 0:
+            return
+        block_width, block_height = self.block_layout()
+
+        x_end, y_end = xoff + xsize, yoff + ysize
+        y = yoff
+        while y < y_end:
+            rows = min((y // block_height + 1) * block_height, y_end) - y
+            x = xoff
+            while x < x_end:
+                cols = min((x // block_width + 1) * block_width, x_end) - x
+                data = self.read(x, y, cols, rows)
+                yield RasterBlock(x, y, data, self.nodata)
+                x += cols
+            y += rows
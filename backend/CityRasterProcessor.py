@@ -1,27 +1,64 @@
 from .loadLayers import loadLayers
-from .SaveRasterImages import SaveRasterImages
+from .YearImageRenderer import YearImageRenderer
+from .IndexedYearImageWriter import IndexedYearImageWriter
 from .SaveOverLaidLayer import SaveOverLaidLayer
+from .FirstBuiltComposite import FirstBuiltComposite
 from .ZonalStatisticsProcessor import ZonalStatisticsProcessor
 from .BarGraph import BarGraph
 from .radarChart import radarChart
 from .DirectionalRingGenerator import DirectionalRingGenerator
 from .YearWiseZonalSectorStatsProcessor import YearWiseZonalSectorStatsProcessor
 from .LayoutImageExporter import LayoutImageExporter
+from .BitPackedStack import BitPackedStack
+from .RasterCache import RasterCache
+from .ResultsStore import ResultsStore
+from .RasterGrid import RasterGrid
+from .TransitionCounter import TransitionCounter
+from .PipelineFeedback import PipelineFeedback
+from .DialogFeedback import DialogFeedback
+from .StageScheduler import Stage, StageScheduler
+from .RunReport import RunReport
+from .ArtifactCache import ArtifactCache
+from .RunContext import RunContext
+from .ImageSizePolicy import ImageSizePolicy
+from .StagingFolder import StagingFolder
 
+import copy
 import os
-import shutil
-
-from qgis.PyQt.QtCore import QCoreApplication
 
 class CityRasterProcessor:
     """
     Main processor class for performing multiple geospatial operations on raster and vector layers
     including loading layers, saving images, generating statistics, and exporting visualizations.
+
+    The pipeline is a DAG of stages (see pipeline_stages) in three phases:
+    - prepare(): main thread, project work only; loads the layers, captures the image extent and
+      ring outlines and builds the sector labeller.
+    - compute(): input hashes, palette scan, year images of the 'indexed' writer and statistics
+      (stack, AOI and sector totals, transitions). With the numpy engine and a grid sector mode it
+      touches no project layer and may run in a background task.
+    - finish(): main thread; raster styling, year images of the 'qgis' writer, first built-up year
+      overlay image (from the stack), charts and layout export.
+
+    Outputs are written to a hidden staging folder ('.<city>.partial') that replaces the city
+    folder only once the run succeeds (see commit_output), so an interrupted run leaves the
+    previous results untouched. Stages producing files fingerprint their inputs and reuse the
+    files of an identical earlier run from the ArtifactCache ('bga_artifacts').
+
+    The layers, arrays and results of the run are kept on a RunContext passed to every stage;
+    no stage looks layers up by name in the project, so several cities can run at the same time.
     """
+    # Sizing policy and background of the year and overlay images (see ImageSizePolicy)
+    RENDER_SETTINGS = {'oversampling': 2.0, 'max_pixels': 25000000, 'min_size': 1000, 'background_color': (255, 255, 255, 0)}
+
     
-    def __init__(self, output_path, dlg, iface, city, raster_paths, aoi_path, labels, no_of_sectors, colors, centroid_point=None):
+    def __init__(self, output_path, dlg, iface, city, raster_paths, aoi_path, labels, no_of_sectors, colors, centroid_point=None, engine='qgis', sector_mode=None, workers=None, image_writer='indexed', feedback=None, auto_run=True):
         """
-        Initializes the processor and immediately triggers the full pipeline.
+        Initializes the processor and, unless auto_run is False, runs the full pipeline.
+
+        AOI totals and sector sums are kept in a ResultsStore ('bga_results.sqlite' in the base
+        output directory); on later runs only years whose raster, AOI, centroid or sector count
+        changed are computed again, and the charts and tables are rebuilt from the stored values.
 
         Parameters:
             output_path (str): Base output directory path.
@@ -34,15 +71,30 @@ class CityRasterProcessor:
             no_of_sectors (int): Number of sectors for directional statistics.
             colors (list): Color list for radar chart sectors.
             centroid_point (QgsPointXY, optional): Center point for directional rings.
+            engine (str, optional): Statistics engine, 'qgis' (default) or 'numpy'. The numpy engine
+                counts AOI totals in one pass and sector totals from a sector label grid; it also
+                keeps decoded raster windows in a persistent memory-mapped RasterCache.
+            sector_mode (str, optional): Overrides the sector statistics mode of
+                YearWiseZonalSectorStatsProcessor ('zonal', 'labels' or 'analytic').
+            workers (int, optional): Number of worker processes used by the numpy engine to reduce
+                the years in parallel. None or 1 keeps the single-pass serial reduction.
+            image_writer (str, optional): Year image writer, 'indexed' (default) writes 8-bit palette
+                PNGs straight from the raster windows (IndexedYearImageWriter); 'qgis' renders them
+                through the QGIS map renderer (YearImageRenderer).
+            feedback (PipelineFeedback, optional): Progress and cancellation channel. Defaults to
+                the dialog's progress bar. Stage timings, memory and throughput are recorded through
+                it into run_report and saved as 'run_report.json' in the city output folder.
+            auto_run (bool, optional): Runs run_all() right away (default). A CityRasterTask passes
+                False and drives the phases itself.
         """
-        self.output_path = os.path.join(output_path, city)
-        # Delete the folder if it exists
-        if os.path.exists(self.output_path):
-            shutil.rmtree(self.output_path)
-
-        # Create the folder
-        os.makedirs(self.output_path)
+        self.base_output_path = output_path
         self.city = city
+        self.staging = StagingFolder(output_path, city)
+        self.final_output_path = self.staging.final_path
+        self.recover_output()
+
+        # Outputs go to a fresh staging folder until commit_output()
+        self.output_path = self.staging.create()
         self.dlg = dlg
         self.iface = iface
         self.raster_paths = raster_paths
@@ -52,114 +104,531 @@ class CityRasterProcessor:
         self.no_of_sectors = no_of_sectors
         self.colors = colors
         self.centroid_point = centroid_point
-        self.run_all()
+        self.engine = engine
+        self.sector_mode = sector_mode or ('labels' if engine == 'numpy' else 'zonal')
+        self.workers = workers
+        if image_writer not in ('indexed', 'qgis'):
+            raise ValueError(f"Unknown image writer: {image_writer}")
+        self.image_writer = image_writer
+        # Layers, window, stack, year totals and sector areas of this run
+        self.context = RunContext(city, raster_paths, aoi_path, labels, no_of_sectors, colors, centroid_point)
+        self.layer_loader = None      # loadLayers of the run, set by load_layers
+        self.palette_values = None    # Palette values of the raster layers, set by scan_palettes
+        self.sector_processor = None  # YearWiseZonalSectorStatsProcessor, set by sector_statistics
+        self.renderer = None          # YearImageRenderer shared by the year and overlay images, see image_renderer
+        self.writer = None            # IndexedYearImageWriter shared by the year and overlay images, see indexed_writer
+        self.image_size = None        # Size of the year and overlay images, see render_settings
+        self.available = set()          # Artifacts produced by the stages run so far
+        self.run_report = RunReport(city, {
+            'engine': engine, 'sector_mode': self.sector_mode, 'workers': workers, 'image_writer': image_writer, 'sectors': no_of_sectors,
+            'years': list(labels), 'raster_paths': list(raster_paths), 'aoi_path': aoi_path
+        })
+        if feedback is None:
+            feedback = DialogFeedback(dlg) if dlg is not None else PipelineFeedback()
+        self.set_feedback(feedback)
+        self.cache = RasterCache() if engine == 'numpy' else None
+        self.store = ResultsStore(os.path.join(self.base_output_path, 'bga_results.sqlite'))
+        self.raster_hashes = None  # Content hash per raster, set by fingerprint_inputs
+        self.aoi_hash = None       # AOI geometry hash, set by fingerprint_inputs
+        self.artifacts = ArtifactCache(os.path.join(self.base_output_path, 'bga_artifacts'))
+        self.artifact_keys = {}    # Fingerprint of every artifact produced or reused by this run
+        self.report_path = None    # Path of the last saved run report, see save_run_report
+        if auto_run:
+            self.run_all()
+
+    def set_feedback(self, feedback):
+        """
+        Replaces the progress and cancellation channel, keeping the run report attached to it.
+        """
+        feedback.run_report = self.run_report
+        self.feedback = feedback
+
+    def save_run_report(self, failed=False):
+        """
+        Writes 'run_report.json' to the city output folder. The staging folder of a failed or
+        canceled run is deleted by the next run, so its report goes to the base output directory
+        instead, as '<city>_run_report.json'. The path is kept in report_path.
+
+        :param failed: True when the run failed or was canceled
+        :return: One-line summary of the run (see RunReport.summary)
+        """
+        if self.context.window is not None:
+            self.run_report.metadata['window'] = [int(v) for v in self.context.window]
+        try:
+            if failed:
+                self.report_path = self.run_report.save(self.base_output_path, f'{self.city}_run_report.json')
+            else:
+                self.report_path = self.run_report.save(self.output_path)
+                # The report of an earlier failed run is stale once the run succeeds
+                stale_path = os.path.join(self.base_output_path, f'{self.city}_run_report.json')
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+            print(f"[INFO] Run report saved: {self.report_path}")
+        except OSError as e:
+            print(f"[WARNING] Unable to save the run report: {e}")
+        summary = self.run_report.summary()
+        print(f"[INFO] {self.city}: {summary}")
+        return summary
+
+    def recover_output(self):
+        """
+        Restores the previous city folder when a run was interrupted between the two renames of
+        commit_output.
+        """
+        self.staging.recover()
+
+    def commit_output(self):
+        """
+        Replaces the city folder with the staging folder of this run. Both are renamed, never
+        deleted in place, so the city folder always holds a complete run (see StagingFolder).
+        """
+        if self.output_path == self.final_output_path:
+            return
+        self.output_path = self.staging.commit()
+
+    def reuse_or_build(self, key, params, targets, build):
+        """
+        Restores the files of an artifact from the ArtifactCache when its fingerprint matches,
+        otherwise builds and caches them.
+
+        :param key: Artifact name, also the stage part of the fingerprint
+        :param params: JSON-serializable dictionary of everything the files depend on
+        :param targets: Dictionary {role: output path} of the files
+        :param build: Callable writing the files
+        :return: True when the cached files were reused
+        """
+        reused = self.restore_artifact(key, params, targets)
+        if not reused:
+            build()
+            self.artifacts.store(self.artifact_keys[key], targets)
+        self.feedback.count_files(*targets.values())
+        return reused
+
+    def restore_artifact(self, key, params, targets):
+        """
+        Fingerprints an artifact and restores its files from the ArtifactCache when present.
+        Built files are then stored with self.artifacts.store(self.artifact_keys[key], targets).
+
+        :return: True when the cached files were restored
+        """
+        fingerprint = ArtifactCache.fingerprint(key.split(':')[0], params)
+        self.artifact_keys[key] = fingerprint
+        reused = self.artifacts.restore(fingerprint, targets)
+        if reused:
+            print(f"[INFO] Reusing cached {key}")
+            self.run_report.metadata.setdefault('reused', []).append(key)
+        return reused
+
+    def ring_params(self):
+        """
+        :return: Fingerprint parameters of the AOI outline and sector ring drawn on the images
+        """
+        return {
+            'aoi': self.aoi_hash,
+            'centroid': ResultsStore.centroid_key(self.centroid_point),
+            'sectors': self.no_of_sectors,
+        }
+
+    @property
+    def background_safe(self):
+        """
+        True when compute() does not touch project layers and can run outside the main thread.
+        The 'qgis' engine and the 'zonal' sector mode write zonal statistics into project layers.
+        """
+        return self.engine == 'numpy' and self.sector_mode != 'zonal'
 
     def load_layers(self):
         """
-        Loads raster and AOI layers into the QGIS project.
+        Loads raster and AOI layers into the QGIS project, in the layer group of the run, and keeps
+        them and the analysis window (the 'MultiRingsView' extent on the raster grid) on the run
+        context for the later stages. The rasters are styled later (see style_layers), once their
+        values have been scanned off the main thread.
         """
-        loadLayers(
-            self.iface,
-            self.raster_paths,
-            self.aoi_path,
-            self.city,
-            self.no_of_sectors,
-            self.noOfRasterLayers,
-            self.colors,
-            self.centroid_point
-        )
+        self.layer_loader = loadLayers(self.iface, self.context, self.cache, style=False)
+
+    def scan_palettes(self):
+        """
+        Scans the raster values within the analysis window for the layer styling; no project access.
+        """
+        self.palette_values = self.layer_loader.scan_palette_values()
+
+    def style_layers(self):
+        """
+        Applies the paletted styling of the raster layers from the scanned values.
+        """
+        self.layer_loader.apply_styling_raster(self.palette_values)
+
+    def build_stack(self):
+        """
+        Packs the binary year rasters of the analysis window into a BitPackedStack. The stack is
+        cached next to the city output folder (which is recreated on every run) and reused while
+        the rasters, years and window are unchanged.
+        """
+        cache_path = os.path.join(self.base_output_path, f'{self.city}_builtup_stack.npz')
+        modified = os.path.getmtime(cache_path) if os.path.exists(cache_path) else None
+        self.context.stack = BitPackedStack.load_or_build(cache_path, self.raster_paths, self.labels, self.context.window, self.cache, self.feedback)
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) != modified:
+            self.feedback.count_files(cache_path)
+
+    def fingerprint_inputs(self):
+        """
+        Hashes the raster contents within the analysis window and the AOI geometry, the keys of
+        the results store.
+        """
+        self.raster_hashes = [self.store.raster_hash(path, self.context.window, self.cache) for path in self.raster_paths]
+        self.aoi_hash = ResultsStore.geometry_hash(self.aoi_path)
+
+    def render_settings(self):
+        """
+        Image size (from the raster resolution over the ring extent, see ImageSizePolicy) and
+        background of the year and overlay images; part of their fingerprints.
+
+        :return: Dictionary {'image_size': (width, height), 'background_color': (R, G, B, A)}
+        """
+        if self.image_size is None:
+            settings = dict(self.RENDER_SETTINGS)
+            settings.pop('background_color')
+            self.image_size = ImageSizePolicy(**settings).for_context(self.context)
+            print(f"[INFO] Image size for {self.city}: {self.image_size[0]}x{self.image_size[1]} pixels")
+        return {'image_size': self.image_size, 'background_color': self.RENDER_SETTINGS['background_color']}
+
+    def prepare_images(self):
+        """
+        Captures on the main thread what the images need from the project: the image size over the
+        ring extent and, for the 'indexed' writer, the ring outlines, so that the year images can
+        then be written off the main thread.
+        """
+        self.render_settings()
+        if self.image_writer == 'indexed':
+            self.indexed_writer()
+
+    def image_renderer(self):
+        """
+        :return: YearImageRenderer of the run; its AOI and ring overlay is rendered once and
+                 shared by the year images and the overlay image
+        """
+        if self.renderer is None:
+            self.renderer = YearImageRenderer(self.context, self.output_path, **self.render_settings())
+        return self.renderer
+
+    def indexed_writer(self):
+        """
+        :return: IndexedYearImageWriter of the run; its outline and sampling are computed once and
+                 shared by the year images and the overlay image
+        """
+        if self.writer is None:
+            self.writer = IndexedYearImageWriter(self.context, self.output_path, cache=self.cache, **self.render_settings())
+        return self.writer
 
     def save_raster_images(self):
         """
-        Saves raster images one by one using SaveRasterImages.
+        Saves the raster image of every year, reusing the cached image of a year whose raster,
+        color, AOI, ring and render settings are unchanged. The other years are written
+        concurrently by IndexedYearImageWriter, or rendered by YearImageRenderer with the 'qgis'
+        image writer.
         """
-        for _ in range(self.noOfRasterLayers):
-            SaveRasterImages(self.city, self.output_path, self.labels)
+        colors = self.colors[::-1]  # Ascending year order, as applied by loadLayers
+        targets = []
+        missing = []
+        for i in range(self.noOfRasterLayers):
+            params = dict(self.ring_params(), raster=self.raster_hashes[i], color=colors[i], render=self.render_settings(), writer=self.image_writer)
+            targets.append({'image': os.path.join(self.output_path, f'{self.labels[i]}.png')})
+            if not self.restore_artifact(f'year_image:{self.labels[i]}', params, targets[i]):
+                missing.append(i)
+
+        writer = self.indexed_writer() if self.image_writer == 'indexed' else self.image_renderer()
+        writer.render(missing, self.feedback)
+        for i in range(self.noOfRasterLayers):
+            if i in missing:
+                self.artifacts.store(self.artifact_keys[f'year_image:{self.labels[i]}'], targets[i])
+            self.feedback.count_files(*targets[i].values())
 
     def save_overlay_layer(self):
         """
-        Saves a composite image by overlaying all raster and AOI layers.
+        Saves the growth epochs: the first built-up year of every pixel, reduced from the stack
+        (FirstBuiltComposite), as a GeoTIFF and as the overlay image with the AOI and ring.
         """
-        SaveOverLaidLayer(self.city, self.noOfRasterLayers, self.output_path)
+        params = dict(self.ring_params(), rasters=self.raster_hashes, colors=self.colors, render=self.render_settings(),
+                      writer=self.image_writer)
+        targets = {
+            'image': os.path.join(self.output_path, f'{self.city}_AOI.png'),
+            'composite': os.path.join(self.output_path, f'{self.city}_first_built.tif')
+        }
+
+        def build():
+            composite = FirstBuiltComposite(self.context, self.cache)
+            composite.save(targets['composite'])
+            if self.image_writer == 'indexed':
+                self.indexed_writer().write_composite(targets['image'], composite)
+            else:
+                SaveOverLaidLayer(self.context, self.output_path, self.image_renderer().overlay(),
+                                  composite_path=targets['composite'])
+
+        self.reuse_or_build('overlay_image', params, targets, build)
 
     def yearArea(self):
         """
         Performs zonal statistics to calculate built-up area for each year.
+        Years already in the results store are reused; only the others are computed and stored.
         """
-        ZonalStatisticsProcessor(self.raster_paths, self.aoi_path)
+        totals = self.store.aoi_totals(self.raster_hashes, self.aoi_hash, self.engine)
+        missing = [i for i, total in enumerate(totals) if total is None]
+
+        if missing:
+            processor = ZonalStatisticsProcessor(
+                [self.raster_paths[i] for i in missing],
+                self.aoi_path,
+                [self.labels[i] for i in missing],
+                self.engine,
+                self.context.window,
+                self.cache,
+                self.workers,
+                self.feedback,
+                layer=self.context.aoi_layer
+            )
+            for i, total in zip(missing, processor.totals.tolist()):
+                totals[i] = total
+                self.store.save_aoi_total(self.raster_hashes[i], self.aoi_hash, self.engine, total)
+
+        print(f"[INFO] AOI totals: {len(totals) - len(missing)} reused, {len(missing)} computed")
+        self.context.year_totals = dict(zip(self.labels, totals))
 
     def generate_bar_graph(self):
         """
         Generates and saves a bar graph showing built-up area by year.
         """
-        obj_bargraph = BarGraph(self.labels, self.city, self.noOfRasterLayers, self.output_path)
-        obj_bargraph.plot_chart()
+        def build():
+            obj_bargraph = BarGraph(self.labels, self.city, self.noOfRasterLayers, self.output_path, self.context.year_totals)
+            obj_bargraph.plot_chart()
 
-    def generate_radar_chart(self):
+        params = {'years': self.labels, 'totals': [self.context.year_totals[label] for label in self.labels]}
+        self.reuse_or_build('bar_graph', params, {'image': os.path.join(self.output_path, 'barGraph.png')}, build)
+
+    def create_sector_processor(self, aoi_totals=None, known_sums=None):
         """
-        Generates directional radar charts representing built-up area spread per sectors.
+        :param aoi_totals: Optional AOI built-up pixel counts keyed by year
+        :param known_sums: Optional sector sums already computed, keyed by raster path
+        :return: YearWiseZonalSectorStatsProcessor of the run
         """
-        obj_ring_gen = DirectionalRingGenerator(self.iface, self.city, self.no_of_sectors, self.centroid_point)
-
-        if self.centroid_point is None:
-            centroid = obj_ring_gen.get_centroid()
-        else:
-            centroid = self.centroid_point
-
-        obj_yr_zonal_stats = YearWiseZonalSectorStatsProcessor(
+        return YearWiseZonalSectorStatsProcessor(
             self.iface,
             self.city,
             self.raster_paths[::-1],
             self.labels[::-1],
             self.no_of_sectors,
             self.centroid_point,
-            self.output_path
+            self.output_path,
+            self.context,
+            aoi_totals=aoi_totals,
+            mode=self.sector_mode,
+            window=self.context.window,
+            cache=self.cache,
+            workers=self.workers,
+            known_sums=known_sums,
+            feedback=self.feedback
         )
 
-        each_zonal_stats = obj_yr_zonal_stats.run()
-        datasets = [list(attr.values()) for attr in each_zonal_stats]
-
-        radarChart(
-            city=self.city,
-            raster_paths=self.raster_paths[::-1],
-            centroid=centroid,
-            datasets=datasets,
-            titles=self.labels[::-1],
-            no_of_sectors=self.no_of_sectors,
-            colors=self.colors,
-            output_path=self.output_path
-        )
+    def prepare_sectors(self):
+        """
+        Main thread: generates the sector ring layer and captures the sector labeller on the run
+        context, so that the sector statistics (grid modes) and the transition tables no longer
+        need the project.
+        """
+        self.create_sector_processor().sector_labeller(RasterGrid(self.raster_paths[0]))
+
+    def sector_statistics(self):
+        """
+        Computes the built-up area of every sector for each year, reusing the sums already in the
+        results store, and writes 'sectoralWiseStats.xlsx'.
+        """
+        # Sector sums already stored for these inputs, keyed by raster path
+        centroid_key = ResultsStore.centroid_key(self.centroid_point)
+        known_sums = {}
+        for path, raster_hash in zip(self.raster_paths, self.raster_hashes):
+            sums = self.store.sector_sums(raster_hash, self.aoi_hash, centroid_key, self.no_of_sectors, self.sector_mode)
+            if sums is not None:
+                known_sums[path] = sums
+
+        self.sector_processor = self.create_sector_processor(self.context.year_totals, known_sums)
+        self.context.zonal_stats = self.sector_processor.run()
+        self.feedback.count_files(os.path.join(self.output_path, 'sectoralWiseStats.xlsx'))
+
+        for path, raster_hash in zip(self.raster_paths, self.raster_hashes):
+            if path not in known_sums:
+                self.store.save_sector_sums(raster_hash, self.aoi_hash, centroid_key, self.no_of_sectors,
+                                            self.sector_mode, self.sector_processor.sector_sums[path])
+        print(f"[INFO] Sector sums: {len(known_sums)} reused, {len(self.raster_paths) - len(known_sums)} computed")
+
+    def generate_radar_chart(self):
+        """
+        Generates directional radar charts representing built-up area spread per sectors.
+        """
+        datasets = [list(attr.values()) for attr in self.context.zonal_stats]
+
+        def build():
+            obj_ring_gen = DirectionalRingGenerator(self.iface, self.city, self.no_of_sectors, self.centroid_point,
+                                                    context=self.context)
+
+            if self.centroid_point is None:
+                centroid = obj_ring_gen.get_centroid()
+            else:
+                centroid = self.centroid_point
+
+            radarChart(
+                city=self.city,
+                raster_paths=self.raster_paths[::-1],
+                centroid=centroid,
+                datasets=datasets,
+                titles=self.labels[::-1],
+                no_of_sectors=self.no_of_sectors,
+                colors=self.colors,
+                output_path=self.output_path
+            )
+
+        params = dict(self.ring_params(), datasets=datasets, years=self.labels, colors=self.colors)
+        self.reuse_or_build('radar_chart', params, {'image': os.path.join(self.output_path, 'radarChart.png')}, build)
+
+    def transition_tables(self):
+        """
+        Counts stable, new and lost built-up pixels between consecutive years, per sector and for
+        the whole AOI, and saves them next to 'sectoralWiseStats.xlsx'.
+        """
+        def build():
+            grid = RasterGrid(self.raster_paths[0])
+            _, labeller, sector_names = self.context.sector_labeller
+            labeller = copy.copy(labeller)  # Own OGR layer, the sector statistics may run concurrently
+            counter = TransitionCounter(self.context.stack, grid, labeller, sector_names, self.aoi_path,
+                                        feedback=self.feedback)
+            counter.save(self.output_path, os.path.basename(path))
+
+        path = os.path.join(self.output_path, 'sectoralTransitions.xlsx')
+        params = dict(self.ring_params(), rasters=self.raster_hashes, years=self.labels, mode=self.sector_mode,
+                      window=self.context.window)
+        self.reuse_or_build('transitions', params, {'table': path}, build)
+        print(f"[INFO] Transition table saved: {path}")
 
     def export_layout(self):
         """
-        Exports a pre-designed QGIS layout as an image.
+        Exports a pre-designed QGIS layout as an image. Reused when the city name, totals and
+        every image placed on the layout are unchanged.
+        """
+        params = {
+            'city': self.city,
+            'years': self.labels,
+            'totals': [self.context.year_totals[label] for label in self.labels],
+            'images': {key: fingerprint for key, fingerprint in self.artifact_keys.items()
+                       if key.startswith('year_image:') or key in ('overlay_image', 'bar_graph', 'radar_chart')},
+        }
+        targets = {
+            'growth_rate': os.path.join(self.output_path, 'Growth Rate Analysis.png'),
+            'jpeg': os.path.join(self.output_path, f'{self.city}_UBA.jpeg'),
+            'pdf': os.path.join(self.output_path, f'{self.city}_UBA.pdf'),
+        }
+        self.reuse_or_build('layout', params, targets, lambda: LayoutImageExporter(
+            self.output_path, self.labels, self.noOfRasterLayers, self.city, self.context.year_totals,
+            self.context.aoi_layer))
+
+    def release_layers(self):
+        """
+        Removes the project layers and the layer group added by this run.
+        """
+        self.context.release()
+
+    def pipeline_stages(self):
+        """
+        The pipeline as a DAG of stages. Artifact names only express dependencies; the results
+        themselves are kept on the run context. Rendering and anything reading or writing project
+        layers runs on the main thread; the statistics run in a thread pool when background_safe.
+
+        :return: List of Stage objects, grouped in the phases 'prepare', 'compute' and 'finish'
+        """
+        background = self.background_safe
+        # The indexed writer reads the rasters only; the QGIS renderer needs the styled layers
+        if self.image_writer == 'indexed':
+            render_years = Stage('render_years', self.save_raster_images, inputs=('image_settings', 'hashes'),
+                                 outputs=('year_images',), weight=20, phase='compute')
+        else:
+            render_years = Stage('render_years', self.save_raster_images, inputs=('image_settings', 'hashes', 'styled'),
+                                 outputs=('year_images',), main_thread=True, weight=20, phase='finish')
+        return [
+            Stage('load_layers', self.load_layers, outputs=('layers', 'window'),
+                  main_thread=True, weight=5, phase='prepare'),
+            Stage('image_settings', self.prepare_images, inputs=('layers', 'window'), outputs=('image_settings',),
+                  main_thread=True, weight=1, phase='prepare'),
+            Stage('sector_layer', self.prepare_sectors, inputs=('layers', 'window'), outputs=('sector_labeller',),
+                  main_thread=True, weight=1, phase='prepare'),
+            Stage('fingerprint', self.fingerprint_inputs, inputs=('window',), outputs=('hashes',),
+                  weight=3, phase='compute'),
+            Stage('palette', self.scan_palettes, inputs=('window',), outputs=('palette',),
+                  weight=4, phase='compute'),
+            render_years,
+            Stage('stack', self.build_stack, inputs=('window',), outputs=('stack',),
+                  weight=7, phase='compute'),
+            Stage('aoi_statistics', self.yearArea, inputs=('hashes', 'window'), outputs=('year_totals',),
+                  main_thread=not background, weight=10, phase='compute'),
+            Stage('sector_statistics', self.sector_statistics, inputs=('hashes', 'sector_labeller', 'year_totals'),
+                  outputs=('zonal_stats',), main_thread=not background, weight=20, phase='compute'),
+            Stage('transitions', self.transition_tables, inputs=('stack', 'sector_labeller'), outputs=('transitions',),
+                  weight=10, phase='compute'),
+            Stage('style_layers', self.style_layers, inputs=('layers', 'palette'), outputs=('styled',),
+                  main_thread=True, weight=1, phase='finish'),
+            Stage('render_overlay', self.save_overlay_layer, inputs=('image_settings', 'hashes', 'stack'),
+                  outputs=('overlay_image',), main_thread=True, weight=5, phase='finish'),
+            Stage('bar_graph', self.generate_bar_graph, inputs=('year_totals',), outputs=('bar_graph',),
+                  main_thread=True, weight=5, phase='finish'),
+            Stage('radar_chart', self.generate_radar_chart, inputs=('zonal_stats',), outputs=('radar_chart',),
+                  main_thread=True, weight=5, phase='finish'),
+            Stage('layout', self.export_layout,
+                  inputs=('year_totals', 'year_images', 'overlay_image', 'bar_graph', 'radar_chart'), outputs=('layout',),
+                  main_thread=True, weight=4, phase='finish'),
+        ]
+
+    def scheduler(self):
+        return StageScheduler(self.pipeline_stages(), self.feedback)
+
+    def prepare(self):
+        """
+        Main-thread phase, limited to the project work: loads the layers, captures the image
+        extent and prepares the sector statistics. The input hashes, palette scan and image I/O
+        run in compute(), off the main thread when background_safe.
         """
-        LayoutImageExporter(self.output_path, self.labels, self.noOfRasterLayers, self.city)
+        self.available = self.scheduler().run(('prepare',))
+
+    def compute(self):
+        """
+        Hashing, palette scan, indexed year images and statistics; runs in a background task when
+        background_safe is True.
+        """
+        self.available = self.scheduler().run(('compute',), self.available)
+
+    def finish(self):
+        """
+        Main-thread phase: raster styling, overlay image, charts and layout export, then the staging folder replaces the city
+        folder. The run report is saved even when a stage fails.
+        """
+        failed = True
+        try:
+            self.available = self.scheduler().run(('finish',), self.available)
+            failed = False
+        finally:
+            self.store.close()
+            self.save_run_report(failed)
+        self.commit_output()
+        self.feedback.report(100)
 
     def run_all(self):
         """
-        Executes the entire processing pipeline in sequence and updates the progress bar in the UI.
-        """
-        self.load_layers()
-        QCoreApplication.processEvents()
-        self.dlg.progressBar.setValue(10)
-        
-        self.save_raster_images()
-        QCoreApplication.processEvents()
-        self.dlg.progressBar.setValue(30)
-        
-        self.save_overlay_layer()
-        QCoreApplication.processEvents()
-        self.dlg.progressBar.setValue(35)
-        
-        self.yearArea()
-        
-        self.generate_bar_graph()
-        QCoreApplication.processEvents()
-        self.dlg.progressBar.setValue(55)
-        
-        self.generate_radar_chart()
-        QCoreApplication.processEvents()
-        self.dlg.progressBar.setValue(85)
-        
-        self.export_layout()
\ No newline at end of file
+        Executes the entire pipeline from the calling (main) thread. Independent stages overlap:
+        the statistics run in worker threads while the images are rendered.
+        The staging folder replaces the city folder once every stage succeeded; the run report
+        is saved even when a stage fails.
+        """
+        failed = True
+        try:
+            self.available = self.scheduler().run()
+            failed = False
+        finally:
+            self.store.close()
+            self.save_run_report(failed)
+        self.commit_output()
+        self.feedback.report(100)
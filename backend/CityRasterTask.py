@@ -0,0 +1,227 @@
+import os
+
+from qgis.core import QgsApplication, QgsTask, QgsMessageLog, Qgis
+from qgis.PyQt.QtCore import QCoreApplication
+
+from .CityRasterProcessor import CityRasterProcessor
+from .DialogFeedback import DialogFeedback
+from .PipelineFeedback import PipelineFeedback, PipelineCanceled
+
+
+class TaskFeedback(PipelineFeedback):
+    """
+    Forwards the pipeline progress to a QgsTask and reads its cancellation flag. Phases driven
+    from the main thread keep QGIS responsive while they wait for background stages.
+
+    :param task: QgsTask running the pipeline
+    """
+    def __init__(self, task):
+        super().__init__()
+        self.task = task
+
+    def report(self, progress):
+        self.task.setProgress(progress)
+
+    def idle(self):
+        if DialogFeedback.on_main_thread():
+            QCoreApplication.processEvents()
+
+    def is_canceled(self):
+        return self.canceled or self.task.isCanceled()
+
+
+class CityRasterTask(QgsTask):
+    """
+    Runs the statistics phase of a CityRasterProcessor in the QGIS task manager, so QGIS stays
+    responsive and the run can be canceled from the task bar (it stops between blocks or years).
+
+    prepare() must already have run on the main thread; it only loads the project layers, the
+    input hashing and image I/O are part of compute(). finished() is called back on the main
+    thread and runs the phases that touch the project: finish(), and also compute() when the
+    processor is not background_safe.
+
+    :param processor: CityRasterProcessor created with auto_run=False
+    :param on_done: Optional callback receiving the task once it has finished or failed
+    """
+    def __init__(self, processor, on_done=None):
+        super().__init__(f'BGA: {processor.city}', QgsTask.CanCancel)
+        self.processor = processor
+        self.on_done = on_done
+        self.error = None
+        processor.set_feedback(TaskFeedback(self))
+
+    def run(self):
+        """
+        Background thread: no QgsProject or iface access here.
+        """
+        if not self.processor.background_safe:
+            return True
+        try:
+            self.processor.compute()
+            return True
+        except PipelineCanceled:
+            return False
+        except Exception as e:
+            self.error = e
+            return False
+
+    def finished(self, result):
+        """
+        Main thread: runs the remaining stages and reports the outcome, with the run report
+        summary, on the message bar.
+        """
+        iface = self.processor.iface
+        try:
+            if result:
+                if not self.processor.background_safe:
+                    self.processor.compute()
+                self.processor.finish()
+                message = f"Output Folder saved at {self.processor.output_path} ({self.processor.run_report.summary()})"
+                level = Qgis.Success
+            elif self.error is not None:
+                self.processor.save_run_report(failed=True)
+                message, level = f"{self.processor.city}: {self.error}", Qgis.Critical
+            else:
+                self.processor.save_run_report(failed=True)
+                message, level = f"{self.processor.city}: run canceled", Qgis.Warning
+        except PipelineCanceled:
+            self.processor.save_run_report(failed=True)
+            message, level = f"{self.processor.city}: run canceled", Qgis.Warning
+        except Exception as e:
+            self.error = e
+            self.processor.save_run_report(failed=True)
+            message, level = f"{self.processor.city}: {e}", Qgis.Critical
+
+        if level != Qgis.Success and self.processor.report_path:
+            message += f" (run report: {self.processor.report_path})"
+
+        QgsMessageLog.logMessage(message, 'BGA', level)
+        if iface is not None:
+            iface.messageBar().pushMessage("BGA", message, level=level)
+        if self.on_done is not None:
+            self.on_done(self)
+
+
+class CityRunQueue:
+    """
+    Queues city runs so that a new city can be submitted while others are processing.
+
+    Every run keeps its layers on its own RunContext, in a layer group named after the city, so
+    runs no longer clash on layer names: up to max_running cities are processed at the same time
+    and the layers of finished cities stay in the project. prepare() (layer loading only) runs on
+    the main thread, one city after the other.
+
+    Two runs of the same city folder never overlap: they would share the staging folder
+    ('.<city>.partial') that a starting run recreates. A run submitted while the same city
+    folder is running or queued waits until the earlier run is done.
+
+    :param progress_callback: Optional callable receiving the mean progress (0-100) of the running cities
+    :param max_running: Maximum number of cities processed at the same time (default: 2)
+    """
+    def __init__(self, progress_callback=None, max_running=2):
+        if max_running < 1:
+            raise ValueError("max_running must be at least 1.")
+
+        self.progress_callback = progress_callback
+        self.max_running = max_running
+        self.pending = []      # Keyword arguments of the CityRasterProcessor runs not started yet
+        self.running = []      # Running CityRasterTasks
+        self.manager_connected = False  # Task manager progress relayed to report_progress
+
+    def report_progress(self, *args):
+        """
+        Passes the mean progress of the running cities to progress_callback. Connected to the
+        progress of every task and to the task manager; calls from task threads are ignored, as
+        the task manager relays the progress of running tasks on the main thread.
+        """
+        if self.progress_callback is None or not self.running or not DialogFeedback.on_main_thread():
+            return
+        self.progress_callback(sum(task.progress() for task in self.running) / len(self.running))
+
+    def __len__(self):
+        return len(self.pending) + len(self.running)
+
+    @staticmethod
+    def city_folder(output_path, city):
+        """
+        :return: Normalized path of the output folder of a city, identifying its runs
+        """
+        return os.path.normcase(os.path.abspath(os.path.join(output_path, city)))
+
+    def running_folders(self):
+        return {self.city_folder(task.processor.base_output_path, task.processor.city) for task in self.running}
+
+    def submit(self, **kwargs):
+        """
+        Queues a city run; it starts right away when fewer than max_running cities are running
+        and no run of the same city folder is running or queued before it.
+
+        :param kwargs: Keyword arguments of CityRasterProcessor
+        """
+        folder = self.city_folder(kwargs['output_path'], kwargs['city'])
+        busy = self.running_folders() | {self.city_folder(job['output_path'], job['city']) for job in self.pending}
+        if folder in busy:
+            print(f"[WARNING] {kwargs['city']} is already running or queued; the new run waits for it")
+        self.pending.append(kwargs)
+        self.start_next()
+
+    def next_runnable(self):
+        """
+        Removes and returns the first queued run whose city folder is not running, or None.
+        """
+        running = self.running_folders()
+        for i, kwargs in enumerate(self.pending):
+            if self.city_folder(kwargs['output_path'], kwargs['city']) not in running:
+                return self.pending.pop(i)
+        return None
+
+    def start_next(self):
+        """
+        Prepares the next queued cities on the main thread and hands their statistics to the task manager.
+        """
+        if self.progress_callback is not None and not self.manager_connected:
+            QgsApplication.taskManager().progressChanged.connect(self.report_progress)
+            self.manager_connected = True
+
+        while self.pending and len(self.running) < self.max_running:
+            kwargs = self.next_runnable()
+            if kwargs is None:
+                break
+            processor = CityRasterProcessor(auto_run=False, **kwargs)
+            task = CityRasterTask(processor, on_done=self.task_done)
+            task.progressChanged.connect(self.report_progress)
+
+            self.running.append(task)  # Counted in the progress while it prepares
+            try:
+                processor.prepare()
+            except Exception as e:
+                self.running.remove(task)
+                self.prepare_failed(processor, e)
+                continue
+
+            QgsApplication.taskManager().addTask(task)
+
+    @staticmethod
+    def prepare_failed(processor, error):
+        """
+        Cleans up a run whose prepare() failed, as CityRasterTask.finished does for a failed task:
+        its layers are removed, the results store closed and the failure report saved.
+        """
+        try:
+            processor.release_layers()
+        finally:
+            processor.store.close()
+            processor.save_run_report(failed=True)
+
+        message = f"{processor.city}: {error}"
+        if processor.report_path:
+            message += f" (run report: {processor.report_path})"
+        print(f"[ERROR] {message}")
+        QgsMessageLog.logMessage(message, 'BGA', Qgis.Critical)
+        if processor.iface is not None:
+            processor.iface.messageBar().pushMessage("BGA", message, level=Qgis.Critical)
+
+    def task_done(self, task):
+        if task in self.running:
+            self.running.remove(task)
+        self.start_next()
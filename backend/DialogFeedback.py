@@ -0,0 +1,27 @@
+from qgis.PyQt.QtCore import QCoreApplication, QThread
+
+from .PipelineFeedback import PipelineFeedback
+
+
+class DialogFeedback(PipelineFeedback):
+    """
+    Shows the pipeline progress on the plugin dialog's progress bar. Progress reported from
+    worker threads is shown the next time the main thread reports or waits.
+
+    :param dlg: Plugin dialog with a 'progressBar' widget
+    """
+    def __init__(self, dlg):
+        super().__init__()
+        self.dlg = dlg
+
+    @staticmethod
+    def on_main_thread():
+        return QThread.currentThread() == QCoreApplication.instance().thread()
+
+    def report(self, progress):
+        if self.on_main_thread():
+            self.dlg.progressBar.setValue(int(progress))
+            QCoreApplication.processEvents()
+
+    def idle(self):
+        self.report(self.progress())
@@ -0,0 +1,77 @@
+from osgeo import gdal
+import numpy as np
+
+from .BitPackedStack import BitPackedStack
+from .RasterGrid import RasterGrid
+
+
+class FirstBuiltComposite:
+    """
+    The growth epochs of a run as one classified raster: every pixel of the analysis window holds
+    the year it first became built-up (0 when never built), reduced from the BitPackedStack with
+    bitwise operations instead of painting every year over the previous ones.
+
+    It is the picture the overlay image used to build by overdraw (the earliest year drawn last,
+    on top), so it is rendered once whatever the number of years, and it is saved as a paletted
+    GeoTIFF that can be reused as GIS data.
+
+    :param context: RunContext of the run; its stack is used when already built
+    :param cache: Optional RasterCache used when the stack has to be built
+    """
+    NEVER = 0
+
+    def __init__(self, context, cache=None):
+        self.context = context
+        self.stack = context.stack
+        if self.stack is None:
+            self.stack = BitPackedStack.build(context.raster_paths, context.years, context.window, cache)
+        self.years = self.stack.years
+        self.window = self.stack.window
+
+    def first_built_year(self):
+        """
+        :return: 2D uint16 array of the window, first built-up year or 0
+        """
+        return self.stack.first_built_year(never=self.NEVER).astype(np.uint16)
+
+    def classes(self):
+        """
+        :return: 2D uint8 array of the window, 1 + index of the first built-up year or 0
+        """
+        return (self.stack.first_built_index() + 1).astype(np.uint8)
+
+    def colors(self):
+        """
+        :return: List of (R, G, B, A) year colors, ascending year order
+        """
+        colors = self.context.colors[::-1]  # Ascending year order, as applied by loadLayers
+        return [tuple(int(value) for value in color.split(',')) for color in colors]
+
+    def save(self, path):
+        """
+        Saves the first built-up years as a GeoTIFF on the raster grid, with 0 as nodata and the
+        year colors as color table.
+
+        :param path: Output GeoTIFF path
+        :return: path
+        """
+        target = RasterGrid(self.context.raster_paths[0]).create_target(gdal.GDT_UInt16, self.window)
+        band = target.GetRasterBand(1)
+        band.WriteArray(self.first_built_year())
+        band.SetNoDataValue(self.NEVER)
+        band.SetDescription('First built-up year')
+
+        table = gdal.ColorTable()
+        table.SetColorEntry(self.NEVER, (0, 0, 0, 0))
+        for year, color in zip(self.years, self.colors()):
+            table.SetColorEntry(int(year), color)
+        band.SetRasterColorTable(table)
+        band.SetRasterColorInterpretation(gdal.GCI_PaletteIndex)
+
+        dataset = gdal.GetDriverByName('GTiff').CreateCopy(path, target, options=['TILED=YES', 'COMPRESS=DEFLATE'])
+        if dataset is None:
+            raise OSError(f"Unable to save raster: {path}")
+        dataset.FlushCache()
+        dataset = None
+        print(f"[INFO] First built-up year raster saved: {path}")
+        return path
@@ -0,0 +1,231 @@
+"""
+Computational core of the analysis: sector assignment, built-up counts, area conversion, growth
+rates (transition tables are in TransitionCounter). It only depends on NumPy and the GDAL/OGR
+readers, never on QgsProject, iface or the dialog, so it runs in worker processes, notebooks and
+tests; the QGIS classes (DirectionalRingGenerator, ZonalStatisticsProcessor,
+YearWiseZonalSectorStatsProcessor, ...) are adapters around it.
+"""
+import math
+import numpy as np
+
+from .AnalyticSectorBinner import AnalyticSectorBinner, sector_names
+from .BlockRasterReader import BlockRasterReader
+from .PipelineFeedback import PipelineFeedback
+from .RasterGrid import RasterGrid
+from .YearStatsWorkers import (
+    WedgeSectorLabeller, YearProcessPool, block_sector_sums, year_aoi_total, year_sector_sums
+)
+
+PIXEL_AREA = 900  # m², 30 m x 30 m Landsat pixel
+
+
+def pixels_to_km2(pixels, pixel_area=PIXEL_AREA):
+    """
+    :param pixels: Pixel count (number or NumPy array)
+    :param pixel_area: Area of one pixel in m²
+    :return: Area in km²
+    """
+    return pixels * pixel_area / 1000000
+
+
+def growth_rates(values, empty=0.0):
+    """
+    Growth (%) between consecutive values, e.g. the built-up areas of consecutive years.
+
+    :param values: Values in year order
+    :param empty: Rate returned when the previous value is 0
+    :return: List of len(values) - 1 rates
+    """
+    return [(curr - prev) / prev * 100 if prev != 0 else empty for prev, curr in zip(values, values[1:])]
+
+
+def aoi_center(geometry):
+    """
+    Center of an AOI: its centroid, or a point on its surface when the centroid falls outside.
+
+    :param geometry: OGR polygon geometry
+    :return: Tuple (x, y)
+    """
+    centroid = geometry.Centroid()
+    if not centroid.Within(geometry):
+        centroid = geometry.PointOnSurface()
+    return centroid.GetX(), centroid.GetY()
+
+
+class SectorRing:
+    """
+    The ring of directional sectors around a center: a regular polygon with a vertex on every
+    sector boundary, split into one triangular wedge per sector.
+
+    Sector i spans the angles [i * width - offset, (i + 1) * width - offset) counter-clockwise
+    from east. Statistics sectors are centered on their direction (offset = half a sector); view
+    sectors start at east (offset = 0).
+
+    :param center_x: X coordinate of the center
+    :param center_y: Y coordinate of the center
+    :param no_of_sectors: Number of directional sectors (4, 8 or 16)
+    :param radius: Distance from the center to the polygon vertices
+    :param view: True for the view ring, False for the statistics ring
+    """
+    def __init__(self, center_x, center_y, no_of_sectors, radius, view=False):
+        self.names = sector_names(no_of_sectors)
+        self.center_x = center_x
+        self.center_y = center_y
+        self.no_of_sectors = no_of_sectors
+        self.radius = radius
+        self.view = view
+        self.sector_width = 360 / no_of_sectors
+        self.offset = 0 if view else self.sector_width / 2
+
+    @classmethod
+    def around(cls, center_x, center_y, bounds, no_of_sectors, view=False):
+        """
+        Ring enclosing a bounding box: the radius is the largest distance from the center to
+        a corner, plus the buffer keeping the corners inside the polygon edges.
+
+        :param bounds: Tuple (xmin, ymin, xmax, ymax), e.g. of the AOI
+        """
+        xmin, ymin, xmax, ymax = bounds
+        radius = max(math.dist((center_x, center_y), corner)
+                     for corner in ((xmin, ymin), (xmax, ymin), (xmin, ymax), (xmax, ymax)))
+        buffer = radius - radius * math.cos(math.radians(180 / no_of_sectors))
+        return cls(center_x, center_y, no_of_sectors, radius + buffer, view)
+
+    @classmethod
+    def from_aoi(cls, vector_path, no_of_sectors, center=None, view=False):
+        """
+        Ring around the AOI of a vector file, read with OGR.
+
+        :param center: Optional (x, y) center; the AOI center (see aoi_center) by default
+        """
+        layer = RasterGrid.open_vector(vector_path).GetLayer(0)
+        if center is None:
+            feature = layer.GetNextFeature()
+            if feature is None or feature.GetGeometryRef() is None:
+                raise ValueError(f"No AOI polygon in {vector_path}")
+            center = aoi_center(feature.GetGeometryRef())
+        xmin, xmax, ymin, ymax = layer.GetExtent()
+        return cls.around(center[0], center[1], (xmin, ymin, xmax, ymax), no_of_sectors, view)
+
+    def vertices(self):
+        """
+        :return: List of (x, y) polygon vertices; vertex i is at the start angle of sector i
+        """
+        return [
+            (self.center_x + self.radius * math.cos(math.radians(i * self.sector_width - self.offset)),
+             self.center_y + self.radius * math.sin(math.radians(i * self.sector_width - self.offset)))
+            for i in range(self.no_of_sectors)
+        ]
+
+    def wedges(self):
+        """
+        :return: List of (direction name, closed ring of (x, y) points) tuples, in sector id order
+        """
+        center = (self.center_x, self.center_y)
+        vertices = self.vertices()
+        return [
+            (name, [center, vertices[i], vertices[(i + 1) % self.no_of_sectors], center])
+            for i, name in enumerate(self.names)
+        ]
+
+    def wkt_values(self):
+        """
+        :return: List of (polygon WKT, sector id) pairs; ids start at 1
+        """
+        return [
+            ('POLYGON ((' + ', '.join(f'{x!r} {y!r}' for x, y in points) + '))', sector_id)
+            for sector_id, (_, points) in enumerate(self.wedges(), start=1)
+        ]
+
+    def bounds(self):
+        return (self.center_x - self.radius, self.center_y - self.radius,
+                self.center_x + self.radius, self.center_y + self.radius)
+
+    def binner(self, geotransform):
+        """
+        :return: AnalyticSectorBinner of the ring on a raster grid
+        """
+        return AnalyticSectorBinner(self.center_x, self.center_y, self.no_of_sectors, self.radius, geotransform, self.offset)
+
+    def labeller(self, grid):
+        """
+        :param grid: RasterGrid of the year rasters
+        :return: WedgeSectorLabeller burning the wedges
+        """
+        return WedgeSectorLabeller(grid, self.wkt_values())
+
+
+def aoi_totals(raster_paths, vector_path, window=None, cache=None, workers=None, feedback=None):
+    """
+    Built-up pixels of every raster inside the AOI. Only the blocks of the AOI extent (within
+    window) are read; the AOI mask is burnt per block and all years of a block are reduced
+    together, or one year per worker process when workers > 1. Nodata cells are excluded.
+
+    :param raster_paths: Year raster paths sharing the same grid
+    :param vector_path: Path of the AOI vector file
+    :param window: Optional pixel window (xoff, yoff, xsize, ysize) limiting the reads
+    :param cache: Optional RasterCache
+    :param workers: Optional number of worker processes; None or 1 runs serially
+    :param feedback: Optional PipelineFeedback for progress and cancellation
+    :return: 1D int64 array, one count per raster
+    """
+    feedback = feedback or PipelineFeedback()
+    grid = RasterGrid(raster_paths[0])
+    window = RasterGrid.intersect_windows(grid.vector_window(vector_path), window)
+
+    if workers and workers > 1:
+        n = len(raster_paths)
+        totals = YearProcessPool(workers).map(
+            year_aoi_total, raster_paths, [vector_path] * n, [window] * n, [cache] * n, feedback=feedback
+        )
+        feedback.count(pixels=window[2] * window[3] * n)
+        return np.array(totals, dtype=np.int64)
+
+    aoi_layer = RasterGrid.open_vector(vector_path).GetLayer(0)
+    totals = np.zeros(len(raster_paths), dtype=np.int64)
+    reader = BlockRasterReader(raster_paths, window, cache=cache)
+    for i, block in enumerate(reader):
+        feedback.check()
+        feedback.set_fraction(i / len(reader))
+        feedback.count_block(block)
+        mask = grid.rasterize_layer(aoi_layer, window=block.window).astype(bool)
+        if not mask.any():
+            continue
+
+        valid = block.valid() & mask
+        totals += np.where(valid, block.data, 0).sum(axis=(1, 2), dtype=np.int64)
+    return totals
+
+
+def sector_sums(raster_paths, window, labeller, bins, cache=None, workers=None, feedback=None):
+    """
+    Built-up pixels of every raster within each sector, in a single blocked pass over the window
+    (the sector ids of a block are shared by all years), or one year per worker process when
+    workers > 1.
+
+    :param raster_paths: Year raster paths sharing the same grid
+    :param window: Pixel window (xoff, yoff, xsize, ysize) of the sectors
+    :param labeller: Picklable labeller with a block_labels(block) method (SectorRing.binner or .labeller)
+    :param bins: Number of labels (sectors + 1)
+    :param cache: Optional RasterCache
+    :param workers: Optional number of worker processes; None or 1 runs serially
+    :param feedback: Optional PipelineFeedback for progress and cancellation
+    :return: 2D array of shape (rasters, bins); column 0 holds the pixels outside every sector
+    """
+    feedback = feedback or PipelineFeedback()
+    if workers and workers > 1:
+        n = len(raster_paths)
+        sums = YearProcessPool(workers).map(
+            year_sector_sums, raster_paths, [window] * n, [labeller] * n, [bins] * n, [cache] * n, feedback=feedback
+        )
+        feedback.count(pixels=window[2] * window[3] * n)
+        return np.array(sums).reshape(n, bins)
+
+    sums = np.zeros((len(raster_paths), bins))
+    reader = BlockRasterReader(raster_paths, window, cache=cache)
+    for i, block in enumerate(reader):
+        feedback.check()
+        feedback.set_fraction(i / len(reader))
+        feedback.count_block(block)
+        sums += block_sector_sums(block, labeller.block_labels(block), bins)
+    return sums
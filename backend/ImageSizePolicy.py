@@ -0,0 +1,64 @@
+import math
+
+from .RasterGrid import RasterGrid
+
+
+class ImageSizePolicy:
+    """
+    Output image size derived from the native raster resolution over the rendered extent,
+    instead of a fixed canvas.
+
+    The native size is the number of raster pixels covering the extent; it is multiplied by the
+    oversampling factor so that outlines stay sharp over the raster cells. Small extents are
+    enlarged up to min_size (longest side), and sizes above the pixel budget are scaled down to
+    it, with a warning giving the resulting resolution, so a large metro is never downsampled
+    silently and an ARGB canvas never exceeds 4 bytes x max_pixels.
+
+    :param oversampling: Image pixels per raster pixel along each axis
+    :param max_pixels: Pixel budget of an image (width x height)
+    :param min_size: Minimum length of the longest image side in pixels
+    """
+    def __init__(self, oversampling=2.0, max_pixels=25000000, min_size=1000):
+        if oversampling <= 0:
+            raise ValueError("oversampling must be positive")
+        if min_size < 1 or min_size * min_size > max_pixels:
+            raise ValueError("min_size must be positive and fit in the pixel budget")
+
+        self.oversampling = oversampling
+        self.max_pixels = max_pixels
+        self.min_size = min_size
+
+    def image_size(self, width, height, pixel_width, pixel_height):
+        """
+        :param width: Extent width in map units
+        :param height: Extent height in map units
+        :param pixel_width: Raster pixel width in map units
+        :param pixel_height: Raster pixel height in map units (sign ignored)
+        :return: Tuple (image width, image height) in pixels, keeping the extent aspect ratio
+        """
+        if width <= 0 or height <= 0:
+            raise ValueError("The extent must not be empty")
+
+        native = (width / abs(pixel_width), height / abs(pixel_height))
+        size = (native[0] * self.oversampling, native[1] * self.oversampling)
+
+        scale = 1.0
+        if size[0] * size[1] > self.max_pixels:
+            scale = math.sqrt(self.max_pixels / (size[0] * size[1]))
+            print(f"[WARNING] Image size capped to the budget of {self.max_pixels} pixels: "
+                  f"{self.oversampling * scale:.2f} image pixels per raster pixel")
+        elif max(size) < self.min_size:
+            scale = self.min_size / max(size)
+
+        return max(1, int(size[0] * scale)), max(1, int(size[1] * scale))
+
+    def for_context(self, context):
+        """
+        Image size of the images of a run, over its 'MultiRingsView' extent.
+
+        :param context: RunContext with the view ring loaded
+        :return: Tuple (image width, image height) in pixels
+        """
+        extent = context.rings_view_layer.extent()
+        _, pixel_width, _, _, _, pixel_height = RasterGrid(context.raster_paths[0]).geotransform
+        return self.image_size(extent.width(), extent.height(), pixel_width, pixel_height)
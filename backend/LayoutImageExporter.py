@@ -8,6 +8,7 @@ from qgis.core import (
 from PyQt5.QtGui import QFont
 
 from .BarGraph import BarGraph
+from .GrowthCore import growth_rates
 
 class LayoutImageExporter:
     """
@@ -15,7 +16,7 @@ class LayoutImageExporter:
     and a growth rate analysis as a single PDF and image.
     """
 
-    def __init__(self, output_path, labels, noOfRasterLayers, city):
+    def __init__(self, output_path, labels, noOfRasterLayers, city, totals=None, aoi_layer=None):
         """
         Initializes the exporter and triggers the layout export process.
 
@@ -24,15 +25,20 @@ class LayoutImageExporter:
             labels (list): List of year labels corresponding to rasters.
             noOfRasterLayers (int): Number of raster layers/images to place.
             city (str): Name of the city or study area.
+            totals (dict, optional): Built-up pixel counts keyed by year. When omitted,
+                the counts are read from the AOI layer attributes.
+            aoi_layer (QgsVectorLayer, optional): AOI layer of the run, required when totals is omitted.
         """
         self.project = QgsProject.instance()
         self.manager = self.project.layoutManager()
-        self.layout_name = 'ImageLayout'
+        self.layout_name = f'ImageLayout {city}'  # One layout per city, so concurrent runs do not clash
         self.layout = None
         self.output_path = output_path
         self.city = city
         self.labels = labels
         self.noOfRasterLayers = noOfRasterLayers
+        self.totals = totals
+        self.aoi_layer = aoi_layer
 
         # Image paths by rows
         self.image_paths_row1 = [os.path.join(self.output_path, f'{labels[i]}.png') for i in range(self.noOfRasterLayers)]
@@ -72,17 +78,12 @@ class LayoutImageExporter:
         Generates and saves a horizontal arrow plot showing percentage change between built-up areas
         of different years.
         """
-        obj_values = BarGraph(self.labels, self.city, self.noOfRasterLayers, self.output_path)
+        obj_values = BarGraph(self.labels, self.city, self.noOfRasterLayers, self.output_path, self.totals, self.aoi_layer)
         yearStats = obj_values.get_values()
         yearStats = [float(val) for val in yearStats]
 
         # Calculate percentage change
-        changeStats = []
-        for i in range(1, len(yearStats)):
-            prev = yearStats[i - 1]
-            curr = yearStats[i]
-            change = ((curr - prev) / prev) * 100 if prev != 0 else 0
-            changeStats.append(f"{change:.2f}%")
+        changeStats = [f"{change:.2f}%" for change in growth_rates(yearStats)]
 
         fig, ax = plt.subplots(figsize=(10, 2))
 
@@ -0,0 +1,193 @@
+import math
+import os
+import numpy as np
+import pandas as pd
+from osgeo import gdal
+
+from .AnalyticSectorBinner import sector_names
+from .BlockRasterReader import BlockRasterReader
+from .GrowthCore import growth_rates, pixels_to_km2
+from .RasterGrid import RasterGrid
+from .PipelineFeedback import PipelineFeedback
+from .YearStatsWorkers import block_sector_sums
+
+
+class MultiZoneStatisticsProcessor:
+    """
+    Built-up totals and sector statistics of many AOIs (e.g. the wards or towns of a region) that
+    share one raster stack, in a single pass over the rasters.
+
+    All zones of the polygon layer are burnt block by block into a zone-id grid, and every pixel
+    inside a zone gets the directional sector of its bearing from that zone's centroid. One
+    bincount per year then yields the sums of every (zone, sector) pair, and the zone totals are
+    their sums. Each raster block is read once, so the I/O follows the raster size over the zones
+    extent, not the number of zones.
+
+    Unlike the single-AOI sector statistics, which count the whole ring around the AOI, sectors
+    here only count pixels inside their own zone, as the rings of neighbouring zones overlap.
+    Zones must not overlap either: a pixel belongs to the last zone burnt over it.
+
+    :param raster_paths: List of year raster paths sharing the same grid
+    :param zones_path: Path of the polygon layer holding the zones (raster CRS)
+    :param years: Year of each raster, in the same order
+    :param no_of_sectors: Number of directional sectors (4, 8 or 16)
+    :param id_field: Optional field naming the zones; feature ids are used otherwise
+    :param cache: Optional RasterCache
+    :param feedback: Optional PipelineFeedback for progress and cancellation between blocks
+    """
+    def __init__(self, raster_paths, zones_path, years=None, no_of_sectors=8, id_field=None, cache=None, feedback=None):
+        if not raster_paths:
+            raise ValueError("At least one raster is required.")
+
+        self.raster_paths = raster_paths
+        self.zones_path = zones_path
+        self.years = list(years) if years is not None else list(range(len(raster_paths)))
+        self.no_of_sectors = no_of_sectors
+        self.sector_names = sector_names(no_of_sectors)
+        self.id_field = id_field
+        self.cache = cache
+        self.feedback = feedback or PipelineFeedback()
+        self.grid = RasterGrid(raster_paths[0])
+
+        # Statistics sectors are centered on their direction, like DirectionalRingGenerator(view=False)
+        self.sector_width = 360 / no_of_sectors
+        self.offset = self.sector_width / 2
+
+        self.zone_ids = []    # Zone name per zone index
+        self.centers = None   # Array (zones + 1, 2) of centroid coordinates; row 0 is unused
+        self.zones = None     # OGR data source of the zones, burnt with value = zone index + 1
+        self.sums = None      # Array (years, zones, sectors) of built-up pixel sums
+        self.read_zones()
+
+    def read_zones(self):
+        """
+        Reads the zone polygons and their centroids. A centroid falling outside its zone is
+        replaced by a point on the surface, as for the single AOI.
+        """
+        source = RasterGrid.open_vector(self.zones_path)
+        layer = source.GetLayer(0)
+        if self.id_field and layer.GetLayerDefn().GetFieldIndex(self.id_field) < 0:
+            raise ValueError(f"Field '{self.id_field}' not found in {self.zones_path}")
+
+        wkt_values = []
+        centers = [(0.0, 0.0)]
+        for feature in layer:
+            geometry = feature.GetGeometryRef()
+            if geometry is None or geometry.IsEmpty():
+                continue
+            centroid = geometry.Centroid()
+            if not centroid.Within(geometry):
+                centroid = geometry.PointOnSurface()
+
+            self.zone_ids.append(feature.GetField(self.id_field) if self.id_field else feature.GetFID())
+            centers.append((centroid.GetX(), centroid.GetY()))
+            wkt_values.append((geometry.ExportToWkt(), len(self.zone_ids)))
+
+        if not self.zone_ids:
+            raise ValueError(f"No zone polygons in {self.zones_path}")
+
+        self.centers = np.array(centers)
+        self.zones = RasterGrid.memory_layer(wkt_values)
+        xmin, xmax, ymin, ymax = self.zones.GetLayer(0).GetExtent()
+        self.window = self.grid.window_for_bounds(xmin, ymin, xmax, ymax)
+
+    def block_labels(self, block):
+        """
+        Combined (zone, sector) label of every pixel of a block: (zone index) * sectors + sector id,
+        with sector ids starting at 1, and 0 outside every zone.
+
+        :param block: RasterBlock
+        :return: 2D int64 array of shape (ysize, xsize)
+        """
+        zone = self.grid.rasterize_layer(self.zones.GetLayer(0), attribute='value',
+                                         data_type=gdal.GDT_Int32, window=block.window).astype(np.int64)
+
+        origin_x, pixel_width, _, origin_y, _, pixel_height = self.grid.geotransform
+        x = origin_x + (np.arange(block.xoff, block.xoff + block.xsize) + 0.5) * pixel_width
+        y = origin_y + (np.arange(block.yoff, block.yoff + block.ysize) + 0.5) * pixel_height
+
+        # Bearing of each pixel centre from the centroid of its own zone
+        dx = x[np.newaxis, :] - self.centers[zone, 0]
+        dy = y[:, np.newaxis] - self.centers[zone, 1]
+        bearing = np.degrees(np.arctan2(dy, dx))
+        sector = np.floor(np.mod(bearing + self.offset, 360) / self.sector_width).astype(np.int64) % self.no_of_sectors
+
+        return np.where(zone > 0, (zone - 1) * self.no_of_sectors + sector + 1, 0)
+
+    def process(self):
+        """
+        Streams the raster stack once over the zones extent.
+        """
+        bins = len(self.zone_ids) * self.no_of_sectors + 1
+        sums = np.zeros((len(self.raster_paths), bins))
+
+        reader = BlockRasterReader(self.raster_paths, self.window, cache=self.cache)
+        total = len(reader)
+        for i, block in enumerate(reader):
+            self.feedback.check()
+            self.feedback.count_block(block)
+            sums += block_sector_sums(block, self.block_labels(block), bins)
+            self.feedback.set_fraction((i + 1) / total)
+
+        self.sums = sums[:, 1:].reshape(len(self.raster_paths), len(self.zone_ids), self.no_of_sectors)
+        print(f"[INFO] Multi-zone statistics: {len(self.zone_ids)} zones, {total} blocks read once")
+        return self.sums
+
+    def zone_totals(self):
+        """
+        :return: Dictionary {zone id: {year: built-up pixels}}
+        """
+        if self.sums is None:
+            self.process()
+        totals = self.sums.sum(axis=2)
+        return {
+            zone_id: {year: float(totals[y, z]) for y, year in enumerate(self.years)}
+            for z, zone_id in enumerate(self.zone_ids)
+        }
+
+    def zone_sector_sums(self):
+        """
+        :return: Dictionary {zone id: {year: {direction: built-up pixels}}}
+        """
+        if self.sums is None:
+            self.process()
+        return {
+            zone_id: {
+                year: {name: float(self.sums[y, z, k]) for k, name in enumerate(self.sector_names)}
+                for y, year in enumerate(self.years)
+            }
+            for z, zone_id in enumerate(self.zone_ids)
+        }
+
+    def rows(self):
+        """
+        Long table of the results, one row per zone, year and sector plus a 'Total' row per zone
+        and year, with the growth rate (%) of the area since the previous year.
+
+        :return: List of [zone, year, sector, pixels, area (km²), growth (%)] lists
+        """
+        if self.sums is None:
+            self.process()
+
+        order = sorted(range(len(self.years)), key=lambda i: self.years[i])
+        rows = []
+        for z, zone_id in enumerate(self.zone_ids):
+            names = self.sector_names + ['Total']
+            values = np.concatenate([self.sums[:, z, :], self.sums[:, z, :].sum(axis=1, keepdims=True)], axis=1)
+            for k, name in enumerate(names):
+                pixels = [float(values[y, k]) for y in order]
+                growth = [math.nan] + growth_rates(pixels, empty=math.nan)
+                for y, count, rate in zip(order, pixels, growth):
+                    rows.append([zone_id, self.years[y], name, count, pixels_to_km2(count), rate])
+        return rows
+
+    def save(self, output_path, file_name='zoneWiseStats.xlsx'):
+        """
+        Writes the long table (see rows) to an Excel file.
+
+        :return: Path of the written file
+        """
+        path = os.path.join(output_path, file_name)
+        os.makedirs(output_path, exist_ok=True)
+        pd.DataFrame(self.rows(), columns=['Zone', 'Year', 'Sector', 'Pixels', 'Area (km²)', 'Growth (%)']).to_excel(path, index=False)
+        return path
@@ -0,0 +1,49 @@
+import struct
+import zlib
+
+import numpy as np
+
+
+class PalettePng:
+    """
+    Minimal encoder of 8-bit indexed-color PNG files (color type 3) with zlib and struct: one
+    byte per pixel, a palette of up to 256 colors and their alpha in a tRNS chunk. Rows are
+    stored unfiltered, which suits the large flat areas of classified rasters.
+    """
+    SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+    @staticmethod
+    def chunk(kind, data):
+        """
+        :param kind: 4-byte chunk type, e.g. b'IDAT'
+        :param data: Chunk data
+        :return: Length, type, data and CRC of the chunk
+        """
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    @classmethod
+    def write(cls, path, pixels, palette, level=6):
+        """
+        Writes an 8-bit indexed-color PNG.
+
+        :param path: Output file path
+        :param pixels: 2D uint8 array of palette indexes
+        :param palette: List of (R, G, B, A) colors, at most 256
+        :param level: zlib compression level
+        """
+        if not 0 < len(palette) <= 256:
+            raise ValueError("A PNG palette holds 1 to 256 colors")
+
+        height, width = pixels.shape
+        rows = np.zeros((height, width + 1), dtype=np.uint8)  # Filter type 0 (None) before every row
+        rows[:, 1:] = pixels
+        alpha = bytes(color[3] for color in palette).rstrip(b'\xff')
+
+        with open(path, 'wb') as f:
+            f.write(cls.SIGNATURE)
+            f.write(cls.chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0)))
+            f.write(cls.chunk(b'PLTE', bytes(value for color in palette for value in color[:3])))
+            if alpha:
+                f.write(cls.chunk(b'tRNS', alpha))
+            f.write(cls.chunk(b'IDAT', zlib.compress(rows.tobytes(), level)))
+            f.write(cls.chunk(b'IEND', b''))
@@ -0,0 +1,149 @@
+import os
+import threading
+from contextlib import contextmanager
+
+
+class PipelineCanceled(Exception):
+    """
+    Raised between blocks or years when a run has been canceled.
+    """
+
+
+class PipelineFeedback:
+    """
+    Progress and cancellation channel of the processing pipeline. It does not depend on Qt, so the
+    statistics code can report through it from worker threads.
+
+    Each stage claims a share of the 0-100 progress range with set_stage(); block and year loops
+    then report their own completion with set_fraction() and call check() to stop between blocks
+    once the run is canceled. Subclasses forward the progress to a dialog or a QgsTask (report)
+    and tell whether the user canceled (is_canceled).
+
+    The current stage is tracked per thread, so stages running concurrently each report their
+    own fraction; the overall progress is the sum of the completed share of every stage.
+
+    When run_report is set (a RunReport), stages and per-year iterations are timed, and the
+    counts passed to count() are added to the stage running on the calling thread.
+    """
+    def __init__(self):
+        self.stages = {}  # Stage name -> [start, end, completed fraction]
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.canceled = False
+        self.run_report = None
+
+    @property
+    def stage(self):
+        """
+        Name of the stage running on the calling thread.
+        """
+        return getattr(self.local, 'stage', None)
+
+    def set_stage(self, name, start, end):
+        """
+        Starts a stage on the calling thread; the previous stage of this thread is complete.
+
+        :param name: Stage name, used in messages
+        :param start: Progress value at the start of the stage
+        :param end: Progress value at the end of the stage
+        """
+        self.check()
+        with self.lock:
+            if self.stage in self.stages:
+                self.stages[self.stage][2] = 1.0
+            self.stages[name] = [start, end, 0.0]
+        if self.run_report is not None:
+            if self.stage is not None:
+                self.run_report.end_stage(self.stage)
+            self.run_report.start_stage(name)
+        self.local.stage = name
+        self.report(self.progress())
+
+    def complete_stage(self, status='done'):
+        """
+        Ends the stage of the calling thread.
+
+        :param status: 'done' marks the stage as complete; 'failed' or 'canceled' only end its timing
+        """
+        with self.lock:
+            if self.stage in self.stages and status == 'done':
+                self.stages[self.stage][2] = 1.0
+        if self.run_report is not None and self.stage is not None:
+            self.run_report.end_stage(self.stage, status)
+        self.local.stage = None
+        self.report(self.progress())
+
+    def set_fraction(self, fraction):
+        """
+        :param fraction: Completed fraction (0 to 1) of the stage running on the calling thread
+        """
+        with self.lock:
+            if self.stage in self.stages:
+                self.stages[self.stage][2] = min(max(fraction, 0.0), 1.0)
+        self.report(self.progress())
+
+    @contextmanager
+    def year(self, year):
+        """
+        Times one iteration of a per-year loop of the current stage; counts passed to count()
+        inside the block are also added to that year.
+        """
+        if self.run_report is None or self.stage is None:
+            yield
+            return
+        self.local.year = year
+        self.run_report.start_year(self.stage, year)
+        try:
+            yield
+        finally:
+            self.run_report.end_year()
+            self.local.year = None
+
+    def count(self, pixels=0, bytes_read=0, bytes_written=0):
+        """
+        Adds processed pixels and bytes read or written to the current stage (and year).
+        """
+        if self.run_report is not None and self.stage is not None:
+            self.run_report.add(self.stage, getattr(self.local, 'year', None), pixels, bytes_read, bytes_written)
+
+    def count_block(self, block):
+        """
+        Counts a RasterBlock read for the current stage.
+        """
+        self.count(pixels=block.data.size, bytes_read=block.data.nbytes)
+
+    def count_files(self, *paths):
+        """
+        Counts the size of files written by the current stage; missing files are skipped.
+        """
+        self.count(bytes_written=sum(os.path.getsize(path) for path in paths if os.path.exists(path)))
+
+    def progress(self):
+        """
+        :return: Overall progress (0 to 100)
+        """
+        with self.lock:
+            return sum((end - start) * fraction for start, end, fraction in self.stages.values())
+
+    def report(self, progress):
+        """
+        Publishes the overall progress (0 to 100). Does nothing by default.
+        """
+
+    def idle(self):
+        """
+        Called while the pipeline waits for background stages. Does nothing by default.
+        """
+
+    def cancel(self):
+        self.canceled = True
+
+    def is_canceled(self):
+        return self.canceled
+
+    def check(self):
+        """
+        :raises PipelineCanceled: When the run has been canceled
+        """
+        if self.is_canceled():
+            raise PipelineCanceled(f"Run canceled during stage '{self.stage}'")
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import tempfile
+import uuid
+import numpy as np
+
+
+class RasterCache:
+    """
+    Persistent on-disk cache of decoded raster windows, stored as .npy files and opened as
+    read-only memory maps, so re-runs skip GeoTIFF decompression entirely.
+
+    An entry is keyed by the raster path, file size, modification time and pixel window. A lookup
+    is served by any entry of the same file whose window contains the requested one, and new
+    entries are padded around the requested window so that re-runs with another centroid or
+    sector count (which move the analysis window slightly) still hit. The windows of the entries
+    of a file are listed in a small index file named after its fingerprint, so a lookup reads one
+    index instead of scanning the cache folder. The total size is capped; the least recently used
+    entries are evicted first, and an entry evicted by another process is a cache miss.
+
+    :param cache_dir: Cache folder (default: BGA_CACHE_DIR or a 'bga_raster_cache' temp folder)
+    :param max_bytes: Size cap of the cache in bytes
+    :param padding: Fraction of the window size added on each side of new entries
+    """
+    def __init__(self, cache_dir=None, max_bytes=4 * 1024 ** 3, padding=0.25):
+        self.cache_dir = cache_dir or os.environ.get('BGA_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'bga_raster_cache')
+        self.max_bytes = max_bytes
+        self.padding = padding
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def source_fingerprint(raster_path):
+        """
+        :return: [absolute path, size, modification time in ns] of a raster file
+        """
+        stat = os.stat(raster_path)
+        return [os.path.abspath(raster_path), stat.st_size, stat.st_mtime_ns]
+
+    def entry_path(self, source, window):
+        """
+        :return: Data .npy path of the entry for source and window
+        """
+        key = hashlib.sha1(json.dumps([source, list(window)]).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{key}.npy')
+
+    def index_path(self, source):
+        """
+        :return: Path of the index listing the entries of source
+        """
+        key = hashlib.sha1(json.dumps(source).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{key}.index.json')
+
+    def read_index(self, source):
+        """
+        :return: List of the metadata dicts ({'window', 'nodata'}) of the entries of source
+        """
+        try:
+            with open(self.index_path(source)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def write_index(self, source, entries):
+        index_path = self.index_path(source)
+        tmp_path = index_path + f'.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, index_path)
+
+    @staticmethod
+    def contains(outer, inner):
+        return (outer[0] <= inner[0] and outer[1] <= inner[1]
+                and inner[0] + inner[2] <= outer[0] + outer[2]
+                and inner[1] + inner[3] <= outer[1] + outer[3])
+
+    def find(self, source, window):
+        """
+        Looks for a cached entry of source whose window contains the requested window.
+
+        :return: Metadata dict of the entry, or None
+        """
+        for meta in self.read_index(source):
+            if self.contains(meta['window'], window):
+                data_path = self.entry_path(source, meta['window'])
+                if os.path.exists(data_path):
+                    return dict(meta, source=source, data_path=data_path)
+        return None
+
+    def padded_window(self, reader, window):
+        """
+        Grows window by the padding fraction on each side, clipped to the raster.
+        """
+        xoff, yoff, xsize, ysize = window
+        pad_x, pad_y = int(xsize * self.padding), int(ysize * self.padding)
+        return reader.clip_window((xoff - pad_x, yoff - pad_y, xsize + 2 * pad_x, ysize + 2 * pad_y))
+
+    def store(self, raster_path, source, window):
+        """
+        Decodes a raster window block by block straight into a new .npy file.
+
+        :return: Metadata dict of the new entry
+        """
+        from .BlockRasterReader import BlockRasterReader  # GDAL is only needed to decode new entries
+        reader = BlockRasterReader([raster_path])
+        reader = BlockRasterReader([raster_path], self.padded_window(reader, reader.clip_window(window)))
+        xoff, yoff, xsize, ysize = reader.window
+
+        data_path = self.entry_path(source, reader.window)
+        tmp_path = data_path + f'.{uuid.uuid4().hex}.tmp.npy'  # Unique per thread and process sharing the cache
+        array = None
+        for block in reader:
+            if array is None:
+                array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=block.data.dtype, shape=(ysize, xsize))
+            row, col = block.yoff - yoff, block.xoff - xoff
+            array[row:row + block.ysize, col:col + block.xsize] = block.data[0]
+        if array is None:
+            array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=(ysize, xsize))
+        array.flush()
+        del array
+        os.replace(tmp_path, data_path)
+
+        # Entries evicted since are dropped from the index; a concurrent update may be lost, which
+        # only costs a cache miss
+        meta = {'window': list(reader.window), 'nodata': reader.nodata[0]}
+        entries = [entry for entry in self.read_index(source)
+                   if entry['window'] != meta['window'] and os.path.exists(self.entry_path(source, entry['window']))]
+        self.write_index(source, entries + [meta])
+
+        self.evict(keep=data_path)
+        return dict(meta, source=source, data_path=data_path)
+
+    def load(self, raster_path, window):
+        """
+        Returns the decoded pixels of a raster window, from the cache when possible.
+
+        :param raster_path: Path of the raster
+        :param window: Pixel window (xoff, yoff, xsize, ysize)
+        :return: Tuple (read-only memory-mapped array, window of that array, nodata value).
+                 The array covers at least the requested window.
+        """
+        source = self.source_fingerprint(raster_path)
+        meta = self.find(source, window)
+        if meta is not None:
+            try:
+                os.utime(meta['data_path'])  # Marks the entry as recently used
+                array = np.load(meta['data_path'], mmap_mode='r')
+                return array, tuple(meta['window']), meta['nodata']
+            except (OSError, ValueError):
+                pass  # Evicted by another process meanwhile, or truncated: decoded again
+
+        meta = self.store(raster_path, source, window)
+        array = np.load(meta['data_path'], mmap_mode='r')
+        return array, tuple(meta['window']), meta['nodata']
+
+    def evict(self, keep=None):
+        """
+        Deletes least recently used entries until the cache fits in max_bytes.
+
+        :param keep: Data path that must not be evicted (e.g. the entry just written)
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npy') and not name.endswith('.tmp.npy'):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Removed meanwhile by another process
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # Still memory-mapped (Windows) or removed meanwhile: its size still counts
+            total -= size
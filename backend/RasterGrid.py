@@ -0,0 +1,172 @@
+from osgeo import gdal, ogr
+import math
+
+
+class RasterGrid:
+    """
+    Describes the pixel grid shared by the year rasters (size, geotransform and projection)
+    and burns vector geometries onto it, so every raster can be read against the same mask.
+
+    Burning can be restricted to a pixel window (xoff, yoff, xsize, ysize) so that masks are
+    produced block by block alongside BlockRasterReader, with memory bounded by the block size.
+
+    :param raster_path: Path to any raster of the (aligned) year stack
+    """
+    def __init__(self, raster_path):
+        dataset = gdal.Open(raster_path, gdal.GA_ReadOnly)
+        if dataset is None:
+            raise IOError(f"Unable to open raster: {raster_path}")
+
+        self.raster_path = raster_path
+        self.width = dataset.RasterXSize
+        self.height = dataset.RasterYSize
+        self.geotransform = dataset.GetGeoTransform()
+        self.projection = dataset.GetProjection()
+
+    @property
+    def full_window(self):
+        """
+        :return: Pixel window (xoff, yoff, xsize, ysize) covering the whole grid
+        """
+        return 0, 0, self.width, self.height
+
+    def window_for_bounds(self, xmin, ymin, xmax, ymax):
+        """
+        Converts map-unit bounds into the pixel window covering them, clipped to the grid.
+
+        :return: Tuple (xoff, yoff, xsize, ysize); sizes are 0 when the bounds miss the grid
+        """
+        origin_x, pixel_width, _, origin_y, _, pixel_height = self.geotransform
+
+        cols = sorted(((xmin - origin_x) / pixel_width, (xmax - origin_x) / pixel_width))
+        rows = sorted(((ymin - origin_y) / pixel_height, (ymax - origin_y) / pixel_height))
+
+        col_start = min(max(int(math.floor(cols[0])), 0), self.width)
+        col_end = min(max(int(math.ceil(cols[1])), 0), self.width)
+        row_start = min(max(int(math.floor(rows[0])), 0), self.height)
+        row_end = min(max(int(math.ceil(rows[1])), 0), self.height)
+        return col_start, row_start, col_end - col_start, row_end - row_start
+
+    @staticmethod
+    def intersect_windows(first, second):
+        """
+        Intersects two pixel windows.
+
+        :param first: Tuple (xoff, yoff, xsize, ysize)
+        :param second: Tuple (xoff, yoff, xsize, ysize), or None to keep first unchanged
+        :return: Tuple (xoff, yoff, xsize, ysize); sizes are 0 when the windows do not overlap
+        """
+        if second is None:
+            return first
+        x0, y0 = max(first[0], second[0]), max(first[1], second[1])
+        x1 = min(first[0] + first[2], second[0] + second[2])
+        y1 = min(first[1] + first[3], second[1] + second[3])
+        return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
+
+    def create_target(self, data_type=gdal.GDT_Byte, window=None):
+        """
+        Creates an empty in-memory raster aligned with the grid.
+
+        :param data_type: GDAL data type of the single band
+        :param window: Optional pixel window (xoff, yoff, xsize, ysize); defaults to the whole grid
+        :return: gdal.Dataset
+        """
+        xoff, yoff, xsize, ysize = window or self.full_window
+        origin_x, pixel_width, row_rotation, origin_y, col_rotation, pixel_height = self.geotransform
+
+        target = gdal.GetDriverByName('MEM').Create('', xsize, ysize, 1, data_type)
+        target.SetGeoTransform((
+            origin_x + xoff * pixel_width + yoff * row_rotation, pixel_width, row_rotation,
+            origin_y + xoff * col_rotation + yoff * pixel_height, col_rotation, pixel_height
+        ))
+        target.SetProjection(self.projection)
+        return target
+
+    def rasterize_layer(self, ogr_layer, burn_value=1, attribute=None, data_type=gdal.GDT_Byte, window=None):
+        """
+        Burns an OGR layer onto the grid. A pixel is burnt when its centre lies inside a polygon,
+        which is the same rule QgsZonalStatistics uses for cells.
+
+        :param ogr_layer: ogr.Layer holding the polygons
+        :param burn_value: Value written inside the polygons (ignored when attribute is given)
+        :param attribute: Optional field name whose value is burnt instead of burn_value
+        :param data_type: GDAL data type of the output grid
+        :param window: Optional pixel window (xoff, yoff, xsize, ysize); defaults to the whole grid
+        :return: 2D numpy array of shape (ysize, xsize)
+        """
+        target = self.create_target(data_type, window)
+        if attribute:
+            gdal.RasterizeLayer(target, [1], ogr_layer, options=[f'ATTRIBUTE={attribute}'])
+        else:
+            gdal.RasterizeLayer(target, [1], ogr_layer, burn_values=[burn_value])
+        return target.GetRasterBand(1).ReadAsArray()
+
+    @staticmethod
+    def memory_layer(wkt_values):
+        """
+        Builds an OGR in-memory polygon layer with an integer 'value' field, e.g. from the
+        features of a QGIS memory layer such as 'MultiRings'.
+
+        :param wkt_values: Iterable of (WKT string, integer value) pairs
+        :return: ogr.DataSource holding the layer (keep a reference while the layer is used)
+        """
+        source = ogr.GetDriverByName('Memory').CreateDataSource('')
+        layer = source.CreateLayer('geometries', srs=None, geom_type=ogr.wkbPolygon)
+        layer.CreateField(ogr.FieldDefn('value', ogr.OFTInteger))
+
+        for wkt, value in wkt_values:
+            feature = ogr.Feature(layer.GetLayerDefn())
+            feature.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+            feature.SetField('value', int(value))
+            layer.CreateFeature(feature)
+        return source
+
+    def rasterize_geometries(self, wkt_values, data_type=gdal.GDT_Int32, window=None):
+        """
+        Burns a list of geometries, each with its own integer value, onto the grid.
+        Used to turn in-memory layers (e.g. the 'MultiRings' sectors) into label grids.
+
+        :param wkt_values: Iterable of (WKT string, integer value) pairs
+        :param data_type: GDAL data type of the output grid
+        :param window: Optional pixel window (xoff, yoff, xsize, ysize); defaults to the whole grid
+        :return: 2D numpy array with the value of the covering geometry, 0 elsewhere
+        """
+        source = self.memory_layer(wkt_values)
+        return self.rasterize_layer(source.GetLayer(0), attribute='value', data_type=data_type, window=window)
+
+    @staticmethod
+    def open_vector(vector_path):
+        """
+        Opens a vector file with OGR.
+
+        :param vector_path: Path or QGIS data source URI of the vector file
+        :return: ogr.DataSource
+        """
+        # QGIS data source URIs may carry options such as '|layername=...'
+        source = ogr.Open(vector_path.split('|')[0])
+        if source is None:
+            raise IOError(f"Unable to open vector layer: {vector_path}")
+        return source
+
+    def rasterize(self, vector_path, burn_value=1, window=None):
+        """
+        Burns the polygons of a vector file (e.g. the AOI shapefile) onto the grid.
+
+        :param vector_path: Path or QGIS data source URI of the vector file
+        :param burn_value: Value written inside the polygons
+        :param window: Optional pixel window (xoff, yoff, xsize, ysize); defaults to the whole grid
+        :return: 2D uint8 numpy array, burn_value inside the polygons and 0 elsewhere
+        """
+        source = self.open_vector(vector_path)
+        return self.rasterize_layer(source.GetLayer(0), burn_value=burn_value, window=window)
+
+    def vector_window(self, vector_path):
+        """
+        Pixel window covering the extent of a vector file.
+
+        :param vector_path: Path or QGIS data source URI of the vector file
+        :return: Tuple (xoff, yoff, xsize, ysize)
+        """
+        source = self.open_vector(vector_path)
+        xmin, xmax, ymin, ymax = source.GetLayer(0).GetExtent()
+        return self.window_for_bounds(xmin, ymin, xmax, ymax)
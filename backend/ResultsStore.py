@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+
+class ResultsStore:
+    """
+    Persistent SQLite store of computed statistics, kept in the base output folder so that it
+    survives the per-city output folder being recreated.
+
+    AOI totals are keyed by raster content hash, AOI geometry hash and statistics engine. Sector
+    sums are keyed by raster content hash, AOI geometry hash, centroid, number of sectors and
+    sector mode. A new or modified year raster therefore gets a new hash and is the only one
+    computed again.
+
+    The content hash of a raster covers its grid (size, geotransform, projection, nodata) and the
+    decoded pixels of the analysis window only, which the statistics read anyway, so a state-wide
+    raster is never read in full to be hashed. Hashes are memoized per file path, window, size and
+    modification time. The store may be used from a background task thread, one thread at a time,
+    and shared by the processes of a batch run (SQLite locking).
+
+    :param db_path: Path of the SQLite database file
+    """
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS window_hashes (
+            path TEXT, window TEXT, size INTEGER, mtime_ns INTEGER, sha1 TEXT,
+            PRIMARY KEY (path, window))""",
+        """CREATE TABLE IF NOT EXISTS aoi_totals (
+            raster_hash TEXT, aoi_hash TEXT, engine TEXT, total INTEGER,
+            PRIMARY KEY (raster_hash, aoi_hash, engine))""",
+        """CREATE TABLE IF NOT EXISTS sector_sums (
+            raster_hash TEXT, aoi_hash TEXT, centroid TEXT, no_of_sectors INTEGER, mode TEXT, sums TEXT,
+            PRIMARY KEY (raster_hash, aoi_hash, centroid, no_of_sectors, mode))""",
+    )
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path, timeout=60, check_same_thread=False)
+        with self.connection:
+            # Totals stored before the engine was part of their key cannot be attributed to one
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(aoi_totals)")]
+            if columns and 'engine' not in columns:
+                self.connection.execute("DROP TABLE aoi_totals")
+            for statement in self.SCHEMA:
+                self.connection.execute(statement)
+
+    def close(self):
+        self.connection.close()
+
+    def raster_hash(self, path, window, cache=None):
+        """
+        SHA-1 of a raster's grid and of the decoded pixels of a window, memoized while the file
+        size and modification time are unchanged.
+
+        :param path: Raster path
+        :param window: Pixel window (xoff, yoff, xsize, ysize), e.g. the analysis window
+        :param cache: Optional RasterCache the window is read from (and stored into)
+        :return: Hex digest
+        """
+        path = os.path.abspath(path)
+        window_key = json.dumps([int(v) for v in window])
+        stat = os.stat(path)
+        row = self.connection.execute(
+            "SELECT sha1 FROM window_hashes WHERE path = ? AND window = ? AND size = ? AND mtime_ns = ?",
+            (path, window_key, stat.st_size, stat.st_mtime_ns)
+        ).fetchone()
+        if row:
+            return row[0]
+
+        from .BlockRasterReader import BlockRasterReader  # GDAL is only needed to hash the rasters
+        reader = BlockRasterReader([path], window, cache=cache)
+        dataset = reader.datasets[0]
+        digest = hashlib.sha1(json.dumps([
+            reader.width, reader.height, list(dataset.GetGeoTransform()), dataset.GetProjection(),
+            reader.nodata[0], list(reader.window)
+        ]).encode('utf-8'))
+        for block in reader:
+            digest.update(json.dumps([list(block.window), block.data.dtype.str]).encode('utf-8'))
+            digest.update(block.data.tobytes())
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO window_hashes VALUES (?, ?, ?, ?, ?)",
+                (path, window_key, stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+            )
+        return digest.hexdigest()
+
+    @staticmethod
+    def geometry_hash(vector_path):
+        """
+        SHA-1 of the geometries (WKB, in feature order) and spatial reference of a vector file.
+        Attribute edits, such as the zonal statistics fields, do not change it.
+
+        :param vector_path: Path of the vector file (optionally 'path|layername=...')
+        :return: Hex digest
+        """
+        from .RasterGrid import RasterGrid
+        source = RasterGrid.open_vector(vector_path)
+        layer = source.GetLayer(0)
+        digest = hashlib.sha1()
+
+        srs = layer.GetSpatialRef()
+        if srs is not None:
+            digest.update(srs.ExportToWkt().encode('utf-8'))
+
+        layer.ResetReading()
+        for feature in layer:
+            geometry = feature.GetGeometryRef()
+            if geometry is not None:
+                digest.update(bytes(geometry.ExportToWkb()))
+        return digest.hexdigest()
+
+    @staticmethod
+    def centroid_key(centroid_point):
+        """
+        :param centroid_point: QgsPointXY (or any object with x() and y()), or None for the AOI centroid
+        :return: Text key of the centroid
+        """
+        if centroid_point is None:
+            return 'auto'
+        return f'{centroid_point.x():.9f},{centroid_point.y():.9f}'
+
+    def aoi_totals(self, raster_hashes, aoi_hash, engine):
+        """
+        :param raster_hashes: List of raster content hashes
+        :param aoi_hash: AOI geometry hash
+        :param engine: Statistics engine that computed the totals ('qgis' or 'numpy')
+        :return: List of stored built-up pixel counts, None where not stored
+        """
+        totals = []
+        for raster_hash in raster_hashes:
+            row = self.connection.execute(
+                "SELECT total FROM aoi_totals WHERE raster_hash = ? AND aoi_hash = ? AND engine = ?",
+                (raster_hash, aoi_hash, engine)
+            ).fetchone()
+            totals.append(row[0] if row else None)
+        return totals
+
+    def save_aoi_total(self, raster_hash, aoi_hash, engine, total):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO aoi_totals VALUES (?, ?, ?, ?)",
+                (raster_hash, aoi_hash, engine, int(total))
+            )
+
+    def sector_sums(self, raster_hash, aoi_hash, centroid, no_of_sectors, mode):
+        """
+        :return: Dictionary of sector pixel sums keyed by direction (in sector order), or None
+        """
+        row = self.connection.execute(
+            "SELECT sums FROM sector_sums WHERE raster_hash = ? AND aoi_hash = ? AND centroid = ? "
+            "AND no_of_sectors = ? AND mode = ?",
+            (raster_hash, aoi_hash, centroid, no_of_sectors, mode)
+        ).fetchone()
+        return dict(json.loads(row[0])) if row else None
+
+    def save_sector_sums(self, raster_hash, aoi_hash, centroid, no_of_sectors, mode, sums):
+        """
+        :param sums: Dictionary of sector pixel sums keyed by direction
+        """
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sector_sums VALUES (?, ?, ?, ?, ?, ?)",
+                (raster_hash, aoi_hash, centroid, no_of_sectors, mode,
+                 json.dumps([[name, float(value or 0)] for name, value in sums.items()]))
+            )
@@ -0,0 +1,79 @@
+from qgis.core import QgsProject
+
+
+class RunContext:
+    """
+    Owns the layers, arrays and results of one analysis (one city run) and is passed to every
+    stage, so stages never look layers up by name in the project. Layers are still added to the
+    project to be displayed, inside a layer tree group named after the city; several analyses can
+    therefore run side by side in the same session without their 'AOI', 'MultiRings' or raster
+    layers clashing.
+
+    :param city: City name, also the name of the layer group
+    :param raster_paths: Year raster paths, ascending year order
+    :param aoi_path: Path of the AOI vector file
+    :param years: Years of the rasters, ascending
+    :param no_of_sectors: Number of directional sectors
+    :param colors: RGBA color strings of the rasters, in descending year order
+    :param centroid_point: Optional ring center; None uses the AOI centroid
+    :param project: QgsProject the layers are added to (default: the current project)
+    """
+    def __init__(self, city, raster_paths, aoi_path, years, no_of_sectors, colors, centroid_point=None, project=None):
+        self.city = city
+        self.raster_paths = list(raster_paths)
+        self.aoi_path = aoi_path
+        self.years = list(years)
+        self.no_of_sectors = no_of_sectors
+        self.colors = list(colors)
+        self.centroid_point = centroid_point
+        self.project = project or QgsProject.instance()
+
+        # Layer handles, set by the stages creating them
+        self.raster_layers = []       # QgsRasterLayer per year, ascending year order
+        self.aoi_layer = None         # 'AOI' layer
+        self.rings_layer = None       # Statistics ring 'MultiRings'
+        self.rings_view_layer = None  # View ring 'MultiRingsView'
+        self.centroid_layer = None    # 'centroid' of the AOI
+        self.group = None             # Layer tree group holding the layers of this run
+        self.layer_ids = []           # Ids of the layers added by this run
+
+        # Arrays and results
+        self.window = None       # Analysis window (xoff, yoff, xsize, ysize) on the raster grid
+        self.stack = None        # BitPackedStack of the window
+        self.sector_labeller = None  # (window, labeller, names) of the statistics sectors
+        self.year_totals = None  # Built-up pixel counts keyed by year
+        self.zonal_stats = None  # Sector areas per year (km²), descending year order
+
+    def add_layer(self, layer):
+        """
+        Adds a layer to the project, on top of the group of this run (like addMapLayer does at
+        the root). Main thread only.
+
+        :return: The added layer
+        """
+        if self.group is None:
+            self.group = self.project.layerTreeRoot().insertGroup(0, self.city)
+        self.project.addMapLayer(layer, False)
+        self.group.insertLayer(0, layer)
+        self.layer_ids.append(layer.id())
+        return layer
+
+    def raster_layer(self, index):
+        """
+        :param index: Year index, ascending year order
+        :return: QgsRasterLayer of that year
+        """
+        return self.raster_layers[index]
+
+    def release(self):
+        """
+        Removes the layers and the group of this run from the project. Main thread only.
+        """
+        layer_ids = [layer_id for layer_id in self.layer_ids if self.project.mapLayer(layer_id) is not None]
+        self.project.removeMapLayers(layer_ids)
+        if self.group is not None:
+            self.project.layerTreeRoot().removeChildNode(self.group)
+        self.layer_ids = []
+        self.group = None
+        self.raster_layers = []
+        self.aoi_layer = self.rings_layer = self.rings_view_layer = self.centroid_layer = None
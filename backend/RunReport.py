@@ -0,0 +1,187 @@
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def peak_rss():
+    """
+    :return: Peak resident set size of the process in bytes, or None when it cannot be read
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024  # kB on Linux, bytes on macOS
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+    return None
+
+
+def child_cpu_time():
+    """
+    :return: CPU seconds of the terminated child processes (e.g. YearProcessPool workers); 0 on Windows
+    """
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+class RunReport:
+    """
+    Records wall time, CPU time, peak RSS, pixels processed and bytes read or written for every
+    pipeline stage and every per-year iteration, and writes them to 'run_report.json'.
+
+    Stages are timed on the thread running them: CPU time is the thread's own CPU time, plus the
+    CPU time of the worker processes that exited during the stage. Peak RSS is the process peak
+    when the stage ends, so it is the memory high-water mark up to that stage. Pixels and bytes
+    are counted by the block loops through PipelineFeedback.count.
+
+    :param city: City name written in the report
+    :param metadata: Optional dictionary of run parameters written in the report
+    """
+    FILE_NAME = 'run_report.json'
+
+    def __init__(self, city, metadata=None):
+        self.city = city
+        self.metadata = dict(metadata or {})
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.start = time.perf_counter()
+        self.stages = {}   # Stage name -> record dictionary, in start order
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def new_record():
+        return {
+            'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'child_cpu_seconds': 0.0, 'peak_rss_bytes': None,
+            'pixels': 0, 'bytes_read': 0, 'bytes_written': 0
+        }
+
+    def clocks(self):
+        return time.perf_counter(), time.thread_time(), child_cpu_time()
+
+    def close_record(self, record, clocks):
+        wall, cpu, child_cpu = self.clocks()
+        record['wall_seconds'] += wall - clocks[0]
+        record['cpu_seconds'] += cpu - clocks[1]
+        record['child_cpu_seconds'] += child_cpu - clocks[2]
+        record['peak_rss_bytes'] = peak_rss()
+
+    def start_stage(self, name):
+        """
+        Starts timing a stage on the calling thread.
+        """
+        with self.lock:
+            record = {'name': name, 'thread': threading.current_thread().name, 'status': 'running'}
+            record.update(self.new_record())
+            record['years'] = {}  # Year -> record of the per-year iterations
+            self.stages[name] = record
+        self.local.stage = (name, self.clocks())
+
+    def end_stage(self, name, status='done'):
+        """
+        Stops timing the stage started on the calling thread.
+
+        :param status: 'done', 'failed' or 'canceled'
+        """
+        current = getattr(self.local, 'stage', None)
+        if current is None or current[0] != name:
+            return
+        with self.lock:
+            record = self.stages[name]
+            self.close_record(record, current[1])
+            record['status'] = status
+        self.local.stage = None
+
+    def year_record(self, stage, year):
+        years = self.stages[stage]['years']
+        return years.setdefault(year, self.new_record())
+
+    def start_year(self, stage, year):
+        """
+        Starts timing one year of a per-year loop of the stage, on the calling thread.
+        """
+        self.local.year = (stage, year, self.clocks())
+
+    def end_year(self):
+        current = getattr(self.local, 'year', None)
+        if current is None:
+            return
+        stage, year, clocks = current
+        with self.lock:
+            if stage in self.stages:
+                self.close_record(self.year_record(stage, year), clocks)
+        self.local.year = None
+
+    def add(self, stage, year=None, pixels=0, bytes_read=0, bytes_written=0):
+        """
+        Adds counters to a stage, and to one of its years when given.
+        """
+        with self.lock:
+            if stage not in self.stages:
+                return
+            records = [self.stages[stage]]
+            if year is not None:
+                records.append(self.year_record(stage, year))
+            for record in records:
+                record['pixels'] += int(pixels)
+                record['bytes_read'] += int(bytes_read)
+                record['bytes_written'] += int(bytes_written)
+
+    def to_dict(self):
+        with self.lock:
+            stages = []
+            for record in self.stages.values():
+                stage = dict(record)
+                stage['years'] = [dict(year=year, **values) for year, values in record['years'].items()]
+                stages.append(stage)
+        return {
+            'city': self.city,
+            'started': self.started,
+            'wall_seconds': time.perf_counter() - self.start,
+            'peak_rss_bytes': peak_rss(),
+            'metadata': self.metadata,
+            'stages': stages,
+        }
+
+    def save(self, output_path, file_name=None):
+        """
+        Writes the report to 'run_report.json' (or file_name) in the output folder.
+
+        :return: Path of the written file
+        """
+        path = os.path.join(output_path, file_name or self.FILE_NAME)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+    def summary(self, slowest=3):
+        """
+        One-line summary for the message bar: total time, peak memory, pixels read and the
+        slowest stages.
+        """
+        report = self.to_dict()
+        stages = sorted(report['stages'], key=lambda stage: stage['wall_seconds'], reverse=True)[:slowest]
+        pixels = sum(stage['pixels'] for stage in report['stages'])
+
+        parts = [f"{report['wall_seconds']:.1f} s"]
+        if report['peak_rss_bytes']:
+            parts.append(f"peak {report['peak_rss_bytes'] / 1024 ** 2:.0f} MB")
+        parts.append(f"{pixels / 1e6:.1f} Mpx")
+        text = ', '.join(parts)
+        if stages:
+            text += '; slowest: ' + ', '.join(f"{stage['name']} {stage['wall_seconds']:.1f} s" for stage in stages)
+        return text
@@ -1,30 +1,68 @@
-from qgis.core import QgsProject, QgsMapSettings, QgsRectangle, QgsMapRendererCustomPainterJob
+import os
+
+from qgis.core import QgsMapSettings, QgsRectangle, QgsMapRendererCustomPainterJob, QgsPalettedRasterRenderer, QgsRasterLayer
 from PyQt5.QtGui import QImage, QPainter, QColor
 from PyQt5.QtCore import QSize
 
+from .FirstBuiltComposite import FirstBuiltComposite
+from .ImageSizePolicy import ImageSizePolicy
+
 class SaveOverLaidLayer:
-    def __init__(self, city, no_of_raster_layers, output_path):
+    def __init__(self, context, output_path, overlay=None, image_size=None, composite_path=None):
         """
         Initialize the SaveOverLaidLayer object and start creating the image.
 
         Parameters:
-            city (str): Name of the city, used to name the output image file.
-            no_of_raster_layers (int): Number of raster layers to overlay.
+            context (RunContext): Run context holding the raster, AOI and MultiRingsView layers;
+                its city names the output image file.
             output_path (str): Directory path to save the output image.
+            overlay (QImage, optional): AOI and MultiRingsView layers already rendered over the
+                ring extent (YearImageRenderer.overlay); drawn instead of rendering them again.
+            image_size (tuple, optional): Image width and height in pixels, used without overlay;
+                derived from the raster resolution over the ring extent (ImageSizePolicy) by default.
+            composite_path (str, optional): First built-up year GeoTIFF of the run
+                (FirstBuiltComposite.save); saved as '<city>_first_built.tif' when not given.
         """
         self.output_path = output_path
-        self.city = city
+        self.overlay = overlay
+        self.image_size = image_size
+        self.composite_path = composite_path
+        self.context = context
+        self.city = context.city
         self.file_name = f'{self.city}_AOI'
-        self.no_of_raster_layers = no_of_raster_layers
+        self.no_of_raster_layers = len(context.raster_layers)
         self.create_image()  # Automatically create the image on initialization
         
+    def composite_layer(self):
+        """
+        Loads the first built-up year raster (not added to the project) with a paletted renderer
+        using the year colors; 0 (never built-up) is its nodata and stays transparent.
+
+        :return: QgsRasterLayer
+        """
+        composite = FirstBuiltComposite(self.context)
+        if self.composite_path is None:
+            self.composite_path = composite.save(os.path.join(self.output_path, f'{self.city}_first_built.tif'))
+
+        layer = QgsRasterLayer(self.composite_path, f'firstBuilt {self.city}')
+        classes = [
+            QgsPalettedRasterRenderer.Class(int(year), QColor(*color), str(year))
+            for year, color in zip(composite.years, composite.colors())
+        ]
+        layer.setRenderer(QgsPalettedRasterRenderer(layer.dataProvider(), 1, classes))
+        return layer
+
     def create_image(self):
         """
-        Create and save a composited image by overlaying multiple raster layers
-        along with AOI and MultiRingsView layers.
+        Create and save a composited image of the first built-up year of every pixel (the growth
+        epochs), rendered once with the year palette, along with AOI and MultiRingsView layers.
         """
-        # Create a blank image with ARGB32 format and given size
-        img = QImage(QSize(5000, 5000), QImage.Format_ARGB32_Premultiplied)
+        # Create a blank image with ARGB32 format and given size (the overlay size when given)
+        if self.overlay is not None:
+            size = self.overlay.size()
+        else:
+            size = QSize(*(self.image_size or ImageSizePolicy().for_context(self.context)))
+        img = QImage(size, QImage.Format_ARGB32_Premultiplied)
 
         # Set transparent background color
         color = QColor(255, 255, 255, 0)
@@ -40,43 +78,35 @@ class SaveOverLaidLayer:
         ms.setBackgroundColor(color)
 
         # Get extent from 'MultiRingsView' layer and set it on map settings
-        layer = QgsProject.instance().mapLayersByName('MultiRingsView')[0]
+        layer = self.context.rings_view_layer
         rect = layer.extent()
         rect.scale(1)
         ms.setExtent(rect)
 
-        # List to hold raster layers for rendering
-        layers = []
-
-        # Loop from highest raster layer index down to 1
-        for i in range(self.no_of_raster_layers, 0, -1):
-            layers.append(QgsProject.instance().mapLayersByName(f'rasterImage{i}'))
-            # Set the current raster layer on map settings
-            ms.setLayers([layers[self.no_of_raster_layers - i][0]])
-
-            # Set output image size
-            ms.setOutputSize(img.size())
+        # Render the first built-up year raster once, instead of every year over the previous ones
+        # (keep a reference: map settings do not own their layers)
+        composite_layer = self.composite_layer()
+        ms.setLayers([composite_layer])
+        ms.setOutputSize(img.size())
+        render = QgsMapRendererCustomPainterJob(ms, p)
+        render.start()
+        render.waitForFinished()
 
-            # Render current layer onto the image via QPainter
+        if self.overlay is not None:
+            # AOI and MultiRingsView layers, rendered once for all the images of the run
+            p.drawImage(0, 0, self.overlay)
+        else:
+            # Render AOI layer
+            ms.setLayers([self.context.aoi_layer])
             render = QgsMapRendererCustomPainterJob(ms, p)
             render.start()
             render.waitForFinished()
 
-        # Append AOI and MultiRingsView layers to the layers list
-        layers.append(QgsProject.instance().mapLayersByName("AOI"))
-        layers.append(QgsProject.instance().mapLayersByName('MultiRingsView'))
-    
-        # Render AOI layer
-        ms.setLayers([layers[self.no_of_raster_layers][0]])
-        render = QgsMapRendererCustomPainterJob(ms, p)
-        render.start()
-        render.waitForFinished()
-        
-        # Render MultiRingsView layer
-        ms.setLayers([layers[self.no_of_raster_layers+1][0]])
-        render = QgsMapRendererCustomPainterJob(ms, p)
-        render.start()
-        render.waitForFinished()
+            # Render MultiRingsView layer
+            ms.setLayers([self.context.rings_view_layer])
+            render = QgsMapRendererCustomPainterJob(ms, p)
+            render.start()
+            render.waitForFinished()
 
         # Finish painting
         p.end()
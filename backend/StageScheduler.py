@@ -0,0 +1,166 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .PipelineFeedback import PipelineFeedback, PipelineCanceled
+
+
+class Stage:
+    """
+    One step of the processing pipeline.
+
+    :param name: Unique stage name
+    :param function: Callable without arguments doing the work (results are kept on the processor)
+    :param inputs: Names of the artifacts the stage needs
+    :param outputs: Names of the artifacts the stage produces
+    :param main_thread: True when the stage touches the QGIS project or widgets and must run on
+                        the thread driving the scheduler
+    :param weight: Share of the overall progress range
+    :param phase: Optional group name, used to run a subset of the stages (see StageScheduler.run)
+    """
+    def __init__(self, name, function, inputs=(), outputs=(), main_thread=False, weight=1, phase=None):
+        self.name = name
+        self.function = function
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.main_thread = main_thread
+        self.weight = weight
+        self.phase = phase
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+
+class StageScheduler:
+    """
+    Runs a DAG of stages as soon as their inputs are available: background stages go to a thread
+    pool while main-thread stages run on the calling thread, so the wall time follows the critical
+    path instead of the sum of all stages.
+
+    Each stage gets a fixed slice of the progress range, proportional to its weight and in
+    declaration order. When a stage fails the feedback is canceled, so running stages stop
+    between blocks, and the first error is raised once they have returned.
+
+    :param stages: List of Stage objects
+    :param feedback: Optional PipelineFeedback
+    :param max_workers: Number of threads for background stages
+    """
+    def __init__(self, stages, feedback=None, max_workers=4):
+        self.stages = list(stages)
+        self.feedback = feedback or PipelineFeedback()
+        self.max_workers = max_workers
+
+        names = [stage.name for stage in self.stages]
+        if len(set(names)) != len(names):
+            raise ValueError("Stage names must be unique")
+
+        self.producers = {}
+        for stage in self.stages:
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(f"Output '{output}' is produced by both '{self.producers[output].name}' and '{stage.name}'")
+                self.producers[output] = stage
+
+        total = sum(stage.weight for stage in self.stages) or 1
+        self.ranges = {}
+        start = 0.0
+        for stage in self.stages:
+            end = start + 100.0 * stage.weight / total
+            self.ranges[stage.name] = (start, end)
+            start = end
+
+    def select(self, phases=None):
+        """
+        :param phases: Optional phase names; None selects every stage
+        :return: List of the selected stages
+        """
+        if phases is None:
+            return list(self.stages)
+        return [stage for stage in self.stages if stage.phase in phases]
+
+    def check_graph(self, stages, available):
+        """
+        Makes sure every input is available or produced by a selected stage, and that there is no cycle.
+
+        :raises ValueError: On a missing input or a dependency cycle
+        """
+        produced = set(available)
+        for stage in stages:
+            produced.update(stage.outputs)
+        for stage in stages:
+            missing = [name for name in stage.inputs if name not in produced]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' needs unavailable inputs: {', '.join(missing)}")
+
+        done = set(available)
+        remaining = list(stages)
+        while remaining:
+            ready = [stage for stage in remaining if all(name in done for name in stage.inputs)]
+            if not ready:
+                raise ValueError(f"Dependency cycle between stages: {', '.join(s.name for s in remaining)}")
+            for stage in ready:
+                done.update(stage.outputs)
+                remaining.remove(stage)
+
+    def execute(self, stage):
+        start, end = self.ranges[stage.name]
+        self.feedback.set_stage(stage.name, start, end)
+        try:
+            stage.function()
+        except PipelineCanceled:
+            self.feedback.complete_stage('canceled')
+            raise
+        except BaseException:
+            self.feedback.complete_stage('failed')
+            raise
+        self.feedback.complete_stage()
+
+    def run(self, phases=None, available=()):
+        """
+        Runs the selected stages.
+
+        :param phases: Optional phase names restricting the stages to run
+        :param available: Names of artifacts produced before (e.g. by an earlier phase)
+        :return: Set of the available artifact names afterwards
+        """
+        pending = self.select(phases)
+        done = set(available)
+        self.check_graph(pending, done)
+
+        running = {}  # Future -> Stage
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                ready = [stage for stage in pending if all(name in done for name in stage.inputs)] if error is None else []
+
+                # Start every ready background stage, then one main-thread stage
+                for stage in [stage for stage in ready if not stage.main_thread]:
+                    pending.remove(stage)
+                    running[executor.submit(self.execute, stage)] = stage
+                main_ready = [stage for stage in ready if stage.main_thread]
+                if main_ready:
+                    stage = main_ready[0]
+                    pending.remove(stage)
+                    try:
+                        self.execute(stage)
+                        done.update(stage.outputs)
+                    except BaseException as e:
+                        error = error or e
+                        self.feedback.cancel()
+                    continue
+
+                if not running:
+                    break
+
+                finished, _ = wait(list(running), timeout=0.1, return_when=FIRST_COMPLETED)
+                self.feedback.idle()
+                for future in finished:
+                    stage = running.pop(future)
+                    try:
+                        future.result()
+                        done.update(stage.outputs)
+                    except BaseException as e:
+                        error = error or e
+                        self.feedback.cancel()
+
+        if error is not None:
+            raise error
+        return done
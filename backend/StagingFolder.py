@@ -0,0 +1,63 @@
+import os
+import shutil
+
+
+class StagingFolder:
+    """
+    Hidden staging folder ('.<city>.partial') of a city run, next to the city output folder.
+
+    A run writes its outputs to the staging folder, which replaces the city folder only once
+    the run succeeds (commit). Both folders are renamed, never deleted in place: the previous
+    city folder is first moved aside to '.<city>.old', so the city folder always holds a
+    complete run. If the second rename fails the backup is moved back; if the process dies
+    between the renames, recover() restores it on the next run.
+
+    :param base_path: Base output directory
+    :param city: Name of the city, also the name of its output folder
+    """
+    def __init__(self, base_path, city):
+        self.base_path = base_path
+        self.city = city
+        self.final_path = os.path.join(base_path, city)
+        self.path = os.path.join(base_path, f'.{city}.partial')
+        self.backup_path = os.path.join(base_path, f'.{city}.old')
+
+    def recover(self):
+        """
+        Restores the previous city folder when a run was interrupted between the two renames of commit.
+
+        :return: True when the folder was restored
+        """
+        if os.path.isdir(self.backup_path) and not os.path.exists(self.final_path):
+            os.replace(self.backup_path, self.final_path)
+            print(f"[WARNING] Restored the previous output folder: {self.final_path}")
+            return True
+        return False
+
+    def create(self):
+        """
+        Creates an empty staging folder, deleting the one left by an interrupted run.
+
+        :return: Path of the staging folder
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path)
+        return self.path
+
+    def commit(self):
+        """
+        Replaces the city folder with the staging folder.
+
+        :return: Path of the city folder
+        :raises OSError: When a rename fails; the previous city folder is kept
+        """
+        shutil.rmtree(self.backup_path, ignore_errors=True)
+        if os.path.exists(self.final_path):
+            os.replace(self.final_path, self.backup_path)
+        try:
+            os.replace(self.path, self.final_path)
+        except OSError:
+            self.recover()
+            raise
+        shutil.rmtree(self.backup_path, ignore_errors=True)
+        return self.final_path
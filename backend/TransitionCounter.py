@@ -0,0 +1,104 @@
+import os
+import numpy as np
+import pandas as pd
+
+from .BlockRasterReader import RasterBlock
+from .GrowthCore import pixels_to_km2
+from .RasterGrid import RasterGrid
+from .PipelineFeedback import PipelineFeedback
+
+
+class TransitionCounter:
+    """
+    Counts year-to-year built-up transitions per sector and for the whole AOI from a BitPackedStack.
+
+    For every pair of consecutive years, each pixel is classified as stable (built in both years),
+    new (built only in the later year) or lost (built only in the earlier year). The stack is read in
+    strips of rows whose height follows a pixel budget; the sector labels and the AOI mask of a strip
+    are computed once and each pair is counted with one bincount per class, so the whole table
+    costs about one extra statistics pass and memory stays bounded by max_pixels.
+
+    :param stack: BitPackedStack of the analysis window (years ascending)
+    :param grid: RasterGrid of the year rasters
+    :param labeller: Sector labeller with a block_labels(block) method (ids start at 1, 0 is outside)
+    :param sector_names: Direction of each sector id (id = index + 1)
+    :param aoi_path: Path of the AOI vector file
+    :param max_pixels: Upper bound on the number of cells of a strip (rows x window width)
+    :param feedback: Optional PipelineFeedback for progress and cancellation between strips
+    """
+    CLASSES = ('Stable', 'New', 'Lost')
+
+    def __init__(self, stack, grid, labeller, sector_names, aoi_path, max_pixels=4 * 1024 * 1024, feedback=None):
+        self.stack = stack
+        self.grid = grid
+        self.labeller = labeller
+        self.sector_names = list(sector_names)
+        self.aoi_path = aoi_path
+        self.max_pixels = max_pixels
+        self.feedback = feedback or PipelineFeedback()
+        self.sector_counts = None  # Array (classes, pairs, sectors + 1) of pixel counts
+        self.aoi_counts = None     # Array (classes, pairs) of pixel counts
+
+    def count(self):
+        """
+        Fills sector_counts and aoi_counts in one pass over the stack.
+        """
+        packed = self.stack.packed
+        no_of_pairs = len(self.stack.years) - 1
+        bins = len(self.sector_names) + 1
+        xoff, yoff, xsize, ysize = self.stack.window
+
+        self.sector_counts = np.zeros((len(self.CLASSES), no_of_pairs, bins), dtype=np.int64)
+        self.aoi_counts = np.zeros((len(self.CLASSES), no_of_pairs), dtype=np.int64)
+        if no_of_pairs < 1:
+            return
+
+        aoi_layer = RasterGrid.open_vector(self.aoi_path).GetLayer(0)
+        rows_per_strip = max(1, self.max_pixels // max(1, xsize))
+        one = packed.dtype.type(1)
+
+        for row in range(0, ysize, rows_per_strip):
+            self.feedback.check()
+            self.feedback.set_fraction(row / max(1, ysize))
+            strip = packed[row:row + rows_per_strip]
+            self.feedback.count(pixels=strip.size, bytes_read=strip.nbytes)
+            block = RasterBlock(xoff, yoff + row, strip[None], [None])
+
+            labels = self.labeller.block_labels(block)
+            mask = self.grid.rasterize_layer(aoi_layer, window=block.window).astype(bool)
+
+            after = (strip & one) == one
+            for pair in range(no_of_pairs):
+                before, after = after, (strip >> packed.dtype.type(pair + 1)) & one == one
+                classes = (before & after, ~before & after, before & ~after)
+                for k, selected in enumerate(classes):
+                    self.sector_counts[k, pair] += np.bincount(labels[selected], minlength=bins)[:bins]
+                    self.aoi_counts[k, pair] += np.count_nonzero(selected & mask)
+
+    def to_dataframe(self):
+        """
+        :return: DataFrame with one row per period and sector (plus 'AOI'); areas in km²
+        """
+        if self.sector_counts is None:
+            self.count()
+
+        rows = []
+        years = self.stack.years
+        for pair in range(len(years) - 1):
+            period = f'{years[pair]}-{years[pair + 1]}'
+            for k, name in enumerate(self.sector_names):
+                rows.append([period, name] + [pixels_to_km2(self.sector_counts[c, pair, k + 1]) for c in range(len(self.CLASSES))])
+            rows.append([period, 'AOI'] + [pixels_to_km2(self.aoi_counts[c, pair]) for c in range(len(self.CLASSES))])
+
+        return pd.DataFrame(rows, columns=['Period', 'Sector'] + [f'{name} (km²)' for name in self.CLASSES])
+
+    def save(self, output_path, file_name='sectoralTransitions.xlsx'):
+        """
+        Writes the transition table to an Excel file next to 'sectoralWiseStats.xlsx'.
+
+        :return: Path of the written file
+        """
+        path = os.path.join(output_path, file_name)
+        os.makedirs(output_path, exist_ok=True)
+        self.to_dataframe().to_excel(path, index=False)
+        return path
@@ -0,0 +1,139 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from qgis.core import QgsMapSettings, QgsMapRendererParallelJob
+from PyQt5.QtGui import QImage, QColor, QPainter
+from PyQt5.QtCore import Qt, QSize
+
+from .ImageSizePolicy import ImageSizePolicy
+from .PipelineFeedback import PipelineFeedback
+
+
+class YearImageRenderer:
+    """
+    Renders the year images of a run (raster of the year, AOI and 'MultiRingsView' ring) all at
+    once instead of one blocking job per year.
+
+    The AOI outline and the ring are the same in every year, so they are rendered once into a
+    transparent overlay image (see overlay). Each year then renders its raster layer only, with
+    its own QgsMapSettings and QgsMapRendererParallelJob; the raster is composited over the
+    overlay, as the raster layer is listed above the vector layers. The jobs of a batch are
+    started together and render on the QGIS thread pool. Each finished image is handed to a
+    thread pool for compositing and PNG encoding while the other years are still rendering, so
+    the run scales with the cores and not with the number of years. A batch holds at most
+    'workers' years, which caps the memory to 'workers' images of at most 4 bytes per pixel
+    of the ImageSizePolicy budget (100 MB at 25 Mpx).
+
+    Must be called from the main thread, like any map rendering job.
+
+    :param context: RunContext holding the raster, AOI and 'MultiRingsView' layers of the run
+    :param output_path: Directory where the images are saved, as '<year>.png'
+    :param image_size: Tuple representing image width and height in pixels; derived from the raster
+                       resolution over the ring extent by ImageSizePolicy when None
+    :param background_color: Tuple (R, G, B, A) defining background color for the images
+    :param workers: Number of years rendered and encoded at the same time (default: CPU count, up to 8)
+    """
+    def __init__(self, context, output_path, image_size=None, background_color=(255, 255, 255, 0), workers=None):
+        self.context = context
+        self.output_path = output_path
+        self.image_size = QSize(*(image_size or ImageSizePolicy().for_context(context)))
+        self.bg_color = QColor(*background_color)
+        self.workers = max(1, workers or min(os.cpu_count() or 1, 8))
+        self.overlay_image = None  # AOI and ring rendered once, see overlay
+
+    def overlay(self):
+        """
+        Renders the AOI outline and the 'MultiRingsView' ring once, on a transparent background,
+        over the ring extent at the image size.
+
+        :return: QImage (ARGB32 premultiplied)
+        """
+        if self.overlay_image is None:
+            layers = [self.context.aoi_layer] if self.context.aoi_layer else []
+            layers.append(self.context.rings_view_layer)
+            job = QgsMapRendererParallelJob(self.map_settings(layers, QColor(Qt.transparent)))
+            job.start()
+            job.waitForFinished()
+            self.overlay_image = job.renderedImage()
+        return self.overlay_image
+
+    def image_path(self, index):
+        return os.path.join(self.output_path, f'{self.context.years[index]}.png')
+
+    def map_settings(self, layers, background_color):
+        """
+        :return: QgsMapSettings rendering the layers over the ring extent at the image size
+        """
+        ms = QgsMapSettings()
+        ms.setBackgroundColor(background_color)
+        ms.setOutputImageFormat(QImage.Format_ARGB32_Premultiplied)
+        ms.setFlag(QgsMapSettings.Antialiasing, True)
+        ms.setLayers(layers)
+        ms.setExtent(self.context.rings_view_layer.extent())
+        ms.setOutputSize(self.image_size)
+        return ms
+
+    def composite(self, image):
+        """
+        Draws a year raster image over the background color and the overlay.
+
+        :param image: Raster-only image of a year, transparent background
+        :return: Final QImage
+        """
+        result = QImage(self.image_size, QImage.Format_ARGB32_Premultiplied)
+        result.fill(self.bg_color.rgba())
+        painter = QPainter(result)
+        painter.drawImage(0, 0, self.overlay())
+        painter.drawImage(0, 0, image)
+        painter.end()
+        return result
+
+    def save(self, image, path):
+        """
+        Composites a year image and saves it as PNG (runs in the encoder threads).
+        """
+        image = self.composite(image)
+        if not image.save(path):
+            raise OSError(f"Unable to save image: {path}")
+        print(f"[INFO] Image saved: {path}")
+        return path
+
+    def render(self, indexes=None, feedback=None):
+        """
+        Renders and saves the images of the given years.
+
+        :param indexes: Year indexes (ascending year order); all years by default
+        :param feedback: Optional PipelineFeedback for progress and cancellation between batches
+        :return: List of the saved image paths, in the order of indexes
+        """
+        feedback = feedback or PipelineFeedback()
+        indexes = list(range(len(self.context.raster_layers))) if indexes is None else list(indexes)
+        if not indexes:
+            return []
+
+        self.overlay()  # Rendered once on the main thread, then shared read-only by the encoder threads
+        transparent = QColor(Qt.transparent)
+        paths = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as encoder:
+            for start in range(0, len(indexes), self.workers):
+                feedback.check()
+                batch = indexes[start:start + self.workers]
+
+                jobs = []
+                for index in batch:
+                    job = QgsMapRendererParallelJob(self.map_settings([self.context.raster_layer(index)], transparent))
+                    job.start()
+                    jobs.append((index, job))
+
+                # Encode each image while the later ones finish rendering
+                futures = []
+                for index, job in jobs:
+                    job.waitForFinished()
+                    futures.append(encoder.submit(self.save, job.renderedImage(), self.image_path(index)))
+
+                for future in futures:
+                    paths.append(future.result())
+                    done += 1
+                    feedback.set_fraction(done / len(indexes))
+        return paths
@@ -0,0 +1,188 @@
+import multiprocessing
+import multiprocessing.spawn
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .BlockRasterReader import BlockRasterReader
+from .RasterGrid import RasterGrid
+
+
+class WedgeSectorLabeller:
+    """
+    Burns sector wedge polygons (e.g. copied from the 'MultiRings' layer) block by block.
+    Only plain WKT strings are kept, so the labeller can be sent to worker processes; the
+    OGR layer is rebuilt lazily in each process.
+
+    :param grid: RasterGrid of the year rasters
+    :param wkt_values: List of (WKT string, sector id) pairs; ids start at 1
+    """
+    def __init__(self, grid, wkt_values):
+        self.grid = grid
+        self.wkt_values = list(wkt_values)
+        self.source = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['source'] = None  # OGR data sources cannot be pickled
+        return state
+
+    def layer(self):
+        if self.source is None:
+            self.source = RasterGrid.memory_layer(self.wkt_values)
+        return self.source.GetLayer(0)
+
+    def bounds(self):
+        """
+        :return: Tuple (xmin, ymin, xmax, ymax) of the wedges
+        """
+        xmin, xmax, ymin, ymax = self.layer().GetExtent()
+        return xmin, ymin, xmax, ymax
+
+    def block_labels(self, block):
+        """
+        :return: 2D array of sector ids of a RasterBlock, 0 outside every wedge
+        """
+        return self.grid.rasterize_layer(self.layer(), attribute='value', window=block.window)
+
+
+def block_sector_sums(block, labels, bins):
+    """
+    Sums every year of a block within each sector. Nodata cells are dropped by sending them
+    to label 0 (outside all sectors).
+
+    :param block: RasterBlock
+    :param labels: 2D array of sector ids of the block
+    :param bins: Number of labels (sectors + 1)
+    :return: 2D array of shape (years, bins)
+    """
+    valid = block.valid()
+    sums = np.zeros((block.data.shape[0], bins))
+    for i in range(block.data.shape[0]):
+        year_labels = np.where(valid[i], labels, 0)
+        sums[i] = np.bincount(year_labels.ravel(), weights=block.data[i].ravel(), minlength=bins)
+    return sums
+
+
+def year_sector_sums(raster_path, window, labeller, bins, cache=None):
+    """
+    Worker task: sector sums of one year raster.
+
+    :param raster_path: Path of the year raster
+    :param window: Pixel window to read
+    :param labeller: AnalyticSectorBinner or WedgeSectorLabeller
+    :param bins: Number of labels (sectors + 1)
+    :param cache: Optional RasterCache
+    :return: 1D array of length bins
+    """
+    sums = np.zeros(bins)
+    for block in BlockRasterReader([raster_path], window, cache=cache):
+        sums += block_sector_sums(block, labeller.block_labels(block), bins)[0]
+    return sums
+
+
+def year_aoi_total(raster_path, vector_path, window, cache=None):
+    """
+    Worker task: built-up pixel count of one year raster inside the AOI.
+
+    :param raster_path: Path of the year raster
+    :param vector_path: Path of the AOI vector file
+    :param window: Pixel window to read
+    :param cache: Optional RasterCache
+    :return: Pixel count (int)
+    """
+    grid = RasterGrid(raster_path)
+    aoi_layer = RasterGrid.open_vector(vector_path).GetLayer(0)
+
+    total = 0
+    for block in BlockRasterReader([raster_path], window, cache=cache):
+        mask = grid.rasterize_layer(aoi_layer, window=block.window).astype(bool)
+        if mask.any():
+            valid = block.valid()[0] & mask
+            total += int(np.where(valid, block.data[0], 0).sum(dtype=np.int64))
+    return total
+
+
+class YearProcessPool:
+    """
+    Fans independent per-year reductions out to a pool of worker processes.
+
+    Workers only import this module and its NumPy/GDAL dependencies, never QgsProject or iface.
+    Results come back in input order, so the output is deterministic whatever the completion order.
+
+    Workers are started from a 'spawn' context with the interpreter of python_executable. The
+    spawn executable is shared by the whole process (SpawnContext.set_executable sets it for
+    every spawn context), so it is only changed while the pool starts and restored afterwards;
+    other users of multiprocessing in QGIS keep their setting.
+
+    :param workers: Number of worker processes (default: number of CPUs)
+    """
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+
+    @staticmethod
+    def python_executable():
+        """
+        Python interpreter used to spawn workers. Inside QGIS sys.executable is the QGIS binary,
+        so the interpreter shipped next to it (sys.exec_prefix) is looked up instead.
+        """
+        name = os.path.basename(sys.executable).lower()
+        if name.startswith('python'):
+            return sys.executable
+
+        candidates = [
+            os.path.join(sys.exec_prefix, 'python.exe'),
+            os.path.join(sys.exec_prefix, 'python3.exe'),
+            os.path.join(sys.exec_prefix, 'bin', 'python3'),
+            os.path.join(sys.exec_prefix, 'bin', 'python'),
+        ]
+        for candidate in candidates:
+            if os.path.exists(candidate):
+                return candidate
+        return sys.executable
+
+    def map(self, function, *iterables, feedback=None):
+        """
+        Runs function over the zipped iterables in the pool.
+
+        :param feedback: Optional PipelineFeedback; progress is reported as years complete and
+                         pending years are dropped when the run is canceled
+        :return: List of results, in input order
+        """
+        tasks = list(zip(*iterables))
+        results = []
+        if self.workers <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                if feedback is not None:
+                    feedback.check()
+                results.append(function(*task))
+                if feedback is not None:
+                    feedback.set_fraction(len(results) / len(tasks))
+            return results
+
+        context = multiprocessing.get_context('spawn')
+        previous_executable = multiprocessing.spawn.get_executable()
+        context.set_executable(self.python_executable())
+        executor = ProcessPoolExecutor(max_workers=min(self.workers, len(tasks)), mp_context=context)
+        try:
+            # Every task is submitted, and so every worker started, before map returns
+            results_iterator = executor.map(function, *zip(*tasks))
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            context.set_executable(previous_executable)
+
+        try:
+            for result in results_iterator:
+                results.append(result)
+                if feedback is not None:
+                    feedback.set_fraction(len(results) / len(tasks))
+                    feedback.check()
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        return results
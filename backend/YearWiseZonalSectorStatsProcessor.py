@@ -1,9 +1,12 @@
 from qgis.core import (
-    QgsRasterLayer, QgsProject, QgsVectorLayer
+    QgsRasterLayer, QgsVectorLayer
 )
 from qgis.analysis import QgsZonalStatistics
-from qgis.utils import iface
 from .DirectionalRingGenerator import DirectionalRingGenerator
+from .RasterGrid import RasterGrid
+from .GrowthCore import pixels_to_km2, sector_sums
+from .PipelineFeedback import PipelineFeedback
+from .YearStatsWorkers import WedgeSectorLabeller
 
 import pandas as pd
 import os
@@ -13,6 +16,19 @@ class YearWiseZonalSectorStatsProcessor:
     This class computes zonal statistics (sum) for each year and each directional sector 
     based on raster and vector layers, then compiles the results into a single Excel sheet.
 
+    Three modes are available:
+    - 'zonal': runs QgsZonalStatistics against the sector layer once per year.
+    - 'labels': burns the sector wedges into an integer label grid (sector id per pixel);
+      each year then costs one raster read plus a single bincount over that grid.
+    - 'analytic': no wedge geometry at all; every pixel centre is binned into its sector from
+      its bearing and distance to the centroid (AnalyticSectorBinner).
+
+    The two grid modes, 'labels' and 'analytic', reduce the rasters with the Qt-free core
+    (GrowthCore.sector_sums): all years are streamed together and the sector ids of a block are
+    shared by every year, so memory depends on the block size only. With workers > 1 the years
+    are instead reduced in parallel worker processes, each one reading its own raster; the
+    labellers are plain picklable objects for that purpose.
+
     :param iface: QGIS interface object
     :param city: Name of the city (used for layer naming and output structure)
     :param raster_paths: List of file paths to raster layers, each corresponding to a year
@@ -20,9 +36,25 @@ class YearWiseZonalSectorStatsProcessor:
     :param no_of_sectors: Number of directional sectors
     :param centroid_point: Central point used to generate directional ring sectors
     :param output_path: Folder path where Excel output will be saved
-    :param vector_layer_name: Name of vector layer with directional sectors (default: 'MultiRings')
+    :param context: RunContext of the run; provides the AOI layer and keeps the 'MultiRings' sector layer
+                    and the sector labeller
+    :param aoi_totals: Optional dict of AOI built-up pixel counts keyed by year, used for the footer
+                       row instead of reading the AOI layer attributes
+    :param mode: 'zonal' (default), 'labels' or 'analytic'
+    :param window: Optional analysis window (xoff, yoff, xsize, ysize) on the raster grid;
+                   the grid modes read nothing outside it
+    :param cache: Optional RasterCache serving decoded pixels to the grid modes
+    :param workers: Optional number of worker processes for the grid modes; None or 1 runs serially
+    :param known_sums: Optional dict of already computed sector sums ({name: pixel sum}) keyed by
+                       raster path, e.g. from a ResultsStore; only the other rasters are computed
+    :param feedback: Optional PipelineFeedback for progress and cancellation (between years or blocks)
     """
-    def __init__(self, iface, city, raster_paths, years, no_of_sectors, centroid_point, output_path, vector_layer_name='MultiRings'):
+    MODES = ('zonal', 'labels', 'analytic')
+
+    def __init__(self, iface, city, raster_paths, years, no_of_sectors, centroid_point, output_path, context, aoi_totals=None, mode='zonal', window=None, cache=None, workers=None, known_sums=None, feedback=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown sector statistics mode: {mode}")
+
         self.iface = iface
         self.city = city
         self.raster_paths = raster_paths
@@ -30,42 +62,154 @@ class YearWiseZonalSectorStatsProcessor:
         self.no_of_sectors = no_of_sectors
         self.centroid_point = centroid_point
         self.output_path = output_path
-        self.vector_layer_name = vector_layer_name
+        self.context = context
+        self.aoi_totals = aoi_totals
+        self.mode = mode
+        self.window = window
+        self.cache = cache
+        self.workers = workers
+        self.feedback = feedback or PipelineFeedback()
+        self.labeller = None           # Cached (window, labeller) of the grid modes
         self.attrTableAllYears = []  # Stores stats for all years
-        self.dir_ring_gen()            # Generate directional rings
-        self.delete_prev_year_IPVSUM()  # Clean up any previous 'ipv-sum' fields
+        self.sector_names = []         # Direction of each sector id (id = index + 1)
+        self.sector_sums = dict(known_sums or {})  # Sector sums ({name: sum}) per raster path
+        if self.mode != 'analytic':
+            self.dir_ring_gen()        # Generate directional rings
+        if self.mode == 'zonal':
+            self.delete_prev_year_IPVSUM()  # Clean up any previous 'ipv-sum' fields
 
     def dir_ring_gen(self):
         """
-        Generates the directional ring layer without visualizing it.
+        Generates the directional ring layer without visualizing it, once per run.
         """
-        generator = DirectionalRingGenerator(self.iface, self.city, self.no_of_sectors, self.centroid_point, False)
+        if self.context.rings_layer is not None:
+            return
+        generator = DirectionalRingGenerator(self.iface, self.city, self.no_of_sectors, self.centroid_point, False,
+                                             context=self.context)
         generator.generate_layer()
 
-    def calculate_year_wise_stats(self, raster_path, year):
+    def sector_sums_zonal(self, raster_path):
         """
-        Calculates zonal sum statistics for the given raster and year using the vector ring layer.
+        Sums the raster within each sector using QgsZonalStatistics on the vector ring layer.
 
-        :param raster_path: File path to the raster layer for the given year
-        :param year: The year associated with this raster
-        :return: Dictionary of sector-wise summed values
+        :param raster_path: File path to the raster layer
+        :return: Dictionary of sector-wise pixel sums keyed by direction
         """
         raster_layer = QgsRasterLayer(raster_path, 'Raster Layer')
-        vector_layer = QgsProject.instance().mapLayersByName(self.vector_layer_name)[0]
+        vector_layer = self.context.rings_layer
 
         # Perform zonal statistics using SUM
         zoneStat = QgsZonalStatistics(vector_layer, raster_layer, 'ipv-', 1, QgsZonalStatistics.Sum)
         zoneStat.calculateStatistics(None)
+        self.feedback.count(pixels=raster_layer.width() * raster_layer.height())
 
-        # Extract and normalize (area in km²) stats for each sector (1-indexed)
-        attributeTable = {}
+        sums = {}
         for i in range(1, self.no_of_sectors + 1):
             value = vector_layer.getFeature(i).attributes()
-            attributeTable[value[0]] = (value[1] * 900) / 1000000  # Convert cell area sum to km²
+            sums[value[0]] = value[1]
+        return sums
+
+    def sector_labeller_labels(self, grid):
+        """
+        Prepares the 'labels' mode: the wedges of the vector ring layer are copied into an OGR
+        memory layer and burnt block by block. Sector ids start at 1 in feature order; 0 marks
+        pixels outside every sector.
+
+        :param grid: RasterGrid of the year rasters
+        :return: Tuple (pixel window of the sectors, WedgeSectorLabeller)
+        """
+        vector_layer = self.context.rings_layer
+
+        wkt_values = []
+        self.sector_names = []
+        for sector_id, feature in enumerate(vector_layer.getFeatures(), start=1):
+            wkt_values.append((feature.geometry().asWkt(), sector_id))
+            self.sector_names.append(feature.attributes()[0])
+
+        labeller = WedgeSectorLabeller(grid, wkt_values)
+        return grid.window_for_bounds(*labeller.bounds()), labeller
+
+    def sector_labeller_analytic(self, grid):
+        """
+        Prepares the 'analytic' mode: sector ids come from each pixel's bearing and distance
+        to the centroid, with the same ring and half-sector offset as the 'MultiRings' layer.
+
+        :param grid: RasterGrid of the year rasters
+        :return: Tuple (pixel window of the ring, AnalyticSectorBinner)
+        """
+        generator = DirectionalRingGenerator(self.iface, self.city, self.no_of_sectors, self.centroid_point, False,
+                                             context=self.context)
+        ring = generator.ring()
+        self.sector_names = ring.names
+
+        binner = ring.binner(grid.geotransform)
+        return grid.window_for_bounds(*binner.bounds()), binner
+
+    def sector_labeller(self, grid):
+        """
+        Sector labeller of the current mode; the 'zonal' mode uses the wedges of the ring layer.
+        It is built once per run (on the thread that owns the project layers) and kept on the run
+        context, so later processors of the run reuse it without reading the ring layer.
+
+        :param grid: RasterGrid of the year rasters
+        :return: Tuple (pixel window of the sectors, labeller with a block_labels(block) method)
+        """
+        if self.labeller is None:
+            if self.context.sector_labeller is not None:
+                window, labeller, self.sector_names = self.context.sector_labeller
+                self.labeller = window, labeller
+            else:
+                if self.mode == 'analytic':
+                    self.labeller = self.sector_labeller_analytic(grid)
+                else:
+                    self.labeller = self.sector_labeller_labels(grid)
+                self.context.sector_labeller = self.labeller + (list(self.sector_names),)
+        return self.labeller
+
+    def compute_sector_sums(self):
+        """
+        Sums every raster without known sums within each sector in a single blocked pass over
+        the sector window, or with one worker process per year when workers > 1.
+        """
+        raster_paths = [path for path in self.raster_paths if path not in self.sector_sums]
+
+        grid = RasterGrid(self.raster_paths[0])
+        window, labeller = self.sector_labeller(grid)
+
+        bins = len(self.sector_names) + 1
+        window = RasterGrid.intersect_windows(window, self.window)
+
+        sums = sector_sums(raster_paths, window, labeller, bins, self.cache, self.workers, self.feedback)
+
+        for i, path in enumerate(raster_paths):
+            self.sector_sums[path] = {name: sums[i][k + 1] for k, name in enumerate(self.sector_names)}
+
+    def calculate_year_wise_stats(self, raster_path, year):
+        """
+        Calculates zonal sum statistics for the given raster and year using the vector ring layer.
+
+        :param raster_path: File path to the raster layer for the given year
+        :param year: The year associated with this raster
+        :return: Dictionary of sector-wise summed values
+        """
+        if raster_path not in self.sector_sums:
+            if self.mode in ('labels', 'analytic'):
+                self.compute_sector_sums()
+            else:
+                self.sector_sums[raster_path] = self.sector_sums_zonal(raster_path)
+        sums = self.sector_sums[raster_path]
+
+        # Normalize (area in km²) stats for each sector
+        attributeTable = {}
+        for direction, value in sums.items():
+            attributeTable[direction] = pixels_to_km2(value)  # Convert cell area sum to km²
 
         # Get summed area from AOI layer (for footer)
-        layer = QgsProject.instance().mapLayersByName("AOI")[0]
-        yearStats = layer.getFeature(0).attributes()[::-1]  # Reverse to match ordering
+        if self.aoi_totals is not None:
+            yearStats = [self.aoi_totals[y] for y in self.years]
+        else:
+            layer = self.context.aoi_layer
+            yearStats = layer.getFeature(0).attributes()[::-1]  # Reverse to match ordering
 
         # Create a DataFrame for this year's zonal statistics
         df = pd.DataFrame(attributeTable.items(), columns=['Sector', str(year)])
@@ -101,10 +245,12 @@ class YearWiseZonalSectorStatsProcessor:
 
     def delete_prev_year_IPVSUM(self):
         """
-        Removes the 'ipv-sum' attribute field from the active vector layer 
+        Removes the 'ipv-sum' attribute field from the sector ring layer of the run
         (cleanup before recalculating zonal stats).
         """
-        layer = iface.activeLayer()
+        layer = self.context.rings_layer
+        if layer is None:
+            return
 
         if layer.isValid() and layer.type() == QgsVectorLayer.VectorLayer:
             layer.startEditing()
@@ -125,7 +271,15 @@ class YearWiseZonalSectorStatsProcessor:
         Main driver that runs zonal statistics for all raster layers/year pairs 
         and returns the final list of attribute tables per year.
         """
+        # The grid modes reduce all missing years in one pass (progress is reported per block)
+        if self.mode in ('labels', 'analytic') and any(path not in self.sector_sums for path in self.raster_paths):
+            self.compute_sector_sums()
+
         for i, raster_path in enumerate(self.raster_paths):
-            self.attrTableAllYears.append(self.calculate_year_wise_stats(raster_path, self.years[i]))
-            self.delete_prev_year_IPVSUM()
+            self.feedback.check()
+            with self.feedback.year(self.years[i]):
+                self.attrTableAllYears.append(self.calculate_year_wise_stats(raster_path, self.years[i]))
+            if self.mode == 'zonal':
+                self.delete_prev_year_IPVSUM()
+                self.feedback.set_fraction((i + 1) / len(self.raster_paths))
         return self.attrTableAllYears
\ No newline at end of file
@@ -1,48 +1,105 @@
 import processing
 from qgis.core import (
-    QgsRasterLayer, QgsVectorLayer, QgsProject
+    QgsRasterLayer, QgsVectorLayer
 )
 from qgis.analysis import QgsZonalStatistics
+import numpy as np
+
 from .delAttributes import delAttributes
+from .GrowthCore import aoi_totals
+from .PipelineFeedback import PipelineFeedback
 
 class ZonalStatisticsProcessor:
     """
     This class handles the processing of zonal statistics by applying raster layers to a vector AOI layer.
-    The output is stored as attribute values within the vector layer.
+
+    Two engines are available:
+    - 'qgis': runs QgsZonalStatistics once per raster and stores the sums as attribute values
+      within the AOI vector layer.
+    - 'numpy': streams aligned blocks of all years over the AOI window (BlockRasterReader),
+      burns the AOI mask for each block and counts the built-up pixels of every year in a single
+      pass. The AOI layer is left untouched and the totals are kept in memory (see year_totals).
+      With workers > 1 the years are instead counted in parallel worker processes, one year each.
     """
 
-    def __init__(self, raster_paths, vector_path):
+    ENGINES = ('qgis', 'numpy')
+
+    def __init__(self, raster_paths, vector_path, years=None, engine='qgis', window=None, cache=None, workers=None, feedback=None, layer=None):
         """
         Initializes the processor and runs the zonal statistics analysis.
 
         :param raster_paths: List of raster file paths to be used for statistics.
         :param vector_path: Path to the vector layer (AOI) used as zones.
+        :param years: Optional list of years matching raster_paths, used as keys of year_totals.
+        :param engine: 'qgis' (default) or 'numpy'.
+        :param window: Optional analysis window (xoff, yoff, xsize, ysize) on the raster grid;
+                       the numpy engine reads nothing outside it.
+        :param cache: Optional RasterCache serving decoded pixels to the numpy engine.
+        :param workers: Optional number of worker processes for the numpy engine; None or 1 runs serially.
+        :param feedback: Optional PipelineFeedback for progress and cancellation (between years or blocks).
+        :param layer: Optional AOI layer of the run (RunContext.aoi_layer) the qgis engine writes the sums to;
+                      the vector file is loaded otherwise.
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown zonal statistics engine: {engine}")
+
         self.raster_paths = raster_paths
         self.vector_path = vector_path
-        self.process()
+        self.years = list(years) if years is not None else list(range(len(raster_paths)))
+        self.engine = engine
+        self.window = window
+        self.cache = cache
+        self.workers = workers
+        self.feedback = feedback or PipelineFeedback()
+        self.layer = layer
+        self.totals = np.zeros(len(raster_paths), dtype=np.int64)  # Built-up pixel count per raster
+        self.year_totals = {}                                         # Same counts keyed by year
+
+        if self.engine == 'numpy':
+            self.process_numpy()
+        else:
+            self.process()
 
     def process(self):
         """
         Runs zonal statistics on the vector layer using each raster in the list.
         It clears old attributes before computing new statistics.
         """
-        # Load the AOI vector layer from the QGIS project
-        layer = QgsProject.instance().mapLayersByName("AOI")[0]
+        # AOI vector layer of the run, or the vector file
+        layer = self.layer if self.layer is not None else QgsVectorLayer(self.vector_path, 'AOI', 'ogr')
 
         # Remove existing attributes other than 'FID' and geometry
         delAttributes(layer)
 
         # Loop through all raster paths
         for i, raster_path in enumerate(self.raster_paths):
-            # Create a raster layer
-            raster_layer = QgsRasterLayer(raster_path, 'Raster Layer')
+            self.feedback.check()
 
-            # Create a Zonal Statistics object with prefix 'ipv-'
-            zone_stat = QgsZonalStatistics(layer, raster_layer, 'ipv-', 1, QgsZonalStatistics.Sum)
+            with self.feedback.year(self.years[i]):
+                # Create a raster layer
+                raster_layer = QgsRasterLayer(raster_path, 'Raster Layer')
 
-            # Compute statistics and store in the AOI layer
-            zone_stat.calculateStatistics(None)
+                # Create a Zonal Statistics object with prefix 'ipv-'
+                zone_stat = QgsZonalStatistics(layer, raster_layer, 'ipv-', 1, QgsZonalStatistics.Sum)
 
-        # Reload layer after modification (optional redundancy)
-        layer = QgsProject.instance().mapLayersByName("AOI")[0]
\ No newline at end of file
+                # Compute statistics and store in the AOI layer
+                zone_stat.calculateStatistics(None)
+                self.feedback.count(pixels=raster_layer.width() * raster_layer.height())
+            self.feedback.set_fraction((i + 1) / len(self.raster_paths))
+
+        # Mirror the stored sums in memory so both engines expose the same results
+        values = layer.getFeature(0).attributes()[:len(self.raster_paths)]
+        self.totals = np.array([v or 0 for v in values], dtype=np.int64)
+        self.year_totals = dict(zip(self.years, self.totals.tolist()))
+
+    def process_numpy(self):
+        """
+        Counts built-up pixels inside the AOI for every raster in one pass with the Qt-free core
+        (GrowthCore.aoi_totals), or with one worker process per year when workers > 1.
+
+        Only the blocks intersecting the AOI extent are read. The AOI mask is burnt per block,
+        and all years of a block are reduced together. Nodata cells are excluded, matching
+        QgsZonalStatistics.
+        """
+        self.totals = aoi_totals(self.raster_paths, self.vector_path, self.window, self.cache, self.workers, self.feedback)
+        self.year_totals = dict(zip(self.years, self.totals.tolist()))
@@ -1,49 +1,66 @@
-from qgis.core import QgsPalettedRasterRenderer, QgsGradientColorRamp, QgsFillSymbol, QgsRasterLayer, QgsVectorLayer, QgsProject
+from qgis.core import QgsPalettedRasterRenderer, QgsGradientColorRamp, QgsFillSymbol, QgsRasterLayer, QgsVectorLayer
 from PyQt5.QtGui import QColor
 from .DirectionalRingGenerator import DirectionalRingGenerator
+from .RasterGrid import RasterGrid
+from .BlockRasterReader import BlockRasterReader
 import matplotlib.pyplot as plt
+import numpy as np
 
 class loadLayers:
     """
     This class handles loading and styling of raster and vector (AOI) layers in QGIS, 
     and generates a directional ring overlay for visualizing urban segmentation.
 
+    It also computes the analysis window: the pixel window of the raster grid covering the
+    'MultiRingsView' extent (which contains the AOI). Downstream stages read only this window.
+    The layers and the window are stored on the run context.
+
+    Styling the rasters scans their values within the window. With style=False the layers are
+    left unstyled: scan_palette_values() can then run on a worker thread and
+    apply_styling_raster(values) on the main thread.
+
     :param iface: QGIS interface object
-    :param raster_paths: List of file paths to raster layers
-    :param vector_path: Path to vector layer (e.g., AOI)
-    :param city: Name of the city (used for layer naming and folder structure)
-    :param no_of_sectors: Number of directional segments (e.g., 4, 8, 16)
-    :param no_of_raster_layers: Total number of raster layers
-    :param colors: List of RGBA color strings for each raster layer
-    :param centroid_point: Optional centroid point to center the directional rings
+    :param context: RunContext of the run (raster paths, AOI path, city, sectors, colors, centroid)
+    :param cache: Optional RasterCache used when scanning the rasters for palette values
+    :param style: Styles the raster layers right away (default)
     """
-    def __init__(self, iface, raster_paths, vector_path, city, no_of_sectors, no_of_raster_layers, colors, centroid_point):
+    def __init__(self, iface, context, cache=None, style=True):
         self.iface = iface
-        self.raster_paths = raster_paths
-        self.vector_path = vector_path
-        self.city = city
-        self.no_of_sectors = no_of_sectors
-        self.no_of_raster_layers = no_of_raster_layers
-        self.colors = colors
-        self.centroid_point = centroid_point
+        self.context = context
+        self.raster_paths = context.raster_paths
+        self.vector_path = context.aoi_path
+        self.city = context.city
+        self.no_of_sectors = context.no_of_sectors
+        self.no_of_raster_layers = len(context.raster_paths)
+        self.colors = context.colors
+        self.centroid_point = context.centroid_point
+        self.cache = cache
+        self.raster_layers = []
+        self.window = None  # (xoff, yoff, xsize, ysize) of the 'MultiRingsView' extent on the raster grid
 
         # Optional: color map from matplotlib (not used directly)
         cmap = plt.get_cmap('tab20')
 
-        # Apply styles and load layers
-        self.apply_styling_raster()
+        # Load layers, then style the rasters once the analysis window is known
+        self.load_rasters()
         self.apply_styling_AOI()
         self.applyMultiRingsView()
+        self.compute_window()
+        if style:
+            self.apply_styling_raster()
 
     def applyMultiRingsView(self):
         """
         Loads and displays the directional ring view (MultiRingsView) based on centroid and segment count.
-        Also sets the map canvas extent to fit the new layer.
+        Also sets the map canvas extent to fit the new layer (skipped without iface, e.g. in batch runs).
         """
-        generator = DirectionalRingGenerator(self.iface, self.city, self.no_of_sectors, self.centroid_point, view=True)
-        generator.generate_layer()
+        generator = DirectionalRingGenerator(self.iface, self.city, self.no_of_sectors, self.centroid_point, view=True,
+                                             context=self.context)
+        layer = generator.generate_layer()
+
+        if self.iface is None:
+            return
 
-        layer = QgsProject.instance().mapLayersByName('MultiRingsView')[0]
         canvas = self.iface.mapCanvas()
         canvas.setExtent(layer.extent())
         canvas.refresh()
@@ -63,22 +80,82 @@ class loadLayers:
             'stops': '0.25;171,221,164,255:0.5;255,255,191,255:0.75;253,174,97,255'
         }
 
-    def apply_styling_raster(self):
+    def load_rasters(self):
         """
-        Loads all raster layers in reverse order and applies a gradient-based styling using a color ramp.
+        Loads all raster layers into the project in reverse order (styling is applied later).
         """
+        for i, raster_path in enumerate(self.raster_paths[::-1]):
+            layer = QgsRasterLayer(raster_path, f"rasterImage{self.no_of_raster_layers-i}")
+            if layer.isValid():
+                self.context.add_layer(layer)
+            self.raster_layers.append(layer)
+        self.context.raster_layers = self.raster_layers[::-1]
+
+    def compute_window(self):
+        """
+        Computes, once per run, the pixel window of the raster grid covering the
+        'MultiRingsView' extent. The view ring is built around the AOI, so the window
+        contains both the AOI and the statistics sectors.
+        """
+        extent = self.context.rings_view_layer.extent()
+        grid = RasterGrid(self.raster_paths[0])
+        self.window = grid.window_for_bounds(
+            extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum()
+        )
+        self.context.window = self.window
+        print(f"[INFO] Analysis window (xoff, yoff, xsize, ysize): {self.window}")
+
+    def palette_values(self, raster_path):
+        """
+        Scans the values found inside the analysis window only, instead of the whole raster.
+        Does not touch the project, so it may run outside the main thread.
+
+        :param raster_path: Path of the raster to scan
+        :return: Sorted list of the valid pixel values
+        """
+        values = set()
+        for block in BlockRasterReader([raster_path], self.window, cache=self.cache):
+            values.update(np.unique(block.data[0][block.valid()[0]]).tolist())
+        return sorted(values)
+
+    def scan_palette_values(self):
+        """
+        :return: Palette values of every raster, in layer order (see apply_styling_raster)
+        """
+        return [self.palette_values(raster_path) for raster_path in self.raster_paths[::-1]]
+
+    def palette_classes(self, values, color_ramp):
+        """
+        Builds paletted renderer classes from the given values. Colors are spread along the ramp
+        as QgsPalettedRasterRenderer.classDataFromRaster does.
+
+        :param values: Sorted pixel values, see palette_values
+        :param color_ramp: Color ramp used to color the unique values
+        :return: List of QgsPalettedRasterRenderer.Class
+        """
+        step = 1.0 / (len(values) - 1) if len(values) > 1 else 0
+        return [
+            QgsPalettedRasterRenderer.Class(value, color_ramp.color(i * step), str(value))
+            for i, value in enumerate(values)
+        ]
+
+    def apply_styling_raster(self, values=None):
+        """
+        Applies a gradient-based styling using a color ramp to all loaded raster layers.
+
+        :param values: Optional palette values of every raster (see scan_palette_values);
+                       scanned here when not given
+        """
+        if values is None:
+            values = self.scan_palette_values()
         for i, raster_path in enumerate(self.raster_paths[::-1]):
             # Create color ramp properties using custom color for this layer
             props = self.create_props(self.colors[i])
             color_ramp = QgsGradientColorRamp().create(props)
+            layer = self.raster_layers[i]
 
-            # Load the raster layer
-            layer = QgsRasterLayer(raster_path, f"rasterImage{self.no_of_raster_layers-i}")
-            if layer.isValid():
-                QgsProject.instance().addMapLayer(layer)
-
-            # Generate and apply paletted renderer from gradient (used here per original logic)
-            classes = QgsPalettedRasterRenderer.classDataFromRaster(layer.dataProvider(), 1, color_ramp)
+            # Generate and apply paletted renderer from gradient (values scanned within the window)
+            classes = self.palette_classes(values[i], color_ramp)
             renderer = QgsPalettedRasterRenderer(layer.dataProvider(), 1, classes)
             layer.setRenderer(renderer)
             layer.triggerRepaint()
@@ -94,7 +171,8 @@ class loadLayers:
             print(f"[ERROR] Failed to load vector layer: {self.vector_path}")
             return
 
-        QgsProject.instance().addMapLayer(vector_layer)
+        self.context.add_layer(vector_layer)
+        self.context.aoi_layer = vector_layer
         print(f"[INFO] Loaded AOI layer for: {self.city}")
 
         # Apply "No Brush" fill style (outline only)
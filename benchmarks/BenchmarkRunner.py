@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from .SyntheticCity import SyntheticCity
+
+SIZE_RANGE = (1000, 50000)
+YEARS_RANGE = (2, 40)
+SECTOR_COUNTS = (4, 8, 16)
+
+# Named scenarios (size in pixels, years, sectors)
+PRESETS = {
+    'small': (1000, 4, 8),
+    'medium': (5000, 10, 8),
+    'large': (20000, 20, 16),
+    'xlarge': (50000, 40, 16),
+}
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+
+def scenario_name(size, years, sectors):
+    return f'{size}px_{years}y_{sectors}s'
+
+
+def check_scenario(size, years, sectors):
+    """
+    Validates a scenario against the supported ranges.
+    """
+    if not SIZE_RANGE[0] <= size <= SIZE_RANGE[1]:
+        raise ValueError(f"size must be between {SIZE_RANGE[0]} and {SIZE_RANGE[1]} pixels")
+    if not YEARS_RANGE[0] <= years <= YEARS_RANGE[1]:
+        raise ValueError(f"years must be between {YEARS_RANGE[0]} and {YEARS_RANGE[1]}")
+    if sectors not in SECTOR_COUNTS:
+        raise ValueError(f"sectors must be one of {SECTOR_COUNTS}")
+
+
+class BenchmarkRunner:
+    """
+    Times every stage of the city pipeline on a synthetic city and compares the throughput with
+    stored baselines.
+
+    The stages of CityRasterProcessor run one after the other (not overlapped as in run_all), so
+    each wall time belongs to a single stage: load_layers, image_settings, sector_layer (ring
+    generation), fingerprint, palette, render_years, stack, aoi_statistics (zonal),
+    sector_statistics, transitions, style_layers, render_overlay, bar_graph, radar_chart and layout. The ring geometry alone is timed as 'rings'.
+    Every repeat starts from empty artifact, results and raster caches, and the best wall time
+    of the repeats is kept.
+
+    Throughput is the scenario's pixels (size² × years) per second of stage wall time, so it can
+    be compared between stages and runs of the same scenario. Baselines are machine specific.
+
+    :param size: Width and height of the synthetic rasters in pixels
+    :param years: Number of years
+    :param sectors: Number of directional sectors
+    :param data_path: Folder of the synthetic data, reused by later runs
+    :param engine: Statistics engine, 'numpy' (default) or 'qgis'
+    :param repeat: Number of runs of the pipeline
+    :param keep_outputs: Keeps the output folders of the runs
+    """
+    def __init__(self, size, years, sectors, data_path, engine='numpy', repeat=1, keep_outputs=False):
+        check_scenario(size, years, sectors)
+        if repeat < 1:
+            raise ValueError("repeat must be at least 1")
+
+        self.size = size
+        self.years = years
+        self.sectors = sectors
+        self.name = scenario_name(size, years, sectors)
+        self.data_path = os.path.join(data_path, f'{size}px_{years}y')
+        self.engine = engine
+        self.repeat = repeat
+        self.keep_outputs = keep_outputs
+        self.pixels = size * size * years
+
+    def run(self):
+        """
+        Generates the data when missing and runs the pipeline repeat times.
+
+        :return: Dictionary {stage: {'seconds': best wall time, 'throughput': pixels per second}}
+        """
+        from ..backend.BatchRunner import start_qgis
+        start_qgis()
+
+        raster_paths, aoi_path, years = SyntheticCity(self.data_path, self.size, self.years).generate()
+
+        best = {}
+        for i in range(self.repeat):
+            print(f"[INFO] {self.name}: run {i + 1}/{self.repeat}")
+            seconds = self.run_once(raster_paths, aoi_path, years)
+            for stage, value in seconds.items():
+                best[stage] = min(value, best.get(stage, value))
+
+        return {
+            stage: {'seconds': round(value, 4), 'throughput': self.pixels / value if value > 0 else None}
+            for stage, value in best.items()
+        }
+
+    def run_once(self, raster_paths, aoi_path, years):
+        """
+        One pipeline run in a fresh output folder.
+
+        :return: Dictionary {stage: wall seconds}
+        """
+        from qgis.core import QgsVectorLayer
+        from ..backend.BatchRunner import DEFAULT_COLORS
+        from ..backend.CityRasterProcessor import CityRasterProcessor
+        from ..backend.DirectionalRingGenerator import DirectionalRingGenerator
+
+        output_path = tempfile.mkdtemp(prefix=f'bga_bench_{self.name}_')
+        os.environ['BGA_CACHE_DIR'] = os.path.join(output_path, 'raster_cache')
+        colors = [','.join(str(c) for c in DEFAULT_COLORS[i % len(DEFAULT_COLORS)]) for i in range(len(years))][::-1]
+
+        seconds = {}
+        processor = None
+        try:
+            start = time.perf_counter()
+            aoi_layer = QgsVectorLayer(aoi_path, 'AOI', 'ogr')
+            DirectionalRingGenerator(None, self.name, self.sectors, None, False, vector_layer=aoi_layer).build_segments()
+            seconds['rings'] = time.perf_counter() - start
+
+            processor = CityRasterProcessor(
+                output_path, None, None, self.name, raster_paths, aoi_path, years, self.sectors, colors,
+                engine=self.engine, auto_run=False
+            )
+            self.run_stages(processor)
+            for stage in processor.run_report.to_dict()['stages']:
+                seconds[stage['name']] = stage['wall_seconds']
+        finally:
+            if processor is not None:
+                processor.store.close()
+                processor.release_layers()
+            if not self.keep_outputs:
+                shutil.rmtree(output_path, ignore_errors=True)
+        return seconds
+
+    @staticmethod
+    def run_stages(processor):
+        """
+        Runs the pipeline stages one at a time, in dependency order.
+        """
+        scheduler = processor.scheduler()
+        pending = scheduler.select()
+        done = set()
+        scheduler.check_graph(pending, done)
+        while pending:
+            stage = next(stage for stage in pending if all(name in done for name in stage.inputs))
+            pending.remove(stage)
+            scheduler.execute(stage)
+            done.update(stage.outputs)
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, name, results):
+    baselines = load_baselines(path)
+    baselines[name] = {stage: result['throughput'] for stage, result in results.items()}
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def compare(results, baseline, threshold, min_seconds=0.05):
+    """
+    Compares the throughput of every stage with its baseline.
+
+    :param results: Results of BenchmarkRunner.run
+    :param baseline: Dictionary {stage: baseline throughput}
+    :param threshold: Allowed relative drop of throughput (e.g. 0.2 for 20 %)
+    :param min_seconds: Stages faster than this are too noisy to compare and are skipped
+    :return: List of (stage, throughput, baseline throughput) of the regressed stages
+    """
+    regressions = []
+    for stage, result in results.items():
+        reference = baseline.get(stage)
+        if not reference or result['throughput'] is None or result['seconds'] < min_seconds:
+            continue
+        if result['throughput'] < reference * (1 - threshold):
+            regressions.append((stage, result['throughput'], reference))
+    return regressions
+
+
+def print_results(name, results, baseline):
+    print(f"{name}")
+    print(f"{'stage':<20} {'seconds':>10} {'Mpx/s':>12} {'baseline':>12} {'change':>8}")
+    for stage, result in results.items():
+        throughput = result['throughput'] / 1e6 if result['throughput'] else 0
+        reference = baseline.get(stage)
+        change = f"{(result['throughput'] / reference - 1) * 100:+.0f}%" if reference and result['throughput'] else ''
+        reference = f"{reference / 1e6:.1f}" if reference else '-'
+        print(f"{stage:<20} {result['seconds']:>10.3f} {throughput:>12.1f} {reference:>12} {change:>8}")
+
+
+def main(argv=None):
+    """
+    Command line entry point, e.g. with the plugins folder on PYTHONPATH:
+
+        python -m BGA.benchmarks.BenchmarkRunner --preset medium
+        python -m BGA.benchmarks.BenchmarkRunner --size 2000 --years 8 --sectors 16 --save-baseline
+
+    :return: Exit code, 1 when a stage throughput dropped beyond the threshold
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the BGA pipeline stages on synthetic built-up rasters.")
+    parser.add_argument('--preset', choices=sorted(PRESETS), help="Named scenario (overrides size, years and sectors)")
+    parser.add_argument('--size', type=int, default=PRESETS['small'][0], help="Raster width and height in pixels")
+    parser.add_argument('--years', type=int, default=PRESETS['small'][1], help="Number of years")
+    parser.add_argument('--sectors', type=int, default=PRESETS['small'][2], help="Number of sectors")
+    parser.add_argument('--engine', choices=('numpy', 'qgis'), default='numpy', help="Statistics engine")
+    parser.add_argument('--repeat', type=int, default=1, help="Number of runs; the best time of each stage is kept")
+    parser.add_argument('--data', default=os.path.join(tempfile.gettempdir(), 'bga_bench_data'),
+                        help="Folder of the synthetic data, reused between runs")
+    parser.add_argument('--baselines', default=BASELINES_PATH, help="Baselines JSON file")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed relative throughput drop (default 0.2)")
+    parser.add_argument('--save-baseline', action='store_true', help="Stores the results as the scenario baseline")
+    parser.add_argument('--output', help="Optional JSON file receiving the results")
+    parser.add_argument('--keep-outputs', action='store_true', help="Keeps the pipeline output folders")
+    args = parser.parse_args(argv)
+
+    size, years, sectors = PRESETS[args.preset] if args.preset else (args.size, args.years, args.sectors)
+    try:
+        runner = BenchmarkRunner(size, years, sectors, args.data, args.engine, args.repeat, args.keep_outputs)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = runner.run()
+    baseline = load_baselines(args.baselines).get(runner.name, {})
+    print_results(runner.name, results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'scenario': runner.name, 'engine': args.engine, 'results': results}, f, indent=2)
+
+    if args.save_baseline:
+        save_baseline(args.baselines, runner.name, results)
+        print(f"[INFO] Baseline saved for {runner.name}: {args.baselines}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for stage, throughput, reference in regressions:
+        print(f"[ERROR] {stage}: {throughput / 1e6:.1f} Mpx/s, baseline {reference / 1e6:.1f} Mpx/s "
+              f"(more than {args.threshold:.0%} slower)")
+    if not baseline:
+        print(f"[WARNING] No baseline for {runner.name}; run with --save-baseline to store one")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import math
+import os
+import numpy as np
+from osgeo import gdal, ogr, osr
+
+
+class SyntheticCity:
+    """
+    Generates a synthetic city: one binary built-up GeoTIFF per year and an AOI polygon, at any
+    size, so the pipeline can be timed well beyond the sample rasters.
+
+    Built-up land grows outwards from the city center: every pixel gets a score from its distance
+    to the center (stretched along two axes so the sectors differ) plus noise, and is built from
+    the first year whose threshold exceeds the score. Built-up pixels therefore never disappear,
+    as in the real stacks. The rasters are written strip by strip, so memory follows the strip
+    size and not the raster size; the same seed always gives the same rasters.
+
+    :param output_path: Folder the rasters and the AOI are written to
+    :param size: Width and height of the rasters in pixels
+    :param years: Number of years (rasters)
+    :param seed: Seed of the noise
+    :param pixel_size: Pixel size in meters (30 m like the Landsat built-up rasters)
+    :param epsg: Projected CRS of the rasters and the AOI
+    :param strip_rows: Number of rows computed and written at once
+    """
+    FIRST_YEAR = 1991
+    YEAR_STEP = 1
+
+    def __init__(self, output_path, size, years, seed=0, pixel_size=30, epsg=32645, strip_rows=512):
+        if size < 1 or years < 1:
+            raise ValueError("The size and the number of years must be positive.")
+
+        self.output_path = output_path
+        self.size = size
+        self.years = [self.FIRST_YEAR + i * self.YEAR_STEP for i in range(years)]
+        self.seed = seed
+        self.pixel_size = pixel_size
+        self.strip_rows = strip_rows
+        self.srs = osr.SpatialReference()
+        self.srs.ImportFromEPSG(epsg)
+
+        # Grid origin (upper left corner) and city center in map units
+        self.origin = (500000.0, 2600000.0)
+        self.center = (self.origin[0] + size * pixel_size / 2, self.origin[1] - size * pixel_size / 2)
+        self.aoi_radius = 0.25 * size * pixel_size
+
+        self.raster_paths = [os.path.join(output_path, f'builtup_{year}.tif') for year in self.years]
+        self.aoi_path = os.path.join(output_path, 'aoi.shp')
+
+    def exists(self):
+        return all(os.path.exists(path) for path in self.raster_paths + [self.aoi_path])
+
+    def generate(self):
+        """
+        Writes the rasters and the AOI, unless they already exist.
+
+        :return: Tuple (raster paths, AOI path, years)
+        """
+        os.makedirs(self.output_path, exist_ok=True)
+        if not self.exists():
+            self.write_rasters()
+            self.write_aoi()
+            print(f"[INFO] Synthetic city: {self.size}x{self.size} pixels, {len(self.years)} years in {self.output_path}")
+        return self.raster_paths, self.aoi_path, self.years
+
+    def first_built(self, row_start, rows):
+        """
+        Index of the first built-up year of every pixel of a strip; len(years) means never built.
+
+        :param row_start: First row of the strip
+        :param rows: Number of rows of the strip
+        :return: 2D int array of shape (rows, size)
+        """
+        cx = (self.center[0] - self.origin[0]) / self.pixel_size
+        cy = (self.origin[1] - self.center[1]) / self.pixel_size
+        radius = self.aoi_radius / self.pixel_size
+
+        x = np.arange(self.size) + 0.5 - cx
+        y = (np.arange(row_start, row_start + rows) + 0.5 - cy)[:, np.newaxis]
+        angle = np.arctan2(y, x)
+        distance = np.hypot(x, y) / radius * (1 + 0.3 * np.cos(2 * angle + 0.7))
+
+        rng = np.random.default_rng([self.seed, row_start])
+        score = distance + 0.25 * rng.random((rows, self.size))
+
+        # Built in year k when score <= 0.15 + 0.9 * (k + 1) / years
+        level = np.ceil((score - 0.15) / 0.9 * len(self.years)) - 1
+        return np.clip(level, 0, len(self.years)).astype(np.int32)
+
+    def write_rasters(self):
+        driver = gdal.GetDriverByName('GTiff')
+        options = ['TILED=YES', 'COMPRESS=DEFLATE', 'BIGTIFF=IF_SAFER']
+        datasets = []
+        for path in self.raster_paths:
+            dataset = driver.Create(path, self.size, self.size, 1, gdal.GDT_Byte, options)
+            dataset.SetGeoTransform((self.origin[0], self.pixel_size, 0, self.origin[1], 0, -self.pixel_size))
+            dataset.SetProjection(self.srs.ExportToWkt())
+            datasets.append(dataset)
+
+        for row_start in range(0, self.size, self.strip_rows):
+            rows = min(self.strip_rows, self.size - row_start)
+            first = self.first_built(row_start, rows)
+            for k, dataset in enumerate(datasets):
+                dataset.GetRasterBand(1).WriteArray((first <= k).astype(np.uint8), 0, row_start)
+
+        for dataset in datasets:
+            dataset.FlushCache()
+        datasets.clear()
+
+    def write_aoi(self):
+        """
+        Writes a lobed polygon around the center as the AOI shapefile.
+        """
+        driver = ogr.GetDriverByName('ESRI Shapefile')
+        if os.path.exists(self.aoi_path):
+            driver.DeleteDataSource(self.aoi_path)
+        source = driver.CreateDataSource(self.aoi_path)
+        layer = source.CreateLayer('aoi', self.srs, ogr.wkbPolygon)
+        layer.CreateField(ogr.FieldDefn('name', ogr.OFTString))
+
+        ring = ogr.Geometry(ogr.wkbLinearRing)
+        for i in range(65):
+            angle = 2 * math.pi * (i % 64) / 64
+            radius = self.aoi_radius * (1 + 0.15 * math.sin(3 * angle))
+            ring.AddPoint_2D(self.center[0] + radius * math.cos(angle), self.center[1] + radius * math.sin(angle))
+        polygon = ogr.Geometry(ogr.wkbPolygon)
+        polygon.AddGeometry(ring)
+
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetField('name', 'synthetic')
+        feature.SetGeometry(polygon)
+        layer.CreateFeature(feature)
+        source = None
@@ -0,0 +1,3 @@
+"""
+Benchmarks of the BGA pipeline on synthetic built-up rasters (see BenchmarkRunner).
+"""
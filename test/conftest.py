@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# The plugin folder on the path, so the tests import the backend modules as 'backend.<Module>'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def synthetic_city(tmp_path_factory):
+    """
+    Small synthetic city (benchmarks.SyntheticCity): 64x64 pixel GeoTIFFs of 4 years and an AOI
+    shapefile. Tests using it are skipped without GDAL.
+
+    :return: Tuple (raster paths, AOI path, years)
+    """
+    pytest.importorskip('osgeo')
+    from benchmarks.SyntheticCity import SyntheticCity
+    return SyntheticCity(str(tmp_path_factory.mktemp('synthetic_city')), 64, 4).generate()
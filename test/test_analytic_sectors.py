@@ -0,0 +1,77 @@
+import math
+
+import numpy as np
+import pytest
+
+from backend.AnalyticSectorBinner import AnalyticSectorBinner
+
+GEOTRANSFORM = (500000.0, 30.0, 0.0, 2600000.0, 0.0, -30.0)
+WIDTH, HEIGHT = 200, 160
+# Off the pixel centers, so no pixel center lies exactly on a wedge edge
+CENTER = (500000.0 + 30 * 97.3, 2600000.0 - 30 * 81.7)
+RADIUS = 30 * 60.3
+
+
+def wedge_labels(no_of_sectors, offset):
+    """
+    Reference labels: sector id of the ring wedge (triangle from the center to two consecutive
+    polygon vertices, as burnt from the 'MultiRings' layer) containing each pixel center.
+    """
+    width = 360 / no_of_sectors
+    vertices = [
+        (CENTER[0] + RADIUS * math.cos(math.radians(i * width - offset)),
+         CENTER[1] + RADIUS * math.sin(math.radians(i * width - offset)))
+        for i in range(no_of_sectors)
+    ]
+    x = GEOTRANSFORM[0] + (np.arange(WIDTH) + 0.5) * GEOTRANSFORM[1]
+    y = GEOTRANSFORM[3] + (np.arange(HEIGHT) + 0.5) * GEOTRANSFORM[5]
+    x, y = np.meshgrid(x, y)
+
+    labels = np.zeros((HEIGHT, WIDTH), dtype=np.int32)
+    for i in range(no_of_sectors):
+        triangle = [CENTER, vertices[i], vertices[(i + 1) % no_of_sectors]]
+        sides = [
+            (bx - ax) * (y - ay) - (by - ay) * (x - ax)
+            for (ax, ay), (bx, by) in zip(triangle, triangle[1:] + triangle[:1])
+        ]
+        inside = (sides[0] >= 0) & (sides[1] >= 0) & (sides[2] >= 0)
+        labels[inside] = i + 1
+    return labels
+
+
+@pytest.mark.parametrize('no_of_sectors', [4, 8, 16])
+@pytest.mark.parametrize('view', [False, True])
+def test_analytic_sector_sums_match_wedges(no_of_sectors, view):
+    offset = 0 if view else 360 / no_of_sectors / 2
+    binner = AnalyticSectorBinner(CENTER[0], CENTER[1], no_of_sectors, RADIUS, GEOTRANSFORM, offset)
+    analytic = binner.labels(0, 0, WIDTH, HEIGHT)
+    wedges = wedge_labels(no_of_sectors, offset)
+
+    built = np.random.default_rng(no_of_sectors).random((HEIGHT, WIDTH)) < 0.4
+    bins = no_of_sectors + 1
+    assert np.array_equal(np.bincount(analytic[built], minlength=bins), np.bincount(wedges[built], minlength=bins))
+    assert np.array_equal(analytic, wedges)
+
+
+def test_block_labels_match_full_grid():
+    binner = AnalyticSectorBinner(CENTER[0], CENTER[1], 8, RADIUS, GEOTRANSFORM, 22.5)
+    full = binner.labels(0, 0, WIDTH, HEIGHT)
+    assert np.array_equal(binner.labels(37, 21, 50, 40), full[21:61, 37:87])
+
+
+@pytest.mark.parametrize('no_of_sectors', [4, 8, 16])
+def test_analytic_labels_match_burnt_wedges(tmp_path, no_of_sectors):
+    gdal = pytest.importorskip('osgeo.gdal')
+    from backend.BlockRasterReader import RasterBlock
+    from backend.GrowthCore import SectorRing
+    from backend.RasterGrid import RasterGrid
+
+    path = str(tmp_path / 'grid.tif')
+    dataset = gdal.GetDriverByName('GTiff').Create(path, WIDTH, HEIGHT, 1, gdal.GDT_Byte)
+    dataset.SetGeoTransform(GEOTRANSFORM)
+    dataset = None
+
+    ring = SectorRing(CENTER[0], CENTER[1], no_of_sectors, RADIUS)
+    block = RasterBlock(0, 0, np.zeros((1, HEIGHT, WIDTH), dtype=np.uint8), [None])
+    burnt = ring.labeller(RasterGrid(path)).block_labels(block)
+    assert np.array_equal(ring.binner(GEOTRANSFORM).block_labels(block), burnt)
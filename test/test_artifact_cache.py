@@ -0,0 +1,127 @@
+import os
+
+import pytest
+
+from backend.ArtifactCache import ArtifactCache
+from backend.StagingFolder import StagingFolder
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(os.urandom(size))
+    return path
+
+
+def touch_entry(cache, fingerprint, used):
+    os.utime(os.path.join(cache.entry_path(fingerprint), ArtifactCache.MANIFEST), (used, used))
+
+
+def test_store_and_restore(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    fingerprint = ArtifactCache.fingerprint('bar_graph', {'years': [2000, 2010]})
+    source = write(str(tmp_path / 'run1' / 'barGraph.png'), 100)
+
+    assert not cache.restore(fingerprint, {'image': str(tmp_path / 'run2' / 'barGraph.png')})
+    assert cache.store(fingerprint, {'image': source})
+
+    target = str(tmp_path / 'run2' / 'chart.png')
+    assert cache.restore(fingerprint, {'image': target})
+    with open(source, 'rb') as a, open(target, 'rb') as b:
+        assert a.read() == b.read()
+    assert not cache.restore(fingerprint, {'image': target, 'pdf': target + '.pdf'})  # Other roles
+
+
+def test_fingerprint_depends_on_stage_and_params():
+    fingerprint = ArtifactCache.fingerprint('bar_graph', {'years': [2000, 2010], 'totals': [1, 2]})
+    assert fingerprint == ArtifactCache.fingerprint('bar_graph', {'totals': [1, 2], 'years': [2000, 2010]})
+    assert fingerprint != ArtifactCache.fingerprint('radar_chart', {'years': [2000, 2010], 'totals': [1, 2]})
+    assert fingerprint != ArtifactCache.fingerprint('bar_graph', {'years': [2000, 2010], 'totals': [1, 3]})
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'), max_bytes=10 ** 9)
+    fingerprints = [ArtifactCache.fingerprint('image', {'year': year}) for year in range(4)]
+    for i, fingerprint in enumerate(fingerprints):
+        cache.store(fingerprint, {'image': write(str(tmp_path / f'{i}.png'), 1000)})
+        touch_entry(cache, fingerprint, 1000000 + i)
+
+    # Restoring the oldest entry makes it the most recently used
+    assert cache.restore(fingerprints[0], {'image': str(tmp_path / 'restored.png')})
+
+    cache.max_bytes = 2500  # Room for two entries (images plus small manifests)
+    cache.evict()
+    present = [os.path.isdir(cache.entry_path(fingerprint)) for fingerprint in fingerprints]
+    assert present == [True, False, False, True]
+
+
+def test_store_keeps_the_cache_under_its_size_limit(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'), max_bytes=3500)
+    fingerprints = [ArtifactCache.fingerprint('image', {'year': year}) for year in range(6)]
+    for i, fingerprint in enumerate(fingerprints):
+        cache.store(fingerprint, {'image': write(str(tmp_path / f'{i}.png'), 1000)})
+        touch_entry(cache, fingerprint, 1000000 + i)
+
+    sizes = 0
+    for root, _, files in os.walk(cache.cache_path):
+        sizes += sum(os.path.getsize(os.path.join(root, file)) for file in files)
+    assert sizes <= cache.max_bytes
+    assert os.path.isdir(cache.entry_path(fingerprints[-1]))
+    assert not os.path.isdir(cache.entry_path(fingerprints[0]))
+
+
+def test_store_keeps_an_entry_larger_than_the_limit(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'), max_bytes=100)
+    fingerprint = ArtifactCache.fingerprint('layout', {})
+    assert cache.store(fingerprint, {'pdf': write(str(tmp_path / 'layout.pdf'), 1000)})
+    assert os.path.isdir(cache.entry_path(fingerprint))
+
+
+def staging_run(tmp_path, content):
+    staging = StagingFolder(str(tmp_path), 'Pune')
+    with open(os.path.join(staging.create(), 'result.txt'), 'w') as f:
+        f.write(content)
+    return staging
+
+
+def read_result(tmp_path):
+    with open(os.path.join(str(tmp_path), 'Pune', 'result.txt')) as f:
+        return f.read()
+
+
+def test_commit_replaces_the_city_folder(tmp_path):
+    assert staging_run(tmp_path, 'first').commit() == os.path.join(str(tmp_path), 'Pune')
+    assert read_result(tmp_path) == 'first'
+
+    staging_run(tmp_path, 'second').commit()
+    assert read_result(tmp_path) == 'second'
+    assert sorted(os.listdir(str(tmp_path))) == ['Pune']  # No staging folder or backup left
+
+
+def test_commit_restores_the_backup_when_the_second_rename_fails(tmp_path, monkeypatch):
+    staging_run(tmp_path, 'first').commit()
+    staging = staging_run(tmp_path, 'second')
+
+    replace = os.replace
+
+    def failing_replace(source, target):
+        if source == staging.path:
+            raise PermissionError("staging folder locked")
+        replace(source, target)
+
+    monkeypatch.setattr(os, 'replace', failing_replace)
+    with pytest.raises(PermissionError):
+        staging.commit()
+
+    assert read_result(tmp_path) == 'first'
+    assert not os.path.exists(staging.backup_path)
+
+
+def test_recover_restores_an_interrupted_commit(tmp_path):
+    staging_run(tmp_path, 'first').commit()
+    staging = staging_run(tmp_path, 'second')
+    os.replace(staging.final_path, staging.backup_path)  # Interrupted after the first rename
+
+    assert StagingFolder(str(tmp_path), 'Pune').recover()
+    assert read_result(tmp_path) == 'first'
+    assert not StagingFolder(str(tmp_path), 'Pune').recover()
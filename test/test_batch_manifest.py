@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+from backend.BatchRunner import DEFAULT_COLORS, parse_job, read_manifest
+
+CSV_HEADER = 'city,aoi_path,raster_paths,years,sectors,centroid,colors\n'
+
+
+def write_manifest(folder, name, content):
+    path = os.path.join(str(folder), name)
+    with open(path, 'w', newline='') as f:
+        f.write(content if isinstance(content, str) else json.dumps(content))
+    return path
+
+
+def default_color(i):
+    return ','.join(str(c) for c in DEFAULT_COLORS[i])
+
+
+def test_csv_manifest_sorts_years_with_their_rasters_and_colors(tmp_path):
+    path = write_manifest(tmp_path, 'cities.csv', CSV_HEADER +
+                          'Pune,aoi/pune.shp,r2010.tif;r1990.tif;r2000.tif,2010;1990;2000,16,"73.8,18.5",'
+                          '"1,1,1,255;2,2,2,255;3,3,3,255"\n')
+    [job] = read_manifest(path)
+
+    assert job['city'] == 'Pune'
+    assert job['years'] == [1990, 2000, 2010]
+    assert job['raster_paths'] == [os.path.join(str(tmp_path), name) for name in ('r1990.tif', 'r2000.tif', 'r2010.tif')]
+    assert job['aoi_path'] == os.path.join(str(tmp_path), 'aoi', 'pune.shp')
+    assert job['sectors'] == 16
+    assert job['centroid'] == [73.8, 18.5]
+    # Descending year order, as the processor expects
+    assert job['colors'] == ['1,1,1,255', '3,3,3,255', '2,2,2,255']
+
+
+def test_json_manifest_with_default_colors_and_sectors(tmp_path):
+    path = write_manifest(tmp_path, 'cities.json', {'cities': [
+        {'city': 'Patna', 'aoi_path': '/data/patna.shp', 'raster_paths': ['/data/b.tif', '/data/a.tif'], 'years': [2020, 2000]},
+        {'city': 'Gaya', 'aoi_path': 'gaya.gpkg|layername=aoi', 'raster_paths': 'g1.tif;g2.tif', 'years': '2001;2011',
+         'sectors': 4, 'centroid': [85.0, 24.8]},
+    ]})
+    patna, gaya = read_manifest(path)
+
+    assert patna['years'] == [2000, 2020]
+    assert patna['raster_paths'] == ['/data/a.tif', '/data/b.tif']
+    assert patna['sectors'] == 8
+    assert patna['centroid'] is None
+    # The default colors follow the ascending years, then are listed in descending year order
+    assert patna['colors'] == [default_color(1), default_color(0)]
+    assert gaya['sectors'] == 4
+    assert gaya['centroid'] == [85.0, 24.8]
+    assert gaya['raster_paths'] == [os.path.join(str(tmp_path), 'g1.tif'), os.path.join(str(tmp_path), 'g2.tif')]
+
+
+def test_json_manifest_as_a_list(tmp_path):
+    path = write_manifest(tmp_path, 'cities.json', [
+        {'city': 'Agra', 'aoi_path': 'agra.shp', 'raster_paths': ['a.tif'], 'years': [2015]},
+    ])
+    assert [job['city'] for job in read_manifest(path)] == ['Agra']
+
+
+@pytest.mark.parametrize('name, content', [
+    ('cities.csv', CSV_HEADER + 'Pune,aoi.shp,a.tif;b.tif,2000;2010,6,,\n'),
+    ('cities.json', [{'city': 'Pune', 'aoi_path': 'aoi.shp', 'raster_paths': ['a.tif'], 'years': [2000], 'sectors': 12}]),
+])
+def test_rejects_a_bad_sector_count(tmp_path, name, content):
+    with pytest.raises(ValueError, match='sectors'):
+        read_manifest(write_manifest(tmp_path, name, content))
+
+
+@pytest.mark.parametrize('name, content', [
+    ('cities.csv', CSV_HEADER + 'Pune,aoi.shp,a.tif,2000,8,,\nPatna,aoi.shp,b.tif,2000,8,,\nPune,aoi2.shp,c.tif,2010,8,,\n'),
+    ('cities.json', [{'city': 'Pune', 'aoi_path': 'a.shp', 'raster_paths': ['a.tif'], 'years': [2000]},
+                     {'city': 'Pune', 'aoi_path': 'b.shp', 'raster_paths': ['b.tif'], 'years': [2000]}]),
+])
+def test_rejects_duplicate_cities(tmp_path, name, content):
+    with pytest.raises(ValueError, match='Duplicate cities in manifest: Pune'):
+        read_manifest(write_manifest(tmp_path, name, content))
+
+
+@pytest.mark.parametrize('entry, message', [
+    ({'city': ' ', 'raster_paths': ['a.tif'], 'years': [2000]}, 'city'),
+    ({'city': 'Pune', 'raster_paths': ['a.tif', 'b.tif'], 'years': [2000]}, 'same'),
+    ({'city': 'Pune', 'raster_paths': [], 'years': []}, 'non-zero'),
+    ({'city': 'Pune', 'raster_paths': ['a.tif', 'b.tif'], 'years': [2000, 2010], 'colors': '1,2,3,255'}, 'color'),
+    ({'city': 'Pune', 'raster_paths': ['a.tif'], 'years': [2000], 'centroid': '73.8'}, 'centroid'),
+])
+def test_parse_job_rejects_bad_entries(entry, message):
+    with pytest.raises(ValueError, match=message):
+        parse_job(entry, '/data')
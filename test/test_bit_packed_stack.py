@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from backend.BitPackedStack import BitPackedStack
+
+
+def random_stack(no_of_years, seed=0, shape=(40, 30)):
+    built = np.random.default_rng(seed).random((no_of_years,) + shape) < 0.3
+    years = list(range(1991, 1991 + no_of_years))
+    return built, BitPackedStack(BitPackedStack.pack(built), years, (5, 7, shape[1], shape[0]))
+
+
+@pytest.mark.parametrize('no_of_years, dtype', [(2, np.uint8), (8, np.uint8), (9, np.uint16), (33, np.uint64), (64, np.uint64)])
+def test_pack_unpack_round_trip(no_of_years, dtype):
+    built, stack = random_stack(no_of_years)
+    assert stack.packed.dtype == dtype
+    for i in range(no_of_years):
+        assert np.array_equal(stack.year_bits(i), built[i])
+
+
+def test_counts_gains_losses():
+    built, stack = random_stack(12, seed=1)
+    mask = np.random.default_rng(2).random(built.shape[1:]) < 0.5
+
+    assert stack.counts() == {year: int(built[i].sum()) for i, year in enumerate(stack.years)}
+    assert stack.counts(mask) == {year: int(built[i][mask].sum()) for i, year in enumerate(stack.years)}
+    for i in range(len(stack.years) - 1):
+        assert np.array_equal(stack.gains(i), built[i + 1] & ~built[i])
+        assert np.array_equal(stack.losses(i), built[i] & ~built[i + 1])
+        assert np.array_equal(stack.stable(i), built[i] & built[i + 1])
+
+
+@pytest.mark.parametrize('no_of_years', [3, 8, 16, 40, 64])
+def test_first_built_year(no_of_years):
+    built, stack = random_stack(no_of_years, seed=no_of_years)
+    ever = built.any(axis=0)
+    expected_index = np.where(ever, built.argmax(axis=0), -1)
+    expected_year = np.where(ever, np.array(stack.years)[built.argmax(axis=0)], 0)
+
+    assert np.array_equal(stack.first_built_index(), expected_index)
+    assert np.array_equal(stack.first_built_year(), expected_year)
+
+
+def test_save_load_round_trip(tmp_path):
+    _, stack = random_stack(10, seed=3)
+    stack.fingerprint = 'inputs'
+    path = str(tmp_path / 'stack.npz')
+    stack.save(path)
+
+    loaded = BitPackedStack.load(path)
+    assert np.array_equal(loaded.packed, stack.packed)
+    assert loaded.years == stack.years
+    assert loaded.window == stack.window
+    assert loaded.fingerprint == 'inputs'
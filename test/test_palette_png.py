@@ -0,0 +1,73 @@
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from backend.PalettePng import PalettePng
+
+PALETTE = [(255, 255, 255, 0), (200, 30, 10, 255), (35, 35, 35, 128)]
+
+
+def read_chunks(path):
+    """
+    :return: List of (type, data) chunks of a PNG file, checking the signature and CRCs
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    assert content[:8] == PalettePng.SIGNATURE
+
+    chunks = []
+    position = 8
+    while position < len(content):
+        length, = struct.unpack('>I', content[position:position + 4])
+        kind = content[position + 4:position + 8]
+        data = content[position + 8:position + 8 + length]
+        crc, = struct.unpack('>I', content[position + 8 + length:position + 12 + length])
+        assert crc == zlib.crc32(kind + data) & 0xffffffff
+        chunks.append((kind, data))
+        position += 12 + length
+    return chunks
+
+
+def test_write_decodes_to_the_same_pixels(tmp_path):
+    pixels = np.random.default_rng(0).integers(0, len(PALETTE), (37, 53)).astype(np.uint8)
+    path = str(tmp_path / 'image.png')
+    PalettePng.write(path, pixels, PALETTE)
+
+    chunks = read_chunks(path)
+    kinds = [kind for kind, _ in chunks]
+    assert kinds == [b'IHDR', b'PLTE', b'tRNS', b'IDAT', b'IEND']
+
+    data = dict(chunks)
+    assert struct.unpack('>IIBBBBB', data[b'IHDR']) == (53, 37, 8, 3, 0, 0, 0)
+    assert data[b'PLTE'] == bytes(value for color in PALETTE for value in color[:3])
+    assert data[b'tRNS'] == bytes([0, 255, 128])
+
+    rows = np.frombuffer(zlib.decompress(data[b'IDAT']), dtype=np.uint8).reshape(37, 54)
+    assert not rows[:, 0].any()  # Filter type 0 on every row
+    assert np.array_equal(rows[:, 1:], pixels)
+
+
+def test_opaque_palette_has_no_transparency(tmp_path):
+    path = str(tmp_path / 'opaque.png')
+    PalettePng.write(path, np.zeros((2, 2), dtype=np.uint8), [(0, 0, 0, 255), (255, 255, 255, 255)])
+    assert b'tRNS' not in [kind for kind, _ in read_chunks(path)]
+
+
+def test_palette_size_is_checked(tmp_path):
+    with pytest.raises(ValueError):
+        PalettePng.write(str(tmp_path / 'empty.png'), np.zeros((2, 2), dtype=np.uint8), [])
+
+
+def test_decoded_by_pillow(tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    pixels = np.random.default_rng(1).integers(0, len(PALETTE), (20, 30)).astype(np.uint8)
+    path = str(tmp_path / 'image.png')
+    PalettePng.write(path, pixels, PALETTE)
+
+    image = Image.open(path)
+    assert image.mode == 'P'
+    assert np.array_equal(np.asarray(image), pixels)
+    rgba = np.asarray(image.convert('RGBA'))
+    assert np.array_equal(rgba, np.array(PALETTE, dtype=np.uint8)[pixels])
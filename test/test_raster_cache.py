@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pytest
+
+from backend.RasterCache import RasterCache
+
+
+def read_window(raster_path, window):
+    from osgeo import gdal
+    return gdal.Open(raster_path).GetRasterBand(1).ReadAsArray(*window)
+
+
+def test_load_serves_contained_windows_from_the_index(synthetic_city, tmp_path, monkeypatch):
+    raster_path = synthetic_city[0][-1]
+    cache = RasterCache(str(tmp_path / 'cache'), padding=0.25)
+
+    array, window, _ = cache.load(raster_path, (16, 16, 20, 20))
+    assert window == (11, 11, 30, 30)  # Padded by a quarter of the window on each side
+    assert np.array_equal(np.asarray(array), read_window(raster_path, window))
+
+    # A window inside the entry is found from the index of the raster, without scanning the folder
+    def no_listing(path):
+        raise AssertionError("the cache folder was listed")
+
+    monkeypatch.setattr(os, 'listdir', no_listing)
+    array, window, _ = cache.load(raster_path, (14, 20, 25, 10))
+    assert window == (11, 11, 30, 30)
+    assert cache.find(RasterCache.source_fingerprint(raster_path), (0, 0, 30, 30)) is None
+
+
+def test_evicted_entry_is_a_cache_miss(synthetic_city, tmp_path):
+    raster_path = synthetic_city[0][0]
+    cache = RasterCache(str(tmp_path / 'cache'))
+    source = RasterCache.source_fingerprint(raster_path)
+
+    cache.load(raster_path, (16, 16, 20, 20))
+    meta = cache.find(source, (16, 16, 20, 20))
+    os.remove(meta['data_path'])  # E.g. evicted by another process
+    assert cache.find(source, (16, 16, 20, 20)) is None
+
+    array, window, _ = cache.load(raster_path, (16, 16, 20, 20))
+    assert np.array_equal(np.asarray(array), read_window(raster_path, window))
+    assert len(cache.read_index(source)) == 1
+
+
+def test_truncated_entry_is_decoded_again(synthetic_city, tmp_path):
+    raster_path = synthetic_city[0][0]
+    cache = RasterCache(str(tmp_path / 'cache'))
+
+    cache.load(raster_path, (16, 16, 20, 20))
+    meta = cache.find(RasterCache.source_fingerprint(raster_path), (16, 16, 20, 20))
+    with open(meta['data_path'], 'r+b') as f:
+        f.truncate(64)
+
+    array, window, _ = cache.load(raster_path, (16, 16, 20, 20))
+    assert np.array_equal(np.asarray(array), read_window(raster_path, window))
+
+
+def test_index_is_keyed_by_file_version(tmp_path):
+    cache = RasterCache(str(tmp_path / 'cache'))
+    first = ['/data/builtup_2000.tif', 1000, 1]
+    assert cache.index_path(first) != cache.index_path(['/data/builtup_2000.tif', 1000, 2])
+    assert cache.read_index(first) == []
+    assert cache.find(first, (0, 0, 10, 10)) is None
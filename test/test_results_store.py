@@ -0,0 +1,88 @@
+import pytest
+
+from backend.ResultsStore import ResultsStore
+
+
+class Point:
+    """
+    Stands for a QgsPointXY in centroid_key.
+    """
+    def __init__(self, x, y):
+        self._x, self._y = x, y
+
+    def x(self):
+        return self._x
+
+    def y(self):
+        return self._y
+
+
+SUMS = {'N': 120.0, 'E': 35.0, 'S': 0.0, 'W': 7.0}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / 'bga_results.sqlite'))
+    yield store
+    store.close()
+
+
+def test_aoi_totals_round_trip(store, tmp_path):
+    store.save_aoi_total('r1', 'aoi', 'numpy', 1234)
+    store.save_aoi_total('r2', 'aoi', 'numpy', 99)
+    assert store.aoi_totals(['r1', 'r3', 'r2'], 'aoi', 'numpy') == [1234, None, 99]
+
+    # Persisted in the database file
+    store.close()
+    reopened = ResultsStore(str(tmp_path / 'bga_results.sqlite'))
+    assert reopened.aoi_totals(['r1', 'r2'], 'aoi', 'numpy') == [1234, 99]
+    reopened.close()
+
+
+def test_aoi_totals_are_keyed_by_raster_aoi_and_engine(store):
+    store.save_aoi_total('r1', 'aoi', 'numpy', 1234)
+    assert store.aoi_totals(['r2'], 'aoi', 'numpy') == [None]
+    assert store.aoi_totals(['r1'], 'other aoi', 'numpy') == [None]
+    assert store.aoi_totals(['r1'], 'aoi', 'qgis') == [None]
+
+
+def test_sector_sums_round_trip_keeps_the_sector_order(store):
+    centroid = ResultsStore.centroid_key(Point(85.1, 25.6))
+    store.save_sector_sums('r1', 'aoi', centroid, 4, 'labels', SUMS)
+    sums = store.sector_sums('r1', 'aoi', centroid, 4, 'labels')
+    assert sums == SUMS
+    assert list(sums) == list(SUMS)
+
+
+@pytest.mark.parametrize('key', [
+    ('r2', 'aoi', '85.100000000,25.600000000', 4, 'labels'),     # Other raster (window or content)
+    ('r1', 'other', '85.100000000,25.600000000', 4, 'labels'),   # Other AOI
+    ('r1', 'aoi', '85.100000001,25.600000000', 4, 'labels'),     # Other centroid
+    ('r1', 'aoi', 'auto', 4, 'labels'),                          # AOI centroid
+    ('r1', 'aoi', '85.100000000,25.600000000', 8, 'labels'),     # Other number of sectors
+    ('r1', 'aoi', '85.100000000,25.600000000', 4, 'analytic'),   # Other sector mode
+])
+def test_sector_sums_are_keyed_by_every_input(store, key):
+    store.save_sector_sums('r1', 'aoi', ResultsStore.centroid_key(Point(85.1, 25.6)), 4, 'labels', SUMS)
+    assert store.sector_sums(*key) is None
+
+
+def test_centroid_key():
+    assert ResultsStore.centroid_key(None) == 'auto'
+    assert ResultsStore.centroid_key(Point(85.1, 25.6)) == '85.100000000,25.600000000'
+    assert ResultsStore.centroid_key(Point(85.1, 25.6)) != ResultsStore.centroid_key(Point(85.1, 25.60001))
+
+
+def test_raster_hash_depends_on_the_window_and_content(store, synthetic_city, tmp_path):
+    raster_paths, aoi_path, _ = synthetic_city
+    window = (8, 8, 40, 40)
+
+    first = store.raster_hash(raster_paths[0], window)
+    assert store.raster_hash(raster_paths[0], window) == first  # Memoized
+    other = ResultsStore(str(tmp_path / 'other.sqlite'))
+    assert other.raster_hash(raster_paths[0], window) == first  # Computed again, same content
+    other.close()
+    assert store.raster_hash(raster_paths[0], (8, 8, 40, 39)) != first
+    assert store.raster_hash(raster_paths[-1], window) != first  # Another year, more built-up pixels
+
+    assert ResultsStore.geometry_hash(aoi_path) == ResultsStore.geometry_hash(aoi_path)
@@ -0,0 +1,158 @@
+import threading
+import time
+
+import pytest
+
+from backend.PipelineFeedback import PipelineFeedback, PipelineCanceled
+from backend.StageScheduler import Stage, StageScheduler
+
+
+class Recorder:
+    """
+    Stage functions that log their start and end, in order.
+    """
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def stage(self, name, seconds=0.0, error=None):
+        def function():
+            with self.lock:
+                self.events.append(('start', name))
+            time.sleep(seconds)
+            if error is not None:
+                raise error
+            with self.lock:
+                self.events.append(('end', name))
+        return function
+
+    def index(self, event, name):
+        return self.events.index((event, name))
+
+
+def test_stages_run_in_dependency_order():
+    recorder = Recorder()
+    stages = [
+        Stage('report', recorder.stage('report'), inputs=('totals', 'images'), outputs=('report',), main_thread=True),
+        Stage('totals', recorder.stage('totals', 0.02), inputs=('window',), outputs=('totals',)),
+        Stage('window', recorder.stage('window'), outputs=('window',), main_thread=True),
+        Stage('images', recorder.stage('images', 0.01), inputs=('window',), outputs=('images',)),
+    ]
+    done = StageScheduler(stages).run()
+
+    assert done == {'window', 'totals', 'images', 'report'}
+    assert recorder.index('end', 'window') < recorder.index('start', 'totals')
+    assert recorder.index('end', 'window') < recorder.index('start', 'images')
+    assert recorder.index('end', 'totals') < recorder.index('start', 'report')
+    assert recorder.index('end', 'images') < recorder.index('start', 'report')
+
+
+def test_phases_and_available_artifacts():
+    recorder = Recorder()
+    stages = [
+        Stage('load', recorder.stage('load'), outputs=('layers',), main_thread=True, phase='prepare'),
+        Stage('stats', recorder.stage('stats'), inputs=('layers',), outputs=('stats',), phase='compute'),
+    ]
+    scheduler = StageScheduler(stages)
+
+    available = scheduler.run(('prepare',))
+    assert recorder.events == [('start', 'load'), ('end', 'load')]
+    assert scheduler.run(('compute',), available) == {'layers', 'stats'}
+    with pytest.raises(ValueError):
+        scheduler.run(('compute',))  # 'layers' comes from the prepare phase
+
+
+def test_independent_stages_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+    stages = [Stage(name, barrier.wait, outputs=(name,)) for name in ('a', 'b', 'c')]
+
+    # Each stage waits for the other two: this only returns when all three run at the same time
+    assert StageScheduler(stages, max_workers=3).run() == {'a', 'b', 'c'}
+
+
+def test_main_thread_stages_run_on_the_calling_thread():
+    threads = {}
+
+    def record(name):
+        return lambda: threads.setdefault(name, threading.current_thread())
+
+    stages = [
+        Stage('main', record('main'), outputs=('main',), main_thread=True),
+        Stage('worker', record('worker'), inputs=('main',), outputs=('worker',)),
+    ]
+    StageScheduler(stages).run()
+
+    assert threads['main'] is threading.current_thread()
+    assert threads['worker'] is not threading.current_thread()
+
+
+def test_error_cancels_the_run_and_skips_dependents():
+    recorder = Recorder()
+    feedback = PipelineFeedback()
+
+    def slow():
+        # Stops between "blocks" once the feedback is canceled
+        for _ in range(100):
+            feedback.check()
+            time.sleep(0.01)
+
+    stages = [
+        Stage('broken', recorder.stage('broken', 0.02, RuntimeError('no raster')), outputs=('totals',)),
+        Stage('slow', slow, outputs=('slow',)),
+        Stage('chart', recorder.stage('chart'), inputs=('totals',), outputs=('chart',), main_thread=True),
+        Stage('layout', recorder.stage('layout'), inputs=('chart', 'slow'), outputs=('layout',)),
+    ]
+    started = time.perf_counter()
+    with pytest.raises(RuntimeError, match='no raster'):
+        StageScheduler(stages, feedback).run()
+
+    assert feedback.is_canceled()
+    assert time.perf_counter() - started < 0.5  # 'slow' stopped early instead of running 1 s
+    assert ('start', 'chart') not in recorder.events
+    assert ('start', 'layout') not in recorder.events
+
+
+def test_cancel_raises_pipeline_canceled():
+    feedback = PipelineFeedback()
+    stages = [
+        Stage('first', feedback.cancel, outputs=('first',), main_thread=True),
+        Stage('second', lambda: None, inputs=('first',), outputs=('second',)),
+    ]
+    with pytest.raises(PipelineCanceled):
+        StageScheduler(stages, feedback).run()
+
+
+def test_progress_ranges_follow_the_weights():
+    stages = [
+        Stage('a', lambda: None, outputs=('a',), weight=1),
+        Stage('b', lambda: None, outputs=('b',), weight=3),
+    ]
+    scheduler = StageScheduler(stages)
+    assert scheduler.ranges == {'a': (0.0, 25.0), 'b': (25.0, 100.0)}
+
+    feedback = PipelineFeedback()
+    StageScheduler(stages, feedback).run()
+    assert feedback.progress() == pytest.approx(100.0)
+
+
+def test_rejects_unknown_inputs():
+    stages = [Stage('stats', lambda: None, inputs=('window',), outputs=('stats',))]
+    with pytest.raises(ValueError, match='window'):
+        StageScheduler(stages).run()
+
+
+def test_rejects_cycles():
+    stages = [
+        Stage('a', lambda: None, inputs=('b',), outputs=('a',)),
+        Stage('b', lambda: None, inputs=('a',), outputs=('b',)),
+        Stage('c', lambda: None, outputs=('c',)),
+    ]
+    with pytest.raises(ValueError, match='cycle'):
+        StageScheduler(stages).run()
+
+
+def test_rejects_duplicate_names_and_outputs():
+    with pytest.raises(ValueError):
+        StageScheduler([Stage('a', lambda: None), Stage('a', lambda: None)])
+    with pytest.raises(ValueError):
+        StageScheduler([Stage('a', lambda: None, outputs=('x',)), Stage('b', lambda: None, outputs=('x',))])
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+gdal = pytest.importorskip('osgeo.gdal')
+pytest.importorskip('pandas')
+
+from backend.BitPackedStack import BitPackedStack
+from backend.FirstBuiltComposite import FirstBuiltComposite
+from backend.RasterGrid import RasterGrid
+from backend.TransitionCounter import TransitionCounter
+
+WINDOW = (6, 9, 50, 41)  # xoff, yoff, xsize, ysize on the 64x64 synthetic grid
+SECTORS = ['N', 'E', 'S', 'W']
+
+
+class ArrayLabeller:
+    """
+    Sector labeller serving the labels of a fixed array over WINDOW.
+    """
+    def __init__(self, labels):
+        self.labels = labels
+
+    def block_labels(self, block):
+        xoff, yoff, xsize, ysize = block.window
+        x, y = xoff - WINDOW[0], yoff - WINDOW[1]
+        return self.labels[y:y + ysize, x:x + xsize]
+
+
+def random_stack(no_of_years, seed):
+    rng = np.random.default_rng(seed)
+    built = rng.random((no_of_years, WINDOW[3], WINDOW[2])) < 0.4
+    years = list(range(2000, 2000 + 2 * no_of_years, 2))
+    return built, BitPackedStack(BitPackedStack.pack(built), years, WINDOW)
+
+
+@pytest.mark.parametrize('no_of_years, max_pixels', [(2, 4 * 1024 * 1024), (5, 120), (11, 50)])
+def test_transition_counts_match_brute_force(synthetic_city, no_of_years, max_pixels):
+    raster_paths, aoi_path, _ = synthetic_city
+    grid = RasterGrid(raster_paths[0])
+    built, stack = random_stack(no_of_years, seed=no_of_years)
+    labels = np.random.default_rng(99).integers(0, len(SECTORS) + 1, size=built.shape[1:])
+    mask = grid.rasterize(aoi_path, window=WINDOW).astype(bool)
+    assert mask.any() and not mask.all()
+
+    counter = TransitionCounter(stack, grid, ArrayLabeller(labels), SECTORS, aoi_path, max_pixels=max_pixels)
+    counter.count()
+
+    for pair in range(no_of_years - 1):
+        before, after = built[pair], built[pair + 1]
+        for k, selected in enumerate((before & after, ~before & after, before & ~after)):
+            expected = [np.count_nonzero(selected & (labels == sector)) for sector in range(len(SECTORS) + 1)]
+            assert counter.sector_counts[k, pair].tolist() == expected
+            assert counter.aoi_counts[k, pair] == np.count_nonzero(selected & mask)
+
+
+def test_transition_table_rows(synthetic_city):
+    raster_paths, aoi_path, _ = synthetic_city
+    _, stack = random_stack(3, seed=3)
+    labels = np.ones((WINDOW[3], WINDOW[2]), dtype=np.int64)
+    counter = TransitionCounter(stack, RasterGrid(raster_paths[0]), ArrayLabeller(labels), SECTORS, aoi_path)
+    table = counter.to_dataframe()
+
+    assert list(table.columns) == ['Period', 'Sector', 'Stable (km²)', 'New (km²)', 'Lost (km²)']
+    assert table['Period'].unique().tolist() == ['2000-2002', '2002-2004']
+    assert table['Sector'].tolist()[:5] == SECTORS + ['AOI']
+    assert (table[table['Sector'] == 'E'].iloc[:, 2:] == 0).all().all()  # Every pixel is in 'N'
+
+
+def composite_context(raster_paths, stack):
+    colors = [f'{10 * i},{20 * i},{255 - i},255' for i in range(len(stack.years))][::-1]  # Descending years
+    return SimpleNamespace(stack=stack, raster_paths=raster_paths, years=stack.years, window=WINDOW, colors=colors)
+
+
+@pytest.mark.parametrize('no_of_years', [3, 9, 17])
+def test_first_built_composite_matches_brute_force(synthetic_city, no_of_years):
+    built, stack = random_stack(no_of_years, seed=no_of_years)
+    composite = FirstBuiltComposite(composite_context(synthetic_city[0], stack))
+
+    ever = built.any(axis=0)
+    first = built.argmax(axis=0)
+    assert np.array_equal(composite.classes(), np.where(ever, first + 1, 0))
+    assert np.array_equal(composite.first_built_year(), np.where(ever, np.array(stack.years)[first], 0))
+    assert composite.classes().dtype == np.uint8
+    assert composite.first_built_year().dtype == np.uint16
+    assert composite.colors()[0] == (0, 0, 255, 255)  # Earliest year, last in the descending list
+
+
+def test_first_built_composite_geotiff(synthetic_city, tmp_path):
+    built, stack = random_stack(4, seed=4)
+    composite = FirstBuiltComposite(composite_context(synthetic_city[0], stack))
+    path = composite.save(str(tmp_path / 'first_built.tif'))
+
+    dataset = gdal.Open(path)
+    band = dataset.GetRasterBand(1)
+    assert np.array_equal(band.ReadAsArray(), composite.first_built_year())
+    assert band.GetNoDataValue() == FirstBuiltComposite.NEVER
+
+    grid = RasterGrid(synthetic_city[0][0])
+    origin_x, pixel_width, _, origin_y, _, pixel_height = grid.geotransform
+    transform = dataset.GetGeoTransform()
+    assert transform[0] == pytest.approx(origin_x + WINDOW[0] * pixel_width)
+    assert transform[3] == pytest.approx(origin_y + WINDOW[1] * pixel_height)
+
+    table = band.GetRasterColorTable()
+    for year, color in zip(stack.years, composite.colors()):
+        assert table.GetColorEntry(year) == color
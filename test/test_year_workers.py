@@ -0,0 +1,41 @@
+import multiprocessing.spawn
+
+import numpy as np
+import pytest
+
+pytest.importorskip('osgeo')
+
+from backend.AnalyticSectorBinner import AnalyticSectorBinner
+from backend.GrowthCore import aoi_totals, sector_sums
+from backend.RasterGrid import RasterGrid
+from backend.YearStatsWorkers import YearProcessPool
+
+
+def test_pool_returns_results_in_input_order():
+    executable = multiprocessing.spawn.get_executable()
+    assert YearProcessPool(3).map(pow, range(10), [3] * 10) == [i ** 3 for i in range(10)]
+    assert multiprocessing.spawn.get_executable() == executable  # Restored after the workers started
+
+
+def test_parallel_sector_sums_match_serial(synthetic_city):
+    raster_paths, _, _ = synthetic_city
+    grid = RasterGrid(raster_paths[0])
+    origin_x, pixel_width, _, origin_y, _, pixel_height = grid.geotransform
+    binner = AnalyticSectorBinner(origin_x + 31.3 * pixel_width, origin_y + 30.6 * pixel_height, 8, 20 * pixel_width,
+                                  grid.geotransform, 22.5)
+    window = grid.window_for_bounds(*binner.bounds())
+
+    # Years in a shuffled order: every row must still belong to the raster at the same position
+    paths = [raster_paths[i] for i in (2, 0, 3, 1)]
+    serial = sector_sums(paths, window, binner, 9)
+    parallel = sector_sums(paths, window, binner, 9, workers=3)
+
+    assert parallel.shape == serial.shape == (4, 9)
+    assert np.array_equal(parallel, serial)
+    assert not np.array_equal(serial[0], serial[1])
+
+
+def test_parallel_aoi_totals_match_serial(synthetic_city):
+    raster_paths, aoi_path, _ = synthetic_city
+    paths = raster_paths[::-1]
+    assert aoi_totals(paths, aoi_path, workers=2).tolist() == aoi_totals(paths, aoi_path).tolist()
@@ -0,0 +1,79 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+gdal = pytest.importorskip('osgeo.gdal')
+
+from backend.GrowthCore import aoi_totals
+from backend.RasterGrid import RasterGrid
+
+
+def read_full(raster_path):
+    return gdal.Open(raster_path).GetRasterBand(1).ReadAsArray()
+
+
+def copy_shapefile(aoi_path, folder):
+    """
+    Copies the AOI shapefile, as the qgis engine writes its sums into the attribute table.
+    """
+    base = os.path.splitext(aoi_path)[0]
+    for extension in ('.shp', '.shx', '.dbf', '.prj'):
+        if os.path.exists(base + extension):
+            shutil.copyfile(base + extension, os.path.join(folder, 'aoi' + extension))
+    return os.path.join(folder, 'aoi.shp')
+
+
+def test_window_for_bounds(synthetic_city):
+    grid = RasterGrid(synthetic_city[0][0])
+    origin_x, pixel_width, _, origin_y, _, pixel_height = grid.geotransform
+
+    assert grid.full_window == (0, 0, 64, 64)
+    # Bounds inside pixels are widened to whole pixels
+    xmin, ymax = origin_x + 10.5 * pixel_width, origin_y + 4.2 * pixel_height
+    xmax, ymin = origin_x + 20.0 * pixel_width, origin_y + 30.7 * pixel_height
+    assert grid.window_for_bounds(xmin, ymin, xmax, ymax) == (10, 4, 10, 27)
+    # Clipped to the grid, empty outside of it
+    assert grid.window_for_bounds(origin_x - 100, origin_y - 1e6, origin_x + 3 * pixel_width, origin_y + 100) == (0, 0, 3, 64)
+    assert grid.window_for_bounds(origin_x - 300, origin_y - 300, origin_x - 100, origin_y - 100)[2] == 0
+
+    assert RasterGrid.intersect_windows((0, 0, 10, 10), (5, 8, 10, 10)) == (5, 8, 5, 2)
+    assert RasterGrid.intersect_windows((0, 0, 10, 10), (20, 0, 5, 5))[2] == 0
+
+
+def test_rasterize_window_matches_the_full_grid(synthetic_city):
+    _, aoi_path, _ = synthetic_city
+    grid = RasterGrid(synthetic_city[0][0])
+    full = grid.rasterize(aoi_path)
+
+    assert full.shape == (64, 64)
+    assert 0 < full.sum() < full.size
+    for window in [(0, 0, 64, 64), (10, 20, 30, 17), (40, 0, 24, 64)]:
+        xoff, yoff, xsize, ysize = window
+        assert np.array_equal(grid.rasterize(aoi_path, window=window), full[yoff:yoff + ysize, xoff:xoff + xsize])
+
+
+def test_numpy_totals_match_the_burnt_aoi(synthetic_city):
+    raster_paths, aoi_path, _ = synthetic_city
+    mask = RasterGrid(raster_paths[0]).rasterize(aoi_path).astype(bool)
+    expected = [int((read_full(path) != 0)[mask].sum()) for path in raster_paths]
+
+    assert aoi_totals(raster_paths, aoi_path).tolist() == expected
+    assert aoi_totals(raster_paths, aoi_path, window=(4, 4, 56, 56)).tolist() == expected  # Window contains the AOI
+    assert expected == sorted(expected)  # Built-up land only grows in the synthetic city
+
+
+def test_numpy_engine_matches_qgis_engine(synthetic_city, tmp_path):
+    pytest.importorskip('qgis.core')
+    from backend.BatchRunner import start_qgis
+    start_qgis()
+    from backend.ZonalStatisticsProcessor import ZonalStatisticsProcessor
+
+    raster_paths, aoi_path, years = synthetic_city
+    aoi_copy = copy_shapefile(aoi_path, str(tmp_path))
+    qgis = ZonalStatisticsProcessor(raster_paths, aoi_copy, years, engine='qgis')
+    numpy = ZonalStatisticsProcessor(raster_paths, aoi_path, years, engine='numpy')
+
+    assert numpy.year_totals == qgis.year_totals
+    assert numpy.totals.tolist() == qgis.totals.tolist()